@@ -1,9 +1,47 @@
 import threading
 import time
 
+import logs
+import metrics
+import tracing
 import utils
+from opening import OpeningScheduler
+from pacing import PacingController
+from planner import Plan, Wish, WishlistPlanner
+from select_result import SelectStatus, delete_succeeded, status_of
+from swap import CourseSwap, SwapResult
+from timetable import Timetable
 from User import User
-from utils import BASE_URL, LoginExpiredError
+from utils import LoginExpiredError
+from watcher import CourseWatcher
+
+
+def check_completed(msg: str) -> bool:
+    """选课返回信息是否表示任务已结束（选上、申请成功或与已选课程冲突）"""
+    return status_of(msg).completed
+
+
+class TaskControl:
+    """从其他线程控制 monitor_loop：取消任务、修改间隔，并查看运行状态"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.attempts = 0
+        self.last_result: str | None = None
+        self.done = False
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """让任务在当前请求结束后退出，正在等待的间隔会立即结束"""
+        self._cancelled.set()
+
+    def wait(self, seconds: float) -> bool:
+        """等待 seconds 秒，期间被取消时提前返回 True"""
+        return self._cancelled.wait(seconds)
 
 
 def monitor_loop(
@@ -15,6 +53,9 @@ def monitor_loop(
     check=None,
     send_email=False,
     quiet=False,
+    pacer: PacingController | None = None,
+    scheduler: OpeningScheduler | None = None,
+    control: TaskControl | None = None,
 ):
     """通用监控循环
 
@@ -27,57 +68,115 @@ def monitor_loop(
         check: 判断是否完成的回调函数，接收 func 的返回值
         send_email: 是否发送邮件
         quiet: 静默模式，不显示日志
+        pacer: 多个任务共用的请求节奏控制器，None 表示只按 interval 循环
+        scheduler: 开放时间调度，系统未开放时按它给出的时间等待
+        control: 可选，用于在其他线程中取消任务、修改间隔，并记录尝试次数和最近的结果
     """
 
-    def check_completed(msg: str) -> bool:
-        status: list[str] = ["选课成功", "选课申请成功", "冲突"]
-        return any(s in msg for s in status)
-
     if check is None:
         check = check_completed
+    if scheduler is not None and scheduler.clock.transport is None:
+        # 测量时钟偏差的请求也使用 user 的连接池和超时
+        scheduler.clock.transport = user.transport
 
     print(f"开始选课: {task_name}")
+    # 循环期间本线程的 span 都带上任务名，结束后（包括异常退出）恢复
+    with tracing.task_scope(task_name):
+        attempts = 0
+        metrics.REGISTRY.set("task_done", 0, task=task_name)
+        while control is None or not control.cancelled:
+            if control is not None:
+                interval = control.interval
+            delay = interval
+            if pacer is not None:
+                with tracing.TRACER.span("pacer.acquire", "task"):
+                    pacer.acquire()
+            attempts += 1
+            metrics.REGISTRY.inc("task_attempts_total", task=task_name)
+            start = time.monotonic()
+            # 请求前的登录状态代数，func 不经过 User.request 时用于判断是否已重新登录
+            generation = user.generation
+            with tracing.TRACER.span(
+                "monitor_loop.iteration", "task", attempt=attempts
+            ):
+                try:
+                    # 执行核心逻辑
+                    result: str = func(*args)
+                    if pacer is not None:
+                        pacer.record(time.monotonic() - start)
+                    utils.print_log(
+                        "%s : %s", quiet=quiet, task=task_name, args=(task_name, result)
+                    )
+                    if control is not None:
+                        control.attempts, control.last_result = attempts, result
+                    status = status_of(result)
+                    if scheduler is not None and status is SelectStatus.NOT_OPEN:
+                        delay = scheduler.closed_delay(interval)
 
-    while True:
-        try:
-            # 执行核心逻辑
-            result: str = func(*args)
-            utils.print_log(f"{task_name} : {result}", quiet)
+                    # 检查是否成功
+                    if check(result):
+                        utils.print_log(
+                            "%s 已完成。",
+                            quiet=quiet,
+                            task=task_name,
+                            args=(task_name,),
+                        )
+                        metrics.REGISTRY.set("task_done", 1, task=task_name)
+                        metrics.REGISTRY.observe(
+                            "attempts_until_done",
+                            attempts,
+                            metrics.ATTEMPT_BUCKETS,
+                            status=status.value,
+                        )
+                        if status.succeeded and send_email:
+                            user.send(f"选课完成: {task_name}", result)
+                        if control is not None:
+                            control.done = True
+                        break
 
-            # 检查是否成功
-            if check(result):
-                utils.print_log(f"{task_name} 已完成。", quiet)
-                if "成功" in result and send_email:
-                    user.send(f"选课完成: {task_name}", result)
-                break
+                except LoginExpiredError as e:
+                    if pacer is not None:
+                        pacer.record(time.monotonic() - start)
+                    metrics.REGISTRY.inc(
+                        "task_exceptions_total", task=task_name, error=type(e).__name__
+                    )
+                    if e.generation is not None:
+                        generation = e.generation
+                    try:
+                        # 多个任务同时过期时只有一个线程登录，其他线程等待结果
+                        user.relogin(generation, quiet)
+                    except Exception as e:
+                        utils.print_log(
+                            "重连失败: %s",
+                            quiet=quiet,
+                            level=logs.ERROR,
+                            task=task_name,
+                            args=(e,),
+                        )
+                except Exception as e:
+                    if pacer is not None:
+                        pacer.record(time.monotonic() - start, error=True)
+                    metrics.REGISTRY.inc(
+                        "task_exceptions_total", task=task_name, error=type(e).__name__
+                    )
+                    utils.print_log(
+                        "%s 发生异常: %s",
+                        quiet=quiet,
+                        level=logs.WARNING,
+                        task=task_name,
+                        args=(task_name, e),
+                    )
 
-        except LoginExpiredError:
-            utils.print_log("登录过期，尝试重新登录...", quiet)
-            try:
-                user.ss = user.login(user.username, user.password)
-            except Exception as e:
-                utils.print_log(f"重连失败: {e}", quiet)
-        except Exception as e:
-            utils.print_log(f"{task_name} 发生异常: {e}", quiet)
-
-        time.sleep(interval)
+            if control is not None:
+                control.wait(delay)
+            else:
+                time.sleep(delay)
 
 
 def query_by_course_code(user: User, code: str) -> None:
     """按课程代码查询可选课程，返回可选课程的相关信息"""
-    query_url = f"{BASE_URL}/vatuu/CourseStudentAction"
-    data = {
-        "setAction": "studentCourseSysSchedule",
-        "viewType": "",
-        "jumpPage": 1,
-        "selectAction": "CourseCode",
-        "key1": code,
-        "courseType": "all",
-        "key4": "",
-        "btn": "执行查询",
-    }
-    res = user.request("POST", query_url, data=data)
-    courses: list[dict[str, str]] = utils.parse_course_table(res.text)
+    # 显示的是当前余量，不使用缓存
+    courses: list[dict[str, str]] = user.query_by_course_code(code, max_age=0)
 
     if courses:
         for course in courses:
@@ -91,12 +190,25 @@ def query_by_course_code(user: User, code: str) -> None:
         print("未找到课程信息，请检查课程代码是否正确")
 
 
+def watch_course_codes(
+    user: User,
+    codes: list[str],
+    interval: float = 5.0,
+    jsonl_path: str | None = None,
+) -> CourseWatcher:
+    """在后台监控课程余量，有变化时打印，返回 CourseWatcher，调用其 stop() 停止"""
+    watcher = CourseWatcher(user, codes, interval, jsonl_path)
+    watcher.start()
+    return watcher
+
+
 def query_teachIds(user: User, chooseIds: list[str]) -> None:
     """查询多项课程的 teachId，方便替换"""
     print("teachIds = [")
 
+    courses = user.resolve_courses(chooseIds)
     for chooseId in chooseIds:
-        course = user.query_by_chooseId(chooseId)
+        course = courses[chooseId]
         if course:
             teacher: str = course["teacher"]
             course_name: str = course["course"]
@@ -121,18 +233,137 @@ def del_courses(user: User, chooseIds: list[str], quiet: bool = False) -> None:
     for chooseId in chooseIds:
         target_listId = mapping.get(chooseId)
         if target_listId:
-            user.del_course(chooseId=chooseId, listId=target_listId)
-            msg = f"尝试删除课程 {chooseId}"
+            text = user.del_course(chooseId=chooseId, listId=target_listId)
+            ok = delete_succeeded(text)
+            if ok is None:
+                msg = f"尝试删除课程 {chooseId}"
+            else:
+                msg = f"删除课程 {chooseId}{'成功' if ok else '失败'}"
         else:
             msg = f"未在已选列表中找到课程 {chooseId}"
 
-        utils.print_log(msg, quiet)
+        utils.print_log(msg, quiet=quiet)
+
+
+def swap_course(
+    user: User,
+    drop: str,
+    target: str,
+    interval: float = 1.0,
+    send_email: bool = False,
+    check_conflicts: bool = True,
+) -> SwapResult | None:
+    """把已选的 drop 换成 target：等待 target 有空位时立即退课并选课，失败时选回 drop
+
+    参数：
+        user: 用户实例
+        drop: 已选课程的选课编号
+        target: 目标开课的选课编号
+        interval: 查询目标余量的间隔
+        send_email: 换课结束后是否发送邮件
+        check_conflicts: 是否检查目标与其余已选课程的上课时间冲突
+    """
+    swap = CourseSwap(user, drop, target, check_conflicts)
+    try:
+        swap.prepare()
+    except ValueError as e:
+        utils.print_log(f"无法换课: {e}", level=logs.WARNING)
+        return None
+    return swap.run(interval, send_email=send_email)
+
+
+def precheck_conflicts(
+    user: User, teachIds: list[tuple[str, str]]
+) -> list[tuple[str, str]]:
+    """选课前在本地检查上课时间冲突，返回应当执行的任务
+
+    与已选课程冲突的任务直接跳过；候选课程之间冲突时只提示（通常是互为备选），
+    两者中先选上的会让另一个收到「冲突」而结束。
+    上课时间来自课程缓存（user.catalog），缓存中没有的任务不检查。
+    """
+    rows = {tid: user.catalog.by_teachId(tid) for tid, _ in teachIds}
+    if not any(rows.values()):
+        return teachIds
+
+    try:
+        selected = user.selected_timetable()
+    except Exception as e:
+        utils.print_log(f"查询已选课程失败，跳过冲突检查: {e}")
+        return teachIds
+
+    tasks: list[tuple[str, str]] = []
+    queued = Timetable()
+    for tid, name in teachIds:
+        row = rows[tid]
+        clash = selected.conflicts(row.date) if row else None
+        if clash:
+            utils.print_log(
+                f"{name} 与已选课程 {'、'.join(clash)} 时间冲突，跳过",
+                level=logs.WARNING,
+            )
+            continue
+        tasks.append((tid, name))
+        if row is None or clash is None:
+            continue
+        others = queued.conflicts(row.date)
+        if others:
+            utils.print_log(
+                f"{name} 与待选课程 {'、'.join(others)} 时间冲突，最多只能选上其中一门",
+                level=logs.WARNING,
+            )
+        queued.add(name, row.date)
+    return tasks
 
 
 def run_select_courses_with_teachIds(
-    user: User, teachIds: list[tuple[str, str]], interval=0.5, send_email=False
+    user: User,
+    teachIds: list[tuple[str, str]],
+    interval=0.5,
+    send_email=False,
+    pacer: PacingController | None = None,
+    scheduler: OpeningScheduler | None = None,
+    check_conflicts: bool = True,
+    engine: str = "thread",
 ):
-    """已知 teachId 直接选课任务（多线程）"""
+    """已知 teachId 直接选课任务
+
+    engine 为 "thread" 时每门课一个线程；为 "async" 时所有任务在同一个事件循环中运行
+    （见 async_engine，需要安装 aiohttp）。传入 pacer 时所有任务共用同一个请求预算，
+    传入 scheduler 时未开放期间低频轮询，到开放时刻切回正常间隔，
+    并在开放前预先建立每个任务所需的连接。
+    check_conflicts 为 True 时先在本地检查上课时间冲突，见 precheck_conflicts。
+    """
+    # 延迟导入，async_engine 依赖本模块的 check_completed
+    import async_engine
+
+    if check_conflicts:
+        teachIds = precheck_conflicts(user, teachIds)
+        if not teachIds:
+            utils.print_log("无可执行任务")
+            return
+
+    if engine not in ("thread", "async"):
+        raise ValueError(f"未知的选课引擎: {engine}，可选 thread、async")
+    if engine == "async" and not async_engine.supports(user.transport):
+        # 异步引擎的请求不经过 adapter，换成其他后端或录制时会绕过它们
+        utils.print_log(
+            f"HTTP 后端 {type(user.transport.adapter).__name__} 不支持异步引擎，改用多线程",
+            level=logs.WARNING,
+        )
+        engine = "thread"
+    if engine == "async":
+        if not async_engine.available():
+            raise ImportError("异步选课引擎需要安装 aiohttp：pip install aiohttp")
+        async_engine.run_select_courses(
+            user, teachIds, interval, send_email, pacer=pacer, scheduler=scheduler
+        )
+        return
+
+    # 每个线程同时占用一个连接，连接池太小时多出的连接用完即被丢弃
+    user.transport.ensure_pool_size(len(teachIds))
+    if scheduler is not None and scheduler.warmup is None:
+        scheduler.warmup = lambda: user.warmup(len(teachIds))
+
     threads: list[threading.Thread] = []
     for tid, name in teachIds:
         thread = threading.Thread(
@@ -144,6 +375,8 @@ def run_select_courses_with_teachIds(
                 "func": user.select_course,
                 "args": (tid,),
                 "send_email": send_email,
+                "pacer": pacer,
+                "scheduler": scheduler,
             },
         )
         threads.append(thread)
@@ -155,18 +388,130 @@ def run_select_courses_with_teachIds(
 
 
 def run_select_courses(
-    user: User, chooseIds: list[str], interval=0.5, send_email=False
+    user: User,
+    chooseIds: list[str],
+    interval=0.5,
+    send_email=False,
+    pacer: PacingController | None = None,
+    scheduler: OpeningScheduler | None = None,
+    check_conflicts: bool = True,
+    engine: str = "thread",
 ):
-    """根据选课编号持续尝试选课任务（多线程）"""
+    """根据选课编号持续尝试选课任务，engine 见 run_select_courses_with_teachIds"""
     tasks: list[tuple[str, str]] = []
+    courses = user.resolve_courses(chooseIds)
     for cid in chooseIds:
-        tid = user.get_teachId(cid)
+        course = courses[cid]
+        tid = course.get("teachId") if course else None
         if tid:
             tasks.append((tid, cid))
         else:
             utils.print_log(f"编号 {cid} 无效，自动跳过")
 
     if tasks:
-        run_select_courses_with_teachIds(user, tasks, interval, send_email)
+        run_select_courses_with_teachIds(
+            user,
+            tasks,
+            interval,
+            send_email,
+            pacer,
+            scheduler,
+            check_conflicts,
+            engine,
+        )
     else:
         utils.print_log("无可执行任务")
+
+
+def run_wishlist(
+    user: User,
+    wishes: list[Wish],
+    interval=0.5,
+    send_email=False,
+    full_retries: int | None = 10,
+    pacer: PacingController | None = None,
+    scheduler: OpeningScheduler | None = None,
+) -> Plan:
+    """按志愿规划互不冲突的开课并选课，返回最终的方案
+
+    每门课一个线程。某个开课返回冲突，或连续 full_retries 次返回已满时，
+    排除该开课并重新规划尚未选上的课程，换了开课的课程启动新任务，旧任务随之结束。
+    full_retries 为 None 时已满的开课一直重试。
+    """
+    planner = WishlistPlanner.from_user(user, wishes)
+    plan = planner.solve()
+    for code in plan.unassigned:
+        utils.print_log(f"课程 {code} 没有可安排的开课")
+
+    lock = threading.Lock()
+    threads: list[threading.Thread] = []
+    full_counts: dict[str, int] = {}
+
+    def current(code: str):
+        return planner.locked.get(code) or planner.plan.assignments.get(code)
+
+    def replan() -> None:
+        """重新规划，调用时已持有 lock"""
+        old = {code: row.chooseId for code, row in planner.plan.assignments.items()}
+        new = planner.solve()
+        for code in new.unassigned:
+            utils.print_log(f"课程 {code} 没有可安排的开课", level=logs.WARNING)
+        for code, row in new.assignments.items():
+            if code not in planner.locked and old.get(code) != row.chooseId:
+                utils.print_log(f"课程 {code} 改选 {row.teacher}（{row.chooseId}）")
+                start(code, row)
+
+    def start(code: str, row) -> None:
+        def check(result) -> bool:
+            status = status_of(result)
+            with lock:
+                planned = current(code)
+                if status.succeeded:
+                    planner.lock(code, row)
+                    if planned is None or planned.chooseId != row.chooseId:
+                        replan()
+                    return True
+                if planned is None or planned.chooseId != row.chooseId:
+                    # 重新规划后该课程已换成其他开课
+                    return True
+                if status is SelectStatus.FULL:
+                    full_counts[row.chooseId] = full_counts.get(row.chooseId, 0) + 1
+                else:
+                    full_counts.pop(row.chooseId, None)
+                if status is SelectStatus.CONFLICT or (
+                    full_retries is not None
+                    and full_counts.get(row.chooseId, 0) >= full_retries
+                ):
+                    utils.print_log(f"{row.chooseId} {result}，重新规划")
+                    planner.exclude(row.chooseId)
+                    replan()
+                    return True
+            return False
+
+        thread = threading.Thread(
+            target=monitor_loop,
+            kwargs={
+                "user": user,
+                "task_name": f"{row.teacher}-{row.course}",
+                "interval": interval,
+                "func": user.select_course,
+                "args": (row.teachId,),
+                "check": check,
+                "send_email": send_email,
+                "pacer": pacer,
+                "scheduler": scheduler,
+            },
+        )
+        threads.append(thread)
+        thread.start()
+
+    user.transport.ensure_pool_size(len(plan.assignments))
+    with lock:
+        for code, row in plan.assignments.items():
+            start(code, row)
+    # 重新规划时会加入新线程
+    i = 0
+    while i < len(threads):
+        threads[i].join()
+        i += 1
+    return planner.plan
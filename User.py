@@ -1,64 +1,311 @@
-import re
 import sys
+import threading
 import time
 import traceback
 
+import requests
+
+import course_parser
+import logs
+import metrics
+import session_store
+import tracing
 import utils
-from utils import BASE_URL
+from catalog import QUERY_ALL, CourseCatalog
+from notify import Notifier
+from select_result import SelectResult, SelectStatus, classify
+from timetable import Timetable
+from transport import Transport
+
+# 选课请求的 setAction，也是其指标的 endpoint
+SELECT_ENDPOINT = "addStudentCourseApply"
 
 
 class User:
-    def __init__(self, username, password, email_config):
+    def __init__(
+        self,
+        username,
+        password,
+        email_config,
+        login_delays=None,
+        session_file=None,
+        catalog=None,
+        transport=None,
+        notifier=None,
+        captcha_solver=None,
+    ):
+        """
+        参数:
+            username: 学号
+            password: 密码
+            email_config: 邮件配置
+            login_delays: 登录各阶段的最小间隔，见 utils.LOGIN_MIN_DELAYS
+            session_file: 保存登录状态的文件，重启内核后可直接恢复，无需重新登录
+            catalog: 课程信息缓存，默认为只在内存中的 CourseCatalog
+            transport: 连接池、超时与重试配置，默认为 Transport()
+            notifier: 邮件通知队列，默认为 Notifier(email_config)
+            captcha_solver: 验证码识别器，默认为 captcha.solver，可传入 CaptchaPool 在子进程中识别
+        """
         self.username = username
         self.password = password
         self.email_config = email_config
-        self.ss = self.login(username, password)
+        self.login_delays = login_delays
+        self.session_file = session_file
+        self.catalog = catalog if catalog is not None else CourseCatalog()
+        self.transport = transport if transport is not None else Transport()
+        self.notifier = notifier if notifier is not None else Notifier(email_config)
+        self.captcha_solver = captcha_solver
+        # 最近一次登录的流程，可通过 login_timings 查看各阶段耗时
+        self.last_login: utils.LoginPipeline | None = None
+        # 登录状态的代数，每次更换 ss 加一，用于判断过期的是不是当前的登录状态
+        self.generation = 0
+        # 登录过期后实际重新登录的次数
+        self.relogin_count = 0
+        self._ss = None
+        self._relogin_lock = threading.Lock()
 
-    @staticmethod
-    def login(username, password):
+        ss = self.restore_session()
+        if ss is None:
+            ss = self.login(username, password)
+        self.ss = ss
+
+    @property
+    def ss(self):
+        """当前的登录状态（requests.Session）"""
+        return self._ss
+
+    @ss.setter
+    def ss(self, ss) -> None:
+        if ss is not None:
+            self.transport.mount(ss)
+        self._ss = ss
+        self.generation += 1
+
+    @property
+    def login_timings(self) -> dict[str, float]:
+        """最近一次登录各阶段的耗时（秒）"""
+        if self.last_login is None:
+            return {}
+        return dict(self.last_login.timings)
+
+    def login(self, username, password):
         """登录并返回 session，包含重试机制"""
         while True:
             try:
-                ss = utils.login(username, password)
+                pipeline = utils.LoginPipeline(
+                    username,
+                    password,
+                    self.login_delays,
+                    transport=self.transport,
+                    captcha_solver=self.captcha_solver,
+                )
+                self.last_login = pipeline
+                ss = pipeline.run()
+                self.save_session(ss)
                 return ss
             except ValueError as msg:
                 utils.print_log(f"{msg}")
                 # 很多时候是验证码错误，重试即可
-                time.sleep(2)
+                with tracing.TRACER.span("login.retry_wait", "login"):
+                    time.sleep(2)
+            except requests.RequestException as e:
+                # 连接失败或超时，稍后重试
+                utils.print_log(f"登录请求失败: {e}")
+                with tracing.TRACER.span("login.retry_wait", "login"):
+                    time.sleep(2)
             except Exception:
-                utils.print_log("意外报错：\n" + "*" * 8)
+                utils.print_log("意外报错：\n" + "*" * 8, level=logs.ERROR)
+                # 日志由后台线程写出，先写完再打印堆栈，保持顺序
+                logs.LOG.flush()
                 print(traceback.format_exc())
                 # 严重错误退出，避免死循环消耗资源
                 sys.exit(1)
 
+    def relogin(self, generation: int | None = None, quiet: bool = False):
+        """登录过期后重新登录，多个线程同时发现过期时只登录一次
+
+        第一个线程负责登录，其他线程等待它完成后直接使用新的登录状态。
+
+        参数:
+            generation: 发现过期的请求所用登录状态的代数（见 LoginExpiredError.generation），
+                与当前代数不同说明已经重新登录过，不再登录；None 表示当前登录状态
+            quiet: 静默模式，不显示日志
+
+        返回：
+            当前有效的 session
+        """
+        if generation is None:
+            generation = self.generation
+        # 包括等待其他线程登录完成的时间
+        with tracing.TRACER.span("relogin", "login"), self._relogin_lock:
+            if generation == self.generation:
+                utils.print_log("登录过期，尝试重新登录...", quiet=quiet)
+                self.relogin_count += 1
+                metrics.REGISTRY.inc("relogins_total")
+                self.ss = self.login(self.username, self.password)
+            return self.ss
+
+    def warmup(self, connections: int | None = None) -> int:
+        """预先建立连接，返回新建的连接数，见 Transport.warmup"""
+        return self.transport.warmup(connections)
+
+    def save_session(self, ss=None) -> None:
+        """保存登录状态到 session_file"""
+        if not self.session_file:
+            return
+        try:
+            session_store.save_session(ss or self.ss, self.session_file, self.username)
+        except OSError as e:
+            utils.print_log(f"保存登录状态失败: {e}")
+
+    def restore_session(self):
+        """从 session_file 恢复登录状态，并用一次请求验证是否仍然有效
+
+        返回：
+            有效的 session，否则为 None。
+        """
+        if not self.session_file:
+            return None
+        ss = session_store.load_session(self.session_file, self.username)
+        if ss is None:
+            return None
+
+        url = f"{utils.BASE_URL}/vatuu/CourseStudentAction?setAction=studentCourseSysList&viewType=delCourse"
+        self.transport.mount(ss)
+        try:
+            res = self.transport.request(ss, "GET", url, op="query")
+            res.raise_for_status()
+            utils.check_session_expired(res.content)
+        except utils.LoginExpiredError:
+            utils.print_log("保存的登录状态已过期，重新登录")
+            session_store.delete_session(self.session_file)
+            return None
+        except Exception as e:
+            utils.print_log(f"验证保存的登录状态失败: {e}")
+            return None
+
+        utils.print_log("已恢复保存的登录状态")
+        return ss
+
     def send(self, subject, text="") -> None:
-        utils.send(self.email_config, subject, text)
+        """加入邮件通知队列，立即返回，由后台线程合并发送"""
+        self.notifier.send(subject, text)
+
+    def request(self, method: str, url: str, op: str = "request", **kwargs):
+        """统一请求，包含登录状态检查
 
-    def request(self, method: str, url: str, **kwargs):
-        """统一请求，包含登录状态检查"""
-        res = self.ss.request(method=method, url=url, **kwargs)
-        utils.check_session_expired(res.text)
+        op 为操作类型，决定超时和是否重试，见 transport.TIMEOUTS
+        """
+        generation = self.generation
+        endpoint = metrics.endpoint(url, kwargs.get("data"))
+        start = time.perf_counter()
+        try:
+            with tracing.TRACER.span("request", "http", endpoint=endpoint, op=op):
+                res = self.transport.request(self.ss, method, url, op, **kwargs)
+        except Exception as e:
+            metrics.record_request(
+                endpoint, time.perf_counter() - start, metrics.error_outcome(e)
+            )
+            raise
+        seconds = time.perf_counter() - start
+        try:
+            # 在字节上检查，不经过 res.text 的编码探测
+            utils.check_session_expired(res.content)
+        except utils.LoginExpiredError as e:
+            metrics.record_request(endpoint, seconds, "expired")
+            e.generation = generation
+            raise
+        if res.status_code >= 500:
+            metrics.record_request(endpoint, seconds, "http_5xx")
+            # 服务器繁忙或出错，不当作正常页面解析
+            res.raise_for_status()
+        metrics.record_request(endpoint, seconds, "ok")
         return res
 
-    def query_by_chooseId(self, chooseId: str) -> dict[str, str] | None:
-        """根据选课编号查询课程信息"""
-        query_url = f"{BASE_URL}/vatuu/CourseStudentAction"
+    def fetch_courses(self, select_action: str, key: str, page: int = 1) -> bytes:
+        """查询课程，返回未解析的响应内容，参数同 query_courses"""
+        query_url = f"{utils.BASE_URL}/vatuu/CourseStudentAction"
         data = {
             "setAction": "studentCourseSysSchedule",
             "viewType": "",
-            "jumpPage": 1,
-            "key1": chooseId,
-            "selectAction": "TeachID",
+            "jumpPage": page,
+            "key1": key,
+            "selectAction": select_action,
             "courseType": "all",
             "key4": "",
             "btn": "执行查询",
         }
-        res = self.request("POST", query_url, data=data)
-        course = utils.parse_course_table(res.text)
-        if course:
-            return course[0]
-        else:
-            return None
+        return self.request("POST", query_url, op="query", data=data).content
+
+    def query_courses(
+        self, select_action: str, key: str, page: int = 1
+    ) -> tuple[list[course_parser.CourseRow], int]:
+        """查询课程并加入缓存
+
+        参数:
+            select_action: 查询方式，如 TeachID、CourseCode、QueryTeacherName
+            key: 查询关键字
+            page: 页码
+
+        返回：
+            (课程行列表, 总页数)
+        """
+        content = self.fetch_courses(select_action, key, page)
+        rows = course_parser.parse_course_rows(content)
+        pages = course_parser.parse_page_count(content)
+        # 只有一页时才是该查询的完整结果
+        self.catalog.add(rows, (select_action, key) if pages <= 1 else None)
+        return rows, pages
+
+    def query_by_chooseId(self, chooseId: str) -> dict[str, str] | None:
+        """根据选课编号查询课程信息，缓存未过期时不发送请求"""
+        row = self.catalog.get(chooseId)
+        if row is None:
+            rows, _ = self.query_courses("TeachID", chooseId)
+            row = rows[0] if rows else None
+        return row._asdict() if row else None
+
+    def query_by_course_code(
+        self, code: str, max_age: float | None = None
+    ) -> list[dict[str, str]]:
+        """根据课程代码查询所有开课信息，缓存未过期时不发送请求
+
+        max_age 为可以使用的缓存的最长时间（秒），默认为缓存的 ttl；为 0 时总是发送请求。
+        """
+        rows = self.catalog.by_course_code(code, max_age)
+        if rows is None:
+            rows, _ = self.query_courses("CourseCode", code)
+        return [row._asdict() for row in rows]
+
+    def prefetch_catalog(self, max_pages: int = 20) -> int:
+        """逐页获取整个课表放入缓存，返回获取到的课程数量
+
+        课表超过 max_pages 页时只保留第一页，不再继续获取。
+        """
+        rows, pages = self.query_courses(*QUERY_ALL)
+        if pages > max_pages:
+            return len(rows)
+        for page in range(2, pages + 1):
+            rows += self.query_courses(*QUERY_ALL, page=page)[0]
+        self.catalog.add(rows, QUERY_ALL)
+        return len(rows)
+
+    def resolve_courses(
+        self, chooseIds: list[str], prefetch_threshold: int = 10
+    ) -> dict[str, dict[str, str] | None]:
+        """批量查询课程信息
+
+        缓存中缺少的编号超过 prefetch_threshold 个时，先尝试获取整个课表，
+        且只在课表的页数少于缺少的编号数时才继续翻页，请求数不会超过逐个查询；
+        其余的编号逐个按选课编号查询。
+
+        返回：
+            {chooseId: 课程信息}，找不到的课程为 None。
+        """
+        missing = [c for c in chooseIds if self.catalog.get(c) is None]
+        if len(missing) > prefetch_threshold:
+            self.prefetch_catalog(max_pages=len(missing) - 1)
+        return {c: self.query_by_chooseId(c) for c in chooseIds}
 
     def query_selected_courses(self) -> dict[str, str]:
         """查询已选课程
@@ -66,23 +313,60 @@ class User:
         返回：
             {chooseId: listId} 格式的字典。
         """
-        url = f"{BASE_URL}/vatuu/CourseStudentAction?setAction=studentCourseSysList&viewType=delCourse"
-        res = self.request("GET", url)
+        url = f"{utils.BASE_URL}/vatuu/CourseStudentAction?setAction=studentCourseSysList&viewType=delCourse"
+        res = self.request("GET", url, op="query")
 
-        mapping = utils.parse_selected_list(res.text)
+        mapping = utils.parse_selected_list(res.content)
         return mapping
 
-    def select_course(self, teachId) -> str:
-        """根据 teachId 选课"""
-        url = f"{BASE_URL}/vatuu/CourseStudentAction?setAction=addStudentCourseApply&teachId={teachId}&isBook=1&tt={utils.get_timestamp()}"
-        res = self.request("GET", url)
+    def selected_timetable(self, chooseIds: list[str] | None = None) -> Timetable:
+        """已选课程的上课时间，名称为「课程名（选课编号）」
+
+        已经查询过已选列表时可以传入 chooseIds，不再重复查询。
+        """
+        table = Timetable()
+        if chooseIds is None:
+            chooseIds = list(self.query_selected_courses())
+        for chooseId, course in self.resolve_courses(chooseIds).items():
+            if course:
+                table.add(f"{course['course']}（{chooseId}）", course["date"])
+        return table
+
+    @staticmethod
+    def select_course_url(teachId) -> str:
+        """选课请求的地址，每次调用都带上新的时间戳"""
+        return f"{utils.BASE_URL}/vatuu/CourseStudentAction?setAction={SELECT_ENDPOINT}&teachId={teachId}&isBook=1&tt={utils.get_timestamp()}"
+
+    @staticmethod
+    def parse_select_message(text: str | bytes) -> SelectResult:
+        """从选课响应中取出提示信息，见 select_result.classify"""
+        return classify(text)
 
-        matches = re.findall("<message>(.*?)</message>", res.text)
-        if matches:
-            return matches[0]
-        else:
-            # 从系统还未开放就选课，所以返回信息而非错误
-            return "选课系统未开放"
+    def select_course(self, teachId) -> SelectResult:
+        """根据 teachId 选课，返回带分类的提示信息"""
+        generation = self.generation
+        start = time.perf_counter()
+        try:
+            with tracing.TRACER.span(
+                "request", "http", endpoint=SELECT_ENDPOINT, op="select"
+            ):
+                res = self.transport.request(
+                    self.ss, "GET", self.select_course_url(teachId), op="select"
+                )
+        except Exception as e:
+            metrics.record_request(
+                SELECT_ENDPOINT, time.perf_counter() - start, metrics.error_outcome(e)
+            )
+            raise
+        # 轮询的热点路径：一次扫描同时完成登录过期检查和提示信息提取
+        result = classify(res.content)
+        outcome = "http_5xx" if res.status_code >= 500 else result.status.value
+        metrics.record_request(SELECT_ENDPOINT, time.perf_counter() - start, outcome)
+        if result.status is SelectStatus.EXPIRED:
+            raise utils.LoginExpiredError("登录过期", generation=generation)
+        if res.status_code >= 500:
+            res.raise_for_status()
+        return result
 
     def get_teachId(self, chooseId: str) -> str | None:
         """根据选课编号查询 teachId"""
@@ -95,8 +379,8 @@ class User:
         """删除课程"""
         # 删除课程似乎不需要检查 session expired? 原代码里没有检查，保持原样，但在 request 里会有检查
         # 稳妥起见，统一走 request
-        url = f"{BASE_URL}/vatuu/CourseStudentAction?setAction=delStudentCourseList&listId={listId}&teachId={chooseId}&tt={utils.get_timestamp()}"
-        res = self.request("GET", url)
+        url = f"{utils.BASE_URL}/vatuu/CourseStudentAction?setAction=delStudentCourseList&listId={listId}&teachId={chooseId}&tt={utils.get_timestamp()}"
+        res = self.request("GET", url, op="delete")
         return res.text
 
 
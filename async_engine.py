@@ -0,0 +1,359 @@
+"""异步选课引擎
+
+所有选课任务运行在同一个事件循环上，共用一个带连接池的 aiohttp.ClientSession，
+代替每门课一个线程、多个线程共用一个 requests.Session 的做法。
+超时和连接池大小取自 user.transport，与同步请求一致。
+请求不经过 user.transport 的 adapter，所以只能用于默认的 requests 后端，见 supports。
+
+每个任务按固定节拍发送请求：下一次请求的时间由事件循环的时钟计算，
+而不是请求结束后再 sleep，所以请求耗时不会累积到间隔里。
+任务可以单独取消，取消时正在等待的请求会立即结束。
+
+需要安装可选依赖 aiohttp：pip install aiohttp
+"""
+
+import asyncio
+import concurrent.futures
+import importlib.util
+import time
+
+from requests.adapters import HTTPAdapter
+
+import logs
+import metrics
+import tracing
+import utils
+from opening import OpeningScheduler
+from pacing import PacingController
+from select_result import SelectResult, SelectStatus, classify, status_of
+from Strategy import check_completed
+from User import SELECT_ENDPOINT, User
+from utils import LoginExpiredError
+
+
+def available() -> bool:
+    """是否安装了 aiohttp"""
+    return importlib.util.find_spec("aiohttp") is not None
+
+
+def supports(transport) -> bool:
+    """异步引擎能否代替 transport 发送请求
+
+    只有默认的 requests 后端（HTTPAdapter）可以：httpx、memory 后端以及
+    recorder 的录制、回放 adapter 都需要经过 adapter 本身，只能使用多线程引擎。
+    """
+    return type(transport.adapter) is HTTPAdapter
+
+
+class AsyncSelector:
+    """在一个事件循环中运行多个选课任务
+
+    语义与 Strategy.monitor_loop 一致：check 判断是否完成，
+    成功时可发送邮件，登录过期时重新登录（多个任务同时过期只登录一次）。
+    """
+
+    def __init__(
+        self,
+        user: User,
+        interval: float = 0.5,
+        send_email: bool = False,
+        quiet: bool = False,
+        check=None,
+        max_connections: int | None = None,
+        stagger: bool = True,
+        pacer: PacingController | None = None,
+        scheduler: OpeningScheduler | None = None,
+    ):
+        """
+        参数:
+            user: User 对象实例，使用其登录状态
+            interval: 每个任务的请求间隔（秒）
+            send_email: 是否发送邮件
+            quiet: 静默模式，不显示日志
+            check: 判断是否完成的回调函数，默认为 Strategy.check_completed
+            max_connections: 连接池大小，默认为 user.transport 的连接池大小
+            stagger: 是否在一个间隔内错开各任务的起始时间，避免请求集中在同一时刻
+            pacer: 所有任务共用的请求节奏控制器
+            scheduler: 开放时间调度，系统未开放时按它给出的时间等待
+        """
+        if not supports(user.transport):
+            raise ValueError(
+                f"异步选课引擎不支持 {type(user.transport.adapter).__name__}，"
+                "请使用多线程引擎"
+            )
+        self.user = user
+        self.interval = interval
+        self.send_email = send_email
+        self.quiet = quiet
+        self.check = check or check_completed
+        self.max_connections = max_connections or user.transport.pool_size
+        self.stagger = stagger
+        self.pacer = pacer
+        self.scheduler = scheduler
+        if scheduler is not None and scheduler.clock.transport is None:
+            scheduler.clock.transport = user.transport
+
+        # {任务名称: asyncio.Task}
+        self.tasks: dict[str, asyncio.Task] = {}
+        # {任务名称: 最近一次返回信息}
+        self.results: dict[str, str] = {}
+        self._client = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._relogin_lock: asyncio.Lock | None = None
+        # 异步客户端中 cookie 对应的登录状态代数
+        self._generation = 0
+
+    def _timeout(self, op: str):
+        """与 Transport 相同的 (连接超时, 读取超时)"""
+        import aiohttp
+
+        connect, read = self.user.transport.timeout(op)
+        return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+    def _make_client(self):
+        import aiohttp
+
+        return aiohttp.ClientSession(
+            headers=dict(self.user.ss.headers),
+            # 教务系统可能通过 IP 访问，默认的 CookieJar 不接受 IP 地址的 cookie
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=self._timeout("select"),
+        )
+
+    def _load_cookies(self) -> None:
+        """把 user.ss 的登录状态复制到异步客户端"""
+        from yarl import URL
+
+        self._generation = self.user.generation
+        jar = self._client.cookie_jar
+        jar.clear()
+        jar.update_cookies(
+            {c.name: c.value for c in self.user.ss.cookies}, URL(utils.BASE_URL)
+        )
+
+    async def select_course(self, teachId) -> SelectResult:
+        """根据 teachId 选课，返回带分类的提示信息"""
+        start = time.perf_counter()
+        try:
+            with tracing.TRACER.span(
+                "request", "http", endpoint=SELECT_ENDPOINT, op="select"
+            ):
+                async with self._client.get(User.select_course_url(teachId)) as res:
+                    content = await res.read()
+                    status = res.status
+        except Exception as e:
+            metrics.record_request(
+                SELECT_ENDPOINT, time.perf_counter() - start, metrics.error_outcome(e)
+            )
+            raise
+        result = classify(content)
+        outcome = "http_5xx" if status >= 500 else result.status.value
+        metrics.record_request(SELECT_ENDPOINT, time.perf_counter() - start, outcome)
+        if result.status is SelectStatus.EXPIRED:
+            raise LoginExpiredError("登录过期")
+        if status >= 500:
+            res.raise_for_status()
+        return result
+
+    async def warmup(self, connections: int | None = None) -> None:
+        """并发请求登录页，预先建立连接并留在连接池中"""
+        import aiohttp
+
+        n = min(connections or len(self.tasks) or 1, self.max_connections)
+        url = f"{utils.BASE_URL}/service/login.html"
+
+        # 与选课共用连接池，但不保存 Cookie，以免登录页覆盖登录状态
+        async with aiohttp.ClientSession(
+            connector=self._client.connector,
+            connector_owner=False,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            timeout=self._timeout("warmup"),
+        ) as client:
+
+            async def hit():
+                async with client.get(url) as res:
+                    await res.read()
+
+            results = await asyncio.gather(
+                *(hit() for _ in range(n)), return_exceptions=True
+            )
+        failed = sum(isinstance(r, Exception) for r in results)
+        utils.print_log(f"已预热 {n - failed} 个连接", quiet=self.quiet)
+
+    def _warmup_threadsafe(self) -> None:
+        """供 OpeningScheduler 在其他线程中调用"""
+        asyncio.run_coroutine_threadsafe(self.warmup(), self._loop).result()
+
+    async def _relogin(self, generation: int) -> None:
+        """重新登录，generation 为请求时 cookie 对应的登录状态代数"""
+        async with self._relogin_lock:
+            # 等锁期间其他任务可能已经重新登录并更新过 cookie 了
+            if self._generation != generation:
+                return
+            try:
+                # 同步任务可能已经重新登录过，User.relogin 会直接返回新的登录状态
+                await asyncio.to_thread(self.user.relogin, generation, self.quiet)
+            except Exception as e:
+                utils.print_log(
+                    "重连失败: %s", quiet=self.quiet, level=logs.ERROR, args=(e,)
+                )
+            self._load_cookies()
+
+    async def monitor(self, task_name: str, teachId, delay: float = 0.0) -> str:
+        """持续选课直到完成，返回最后一次的提示信息"""
+        loop = asyncio.get_running_loop()
+        print(f"开始选课: {task_name}")
+        # 每个 asyncio 任务有自己的上下文，本任务的 span 都带上任务名
+        tracing.set_task(task_name)
+
+        next_at = loop.time() + delay
+        attempts = 0
+        metrics.REGISTRY.set("task_done", 0, task=task_name)
+        while True:
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+            if self.pacer is not None:
+                with tracing.TRACER.span("pacer.acquire", "task"):
+                    await self.pacer.acquire_async()
+            attempts += 1
+            metrics.REGISTRY.inc("task_attempts_total", task=task_name)
+            generation = self._generation
+            start = loop.time()
+            closed_delay = None
+            with tracing.TRACER.span(
+                "monitor_loop.iteration", "task", attempt=attempts
+            ):
+                try:
+                    result = await self.select_course(teachId)
+                    if self.pacer is not None:
+                        self.pacer.record(loop.time() - start)
+                    self.results[task_name] = result
+                    utils.print_log(
+                        "%s : %s",
+                        quiet=self.quiet,
+                        task=task_name,
+                        args=(task_name, result),
+                    )
+                    status = status_of(result)
+                    if self.scheduler is not None and status is SelectStatus.NOT_OPEN:
+                        # 可能需要测量时钟偏差，放到线程中避免阻塞事件循环
+                        closed_delay = await asyncio.to_thread(
+                            self.scheduler.closed_delay, self.interval
+                        )
+
+                    if self.check(result):
+                        utils.print_log(
+                            "%s 已完成。",
+                            quiet=self.quiet,
+                            task=task_name,
+                            args=(task_name,),
+                        )
+                        metrics.REGISTRY.set("task_done", 1, task=task_name)
+                        metrics.REGISTRY.observe(
+                            "attempts_until_done",
+                            attempts,
+                            metrics.ATTEMPT_BUCKETS,
+                            status=status.value,
+                        )
+                        if status.succeeded and self.send_email:
+                            # 只加入通知队列，不会阻塞事件循环
+                            self.user.send(f"选课完成: {task_name}", result)
+                        return result
+
+                except LoginExpiredError as e:
+                    if self.pacer is not None:
+                        self.pacer.record(loop.time() - start)
+                    metrics.REGISTRY.inc(
+                        "task_exceptions_total", task=task_name, error=type(e).__name__
+                    )
+                    await self._relogin(generation)
+                except Exception as e:
+                    if self.pacer is not None:
+                        self.pacer.record(loop.time() - start, error=True)
+                    metrics.REGISTRY.inc(
+                        "task_exceptions_total", task=task_name, error=type(e).__name__
+                    )
+                    utils.print_log(
+                        "%s 发生异常: %s",
+                        quiet=self.quiet,
+                        level=logs.WARNING,
+                        task=task_name,
+                        args=(task_name, e),
+                    )
+
+            if closed_delay is not None:
+                next_at = loop.time() + closed_delay
+                continue
+            next_at += self.interval
+            now = loop.time()
+            if next_at < now and self.interval > 0:
+                # 请求比间隔还慢时跳过错过的节拍，不连续补发
+                next_at += ((now - next_at) // self.interval + 1) * self.interval
+
+    async def run(self, teachIds: list[tuple[str, str]]) -> dict[str, str]:
+        """运行所有任务直到全部完成或被取消
+
+        参数:
+            teachIds: [(teachId, 任务名称), ...]
+
+        返回：
+            {任务名称: 最后一次的提示信息}
+        """
+        self._loop = asyncio.get_running_loop()
+        self._relogin_lock = asyncio.Lock()
+        async with self._make_client() as client:
+            self._client = client
+            self._load_cookies()
+            if self.scheduler is not None and self.scheduler.warmup is None:
+                self.scheduler.warmup = self._warmup_threadsafe
+            n = len(teachIds)
+            for i, (tid, name) in enumerate(teachIds):
+                delay = self.interval * i / n if self.stagger else 0.0
+                self.tasks[name] = asyncio.create_task(
+                    self.monitor(name, tid, delay), name=name
+                )
+            try:
+                # 单个任务被取消不影响其他任务
+                await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+            finally:
+                for task in self.tasks.values():
+                    task.cancel()
+                self._client = None
+        return dict(self.results)
+
+    def cancel(self, task_name: str | None = None) -> None:
+        """取消指定任务，None 表示取消全部，可以在其他线程中调用"""
+        if self._loop is None:
+            return
+        if task_name is None:
+            tasks = list(self.tasks.values())
+        else:
+            tasks = [self.tasks[task_name]] if task_name in self.tasks else []
+        for task in tasks:
+            self._loop.call_soon_threadsafe(task.cancel)
+
+
+def run_select_courses(
+    user: User,
+    teachIds: list[tuple[str, str]],
+    interval: float = 0.5,
+    send_email: bool = False,
+    quiet: bool = False,
+    pacer: PacingController | None = None,
+    scheduler: OpeningScheduler | None = None,
+) -> dict[str, str]:
+    """已知 teachId 直接选课（异步），阻塞直到所有任务完成"""
+    # 每个任务都可能同时占用一个连接
+    user.transport.ensure_pool_size(len(teachIds))
+    selector = AsyncSelector(
+        user, interval, send_email, quiet, pacer=pacer, scheduler=scheduler
+    )
+    coro = selector.run(teachIds)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # 当前线程已有事件循环（如 notebook 中）时，在新线程中运行
+    with concurrent.futures.ThreadPoolExecutor(1) as pool:
+        return pool.submit(asyncio.run, coro).result()
@@ -0,0 +1,308 @@
+"""HTTP 后端
+
+User.request、登录流程和查询都通过 requests.Session 发送请求：Session 负责 Cookie、
+请求头、重定向和超时参数，挂在 Session 上的 adapter 负责建立连接、发出请求、读回响应正文，
+解析函数只使用响应的字节内容。所以后端就是 adapter，Transport 按名称创建：
+    requests: urllib3 连接池，原来的行为
+    httpx: httpx（httpcore）连接池，http2=True 时使用 HTTP/2 多路复用，
+        需要安装 httpx，HTTP/2 还需要 h2：pip install httpx[http2]
+    memory: 不经过网络，在当前线程中直接调用 http.server 的请求处理器，
+        如 tests.fake_server 的 FakeTMS.handler_class()，用于测试
+
+默认后端由 config.HTTP_BACKEND 和 config.HTTP2 选择，也可以直接传给 Transport：
+    Transport(backend="httpx", backend_options={"http2": True})
+
+requests 以外的后端提供 pool_stats() 和 resize()，Transport 的连接统计和扩容通过它们完成。
+"""
+
+import email.message
+import http.client
+import importlib.util
+import io
+import threading
+
+import requests
+from requests.adapters import DEFAULT_POOLSIZE, BaseAdapter, HTTPAdapter
+from requests.cookies import extract_cookies_to_jar
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+BACKENDS = ("requests", "httpx", "memory")
+
+
+def available(name: str) -> bool:
+    """后端的依赖是否已安装，name 为 "httpx-http2" 时检查 HTTP/2 的依赖"""
+    if name == "httpx":
+        return importlib.util.find_spec("httpx") is not None
+    if name == "httpx-http2":
+        return available("httpx") and importlib.util.find_spec("h2") is not None
+    return name in BACKENDS
+
+
+def create_adapter(
+    name: str, pool_size: int = DEFAULT_POOLSIZE, **options
+) -> BaseAdapter:
+    """按名称创建后端
+
+    参数:
+        name: 见 BACKENDS
+        pool_size: 连接池中保留的连接数
+        options: 后端的参数，httpx 为 http2，memory 为 handler
+    """
+    if name == "requests":
+        return HTTPAdapter(pool_maxsize=pool_size, **options)
+    if name == "httpx":
+        return HttpxAdapter(pool_size, **options)
+    if name == "memory":
+        if "handler" not in options:
+            raise ValueError(
+                "memory 后端需要传入 handler（http.server 的请求处理器类）"
+            )
+        return MemoryAdapter(**options)
+    raise ValueError(f"未知的 HTTP 后端: {name}，可选 {', '.join(BACKENDS)}")
+
+
+class _Raw:
+    """代替 urllib3 的响应对象，只提供 Session 提取 Set-Cookie 时用到的部分"""
+
+    def __init__(self, msg: email.message.Message):
+        # requests.cookies.extract_cookies_to_jar 读取 raw._original_response.msg
+        self._original_response = self
+        self.msg = msg
+
+    def close(self) -> None:
+        pass
+
+
+def _build_response(
+    adapter: BaseAdapter,
+    request: requests.PreparedRequest,
+    status: int,
+    reason: str,
+    headers: list[tuple[str, str]],
+    content: bytes,
+) -> requests.Response:
+    """用状态、响应头和正文构造与 HTTPAdapter 返回的相同的 requests.Response"""
+    res = requests.Response()
+    res.status_code = status
+    res.reason = reason
+    merged: dict[str, str] = {}
+    msg = email.message.Message()
+    for k, v in headers:
+        # 与 urllib3 一样，重复的响应头用逗号合并
+        merged[k] = f"{merged[k]}, {v}" if k in merged else v
+        msg[k] = v
+    res.headers = CaseInsensitiveDict(merged)
+    res.encoding = get_encoding_from_headers(res.headers)
+    res._content = content
+    res._content_consumed = True
+    res.url = request.url
+    res.request = request
+    res.connection = adapter
+    # Session.send 通过 raw 把 Set-Cookie 存入 session 的 Cookie
+    res.raw = _Raw(msg)
+    extract_cookies_to_jar(res.cookies, request, res.raw)
+    return res
+
+
+def _timeouts(timeout) -> tuple[float | None, float | None]:
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+class HttpxAdapter(BaseAdapter):
+    """用 httpx 的连接池发送请求
+
+    直接使用 httpx.HTTPTransport，不经过 httpx.Client：Cookie 和重定向仍由 requests.Session
+    处理，与 requests 后端的行为一致。请求正文在返回前读完，stream 参数不起作用。
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOLSIZE, http2: bool = False):
+        """
+        参数:
+            pool_size: 连接池中保留的空闲连接数
+            http2: 是否使用 HTTP/2（需要 h2）；明文 HTTP 上服务器不支持时仍使用 HTTP/1.1
+        """
+        super().__init__()
+        if not available("httpx"):
+            raise ImportError("httpx 后端需要安装 httpx：pip install httpx")
+        if http2 and not available("httpx-http2"):
+            raise ImportError("HTTP/2 需要安装 h2：pip install httpx[http2]")
+        import httpx
+
+        self._httpx = httpx
+        self.http2 = http2
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._created = 0
+        self._requests = 0
+        self._transport = self._make_transport(pool_size)
+
+    def _make_transport(self, pool_size: int):
+        httpx = self._httpx
+        # 与 urllib3 一样，连接数不设上限，空闲连接最多保留 pool_size 个，且不按时间过期
+        limits = httpx.Limits(
+            max_connections=None,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=None,
+        )
+        return httpx.HTTPTransport(http2=self.http2, limits=limits)
+
+    def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self._created += 1
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        httpx = self._httpx
+        connect, read = _timeouts(timeout)
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        req = httpx.Request(
+            request.method,
+            request.url,
+            headers=list(request.headers.items()),
+            content=body or b"",
+            extensions={
+                "timeout": {
+                    "connect": connect,
+                    "read": read,
+                    "write": read,
+                    "pool": connect,
+                },
+                "trace": self._trace,
+            },
+        )
+        with self._lock:
+            self._requests += 1
+        try:
+            res = self._transport.handle_request(req)
+            try:
+                content = res.read()
+            finally:
+                res.close()
+        except httpx.ConnectTimeout as e:
+            raise requests.ConnectTimeout(e, request=request) from e
+        except httpx.TimeoutException as e:
+            raise requests.ReadTimeout(e, request=request) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e, request=request) from e
+        return _build_response(
+            self,
+            request,
+            res.status_code,
+            res.reason_phrase,
+            res.headers.multi_items(),
+            content,
+        )
+
+    def pool_stats(self) -> dict[str, int]:
+        """新建的连接数、请求数和空闲连接数"""
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(pool.connections) if pool is not None else []
+        with self._lock:
+            return {
+                "created": self._created,
+                "requests": self._requests,
+                "idle": sum(conn.is_idle() for conn in connections),
+            }
+
+    def resize(self, pool_size: int) -> None:
+        """改变保留的空闲连接数，已有的连接继续使用"""
+        pool = getattr(self._transport, "_pool", None)
+        if pool is not None and hasattr(pool, "_max_keepalive_connections"):
+            # httpcore 的连接池在归还连接时才按这个上限关闭多余的空闲连接
+            pool._max_keepalive_connections = pool_size
+        else:
+            # 换用新的 transport，旧的连接池不主动关闭，进行中的请求可以正常结束
+            self._transport = self._make_transport(pool_size)
+        self.pool_size = pool_size
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class _Socket:
+    """给请求处理器用的内存 socket：从请求字节中读取，把响应写入缓冲区"""
+
+    def __init__(self, data: bytes = b""):
+        self.data = data
+        self.output = io.BytesIO()
+
+    def makefile(self, mode: str, *args, **kwargs):
+        return io.BytesIO(self.data)
+
+    def sendall(self, data) -> None:
+        self.output.write(data)
+
+    def settimeout(self, timeout) -> None:
+        pass
+
+    def setsockopt(self, *args) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryAdapter(BaseAdapter):
+    """在当前线程中把请求交给 http.server 的请求处理器，不经过网络
+
+    请求序列化为 HTTP/1.1 报文，处理器的输出用 http.client 解析，
+    处理器看到的与真实连接上的完全相同。超时参数不起作用。
+    """
+
+    def __init__(self, handler, server=None, client_address=("127.0.0.1", 0)):
+        """
+        参数:
+            handler: BaseHTTPRequestHandler 的子类
+            server: 传给处理器的 server 参数
+            client_address: 处理器看到的客户端地址
+        """
+        super().__init__()
+        self.handler = handler
+        self.server = server
+        self.client_address = client_address
+        self._lock = threading.Lock()
+        self._requests = 0
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        parts = requests.utils.urlparse(request.url)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        headers = {"Host": parts.netloc, **request.headers}
+        if body:
+            headers["Content-Length"] = str(len(body))
+        head = f"{request.method} {target} HTTP/1.1\r\n" + "".join(
+            f"{k}: {v}\r\n" for k, v in headers.items()
+        )
+        sock = _Socket(head.encode("latin-1") + b"\r\n" + body)
+        with self._lock:
+            self._requests += 1
+        try:
+            self.handler(sock, self.client_address, self.server)
+            res = http.client.HTTPResponse(_Socket(sock.output.getvalue()))
+            res.begin()
+            content = res.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise requests.ConnectionError(e, request=request) from e
+        return _build_response(
+            self, request, res.status, res.reason, res.getheaders(), content
+        )
+
+    def pool_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"created": 0, "requests": self._requests, "idle": 0}
+
+    def resize(self, pool_size: int) -> None:
+        pass
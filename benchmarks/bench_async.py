@@ -0,0 +1,215 @@
+"""多线程与异步选课引擎对比（本地模拟服务器）
+
+模拟服务器在子进程中运行（所有课程已满），避免与被测代码争用 GIL。
+两种引擎各运行 N 个选课任务若干秒，统计：
+    - 请求吞吐量（请求/秒）
+    - 同一任务相邻两次请求的间隔与目标间隔的偏差（节拍误差）及其标准差（抖动）
+    - 运行期间的线程数和进程常驻内存增量
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_async [--tasks 40] [--interval 0.2] [--latency 0.02]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import async_engine
+import Strategy
+import utils
+from tests.fake_server import EMAIL_CONFIG
+from User import User
+
+
+def rss_kib() -> int:
+    """当前进程常驻内存（KiB），仅 Linux"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def report(
+    name: str,
+    stamps: dict[str, list[float]],
+    interval: float,
+    seconds: float,
+    threads: int,
+    rss_delta: int,
+) -> None:
+    gaps = [b - a for ts in stamps.values() for a, b in zip(ts, ts[1:])]
+    errors = sorted(abs(g - interval) * 1000 for g in gaps)
+    total = sum(len(ts) for ts in stamps.values())
+    print(f"{name}")
+    print(f"    吞吐量        {total / seconds:8.1f} 请求/秒")
+    print(
+        f"    间隔          平均 {statistics.mean(gaps) * 1000:7.2f} ms"
+        f"  标准差 {statistics.pstdev(gaps) * 1000:6.2f} ms（目标 {interval * 1000:.0f} ms）"
+    )
+    print(
+        f"    节拍误差      p50 {errors[len(errors) // 2]:7.2f} ms"
+        f"  p99 {errors[int(len(errors) * 0.99)]:7.2f} ms"
+    )
+    print(f"    线程数        {threads}")
+    print(f"    常驻内存增量  {rss_delta:8d} KiB")
+
+
+def bench_threads(
+    user: User, teachIds: list[tuple[str, str]], interval: float, seconds: float
+) -> None:
+    stamps: dict[str, list[float]] = {name: [] for _, name in teachIds}
+    stop = threading.Event()
+
+    def recorded(name: str):
+        def func(teachId):
+            stamps[name].append(time.perf_counter())
+            return user.select_course(teachId)
+
+        return func
+
+    rss0 = rss_kib()
+    workers = [
+        threading.Thread(
+            target=Strategy.monitor_loop,
+            kwargs={
+                "user": user,
+                "task_name": name,
+                "func": recorded(name),
+                "interval": interval,
+                "args": (tid,),
+                "check": lambda _: stop.is_set(),
+                "quiet": True,
+            },
+        )
+        for tid, name in teachIds
+    ]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in workers:
+            t.start()
+        time.sleep(seconds)
+        threads = threading.active_count()
+        rss_delta = rss_kib() - rss0
+        stop.set()
+        for t in workers:
+            t.join()
+    report("多线程 monitor_loop", stamps, interval, seconds, threads, rss_delta)
+
+
+class _RecordingSelector(async_engine.AsyncSelector):
+    def __init__(self, *args, stamps: dict[str, list[float]], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stamps = stamps
+        self.names: dict[str, str] = {}
+
+    async def select_course(self, teachId) -> str:
+        self.stamps[self.names[teachId]].append(time.perf_counter())
+        return await super().select_course(teachId)
+
+
+def bench_async(
+    user: User, teachIds: list[tuple[str, str]], interval: float, seconds: float
+) -> None:
+    stamps: dict[str, list[float]] = {name: [] for _, name in teachIds}
+    selector = _RecordingSelector(user, interval, quiet=True, stamps=stamps)
+    selector.names = {tid: name for tid, name in teachIds}
+    sampled = {}
+
+    async def main():
+        loop = asyncio.get_running_loop()
+
+        def sample():
+            sampled["threads"] = threading.active_count()
+            sampled["rss"] = rss_kib()
+            selector.cancel()
+
+        loop.call_later(seconds, sample)
+        await selector.run(teachIds)
+
+    # 先导入 aiohttp，内存增量只统计任务本身
+    importlib.import_module("aiohttp")
+
+    rss0 = rss_kib()
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(main())
+    report(
+        "异步 AsyncSelector",
+        stamps,
+        interval,
+        seconds,
+        sampled["threads"],
+        sampled["rss"] - rss0,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=40, help="选课任务数")
+    parser.add_argument(
+        "--interval", type=float, default=0.2, help="每个任务的请求间隔（秒）"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="服务器固定延迟（秒）"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.01, help="服务器随机延迟（秒）"
+    )
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if not async_engine.available():
+        print("未安装 aiohttp，无法运行异步引擎：pip install aiohttp")
+        return
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "tests.fake_server",
+            "--port",
+            "0",
+            "--latency",
+            str(args.latency),
+            "--jitter",
+            str(args.jitter),
+            "--extra-courses",
+            str(max(0, args.tasks - 5)),
+            "--full",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # 第一行输出为「模拟教务系统已启动：{地址}」
+        base_url = server.stdout.readline().strip().split("：", 1)[1]
+        utils.set_base_url(base_url)
+        print(
+            f"模拟服务器：{base_url}（延迟 {args.latency}s + 抖动 {args.jitter}s），"
+            f"{args.tasks} 个任务，间隔 {args.interval}s，各运行 {args.seconds}s\n"
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+            user.prefetch_catalog()
+        rows = sorted(user.catalog._rows.values(), key=lambda item: item[0].chooseId)
+        teachIds = [(row.teachId, row.chooseId) for row, _ in rows][: args.tasks]
+
+        bench_threads(user, teachIds, args.interval, args.seconds)
+        print()
+        bench_async(user, teachIds, args.interval, args.seconds)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""HTTP 后端对比
+
+对每个后端（见 backends.py）登录后，对已满的课程持续选课：
+    1. 单线程依次请求的延迟分位数
+    2. --threads 个线程同时请求 --seconds 秒的吞吐量
+两项都统计每个请求的 CPU 时间。requests 和 httpx 后端请求子进程中的模拟服务器，
+CPU 时间只含客户端；memory 后端在当前线程中直接调用模拟服务器的请求处理器，
+CPU 时间包括服务器的处理。安装了 h2 时另外测试 httpx 的 HTTP/2 选项。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_backends [--requests 500] [--threads 8] [--seconds 3] [--latency 0]
+"""
+
+import argparse
+import contextlib
+import io
+import subprocess
+import sys
+import threading
+import time
+
+import backends
+import logs
+import utils
+from benchmarks.bench_e2e import percentiles
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from transport import Transport
+from User import User
+
+FULL = "B0870"
+
+
+def login(transport: Transport) -> tuple[User, str]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        user = User("2022000000", "password", EMAIL_CONFIG, transport=transport)
+    return user, user.get_teachId(FULL)
+
+
+def bench_latency(user: User, teachId: str, n: int) -> tuple[list[float], float]:
+    samples = []
+    cpu = time.process_time()
+    for _ in range(n):
+        t0 = time.perf_counter()
+        user.select_course(teachId)
+        samples.append(time.perf_counter() - t0)
+    return samples, (time.process_time() - cpu) / n
+
+
+def bench_throughput(
+    user: User, teachId: str, threads: int, seconds: float
+) -> tuple[float, float]:
+    user.transport.ensure_pool_size(threads)
+    counts = [0] * threads
+    stop = threading.Event()
+
+    def worker(i: int):
+        while not stop.is_set():
+            user.select_course(teachId)
+            counts[i] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    cpu, t0 = time.process_time(), time.perf_counter()
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+    elapsed, cpu = time.perf_counter() - t0, time.process_time() - cpu
+    total = sum(counts)
+    return total / elapsed, cpu / total
+
+
+def run(name: str, transport: Transport, args) -> None:
+    user, teachId = login(transport)
+    # 先建立连接，不计入延迟
+    for _ in range(10):
+        user.select_course(teachId)
+    samples, latency_cpu = bench_latency(user, teachId, args.requests)
+    rate, rate_cpu = bench_throughput(user, teachId, args.threads, args.seconds)
+    stats = transport.stats()
+    print(f"{name}")
+    print(f"    单线程  {percentiles(samples)}  CPU {latency_cpu * 1e6:6.0f} us/请求")
+    print(
+        f"    {args.threads} 线程  {rate:7.0f} 请求/秒  CPU {rate_cpu * 1e6:6.0f} us/请求"
+        f"  新建连接 {stats['created']} 个"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    logs.LOG.console = False
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "tests.fake_server",
+            "--port",
+            "0",
+            "--latency",
+            str(args.latency),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # 第一行输出为「模拟教务系统已启动：{地址}」
+        base_url = server.stdout.readline().strip().split("：", 1)[1]
+        utils.set_base_url(base_url)
+        print(f"服务器延迟 {args.latency * 1e3:.0f} ms\n")
+        run("requests", Transport(backend="requests"), args)
+        if backends.available("httpx"):
+            run("httpx", Transport(backend="httpx"), args)
+        else:
+            print("httpx 未安装，跳过：pip install httpx")
+        if backends.available("httpx-http2"):
+            # 模拟服务器只支持 HTTP/1.1，明文连接上不会协商到 HTTP/2，这里只比较开销
+            options = {"http2": True}
+            run(
+                "httpx (http2=True)",
+                Transport(backend="httpx", backend_options=options),
+                args,
+            )
+        else:
+            print("h2 未安装，跳过 httpx 的 HTTP/2 选项：pip install httpx[http2]")
+    finally:
+        server.terminate()
+        server.wait()
+
+    tms = FakeTMS(latency=args.latency, seed=0)
+    utils.set_base_url("http://tms.local/TMS")
+    options = {"handler": tms.handler_class()}
+    run("memory", Transport(backend="memory", backend_options=options), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""验证码模型加载基准测试
+
+分别在独立子进程中测量：
+    1. import utils 的耗时（模型延迟加载后应当很短）
+    2. 第一次识别的耗时（包含模型加载）
+    3. 后台预热后，第一次识别的剩余等待时间
+    4. 旧做法：导入时直接构造 DdddOcr 的耗时
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_captcha
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 生成一张简单的验证码图片供识别
+_MAKE_IMAGE = """
+import io
+from PIL import Image, ImageDraw
+_img = Image.new("RGB", (80, 30), "white")
+ImageDraw.Draw(_img).text((10, 8), "a1b2", fill="black")
+_buf = io.BytesIO()
+_img.save(_buf, format="JPEG")
+IMG = _buf.getvalue()
+"""
+
+CASES = {
+    "import_utils": """
+import time
+t0 = time.perf_counter()
+import utils
+result = {"seconds": time.perf_counter() - t0}
+""",
+    "first_solve": _MAKE_IMAGE
+    + """
+import time
+import utils
+from captcha import solver
+t0 = time.perf_counter()
+solver.classification(IMG)
+result = {"seconds": time.perf_counter() - t0}
+""",
+    "first_solve_after_warmup": _MAKE_IMAGE
+    + """
+import time
+import utils
+from captcha import solver
+solver.warmup()
+# 模拟请求登录页与验证码的网络耗时
+time.sleep(1.5)
+t0 = time.perf_counter()
+solver.classification(IMG)
+result = {"seconds": time.perf_counter() - t0}
+""",
+    "eager_import_baseline": """
+import time
+t0 = time.perf_counter()
+import ddddocr
+ddddocr.DdddOcr(show_ad=False)
+result = {"seconds": time.perf_counter() - t0}
+""",
+}
+
+
+def run_case(code: str) -> float:
+    code += "\nimport json, sys\nsys.stdout.write('\\n' + json.dumps(result))\n"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])["seconds"]
+
+
+def main(repeat: int = 3) -> None:
+    for name, code in CASES.items():
+        samples = [run_case(code) for _ in range(repeat)]
+        best = min(samples)
+        mean = sum(samples) / len(samples)
+        print(f"{name:<28} best {best * 1000:8.1f} ms   mean {mean * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
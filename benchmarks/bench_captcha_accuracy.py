@@ -0,0 +1,108 @@
+"""验证码识别准确率与耗时基准测试（离线）
+
+对一个目录中保存的验证码图片，比较单次识别与多轮投票识别的
+准确率、本地拒绝率和耗时，并给出每种预处理单独使用时的准确率，
+方便调整 captcha.VARIANTS 而不必请求服务器。
+
+图片文件名（不含扩展名）即正确答案，允许用下划线追加序号，例如：
+    a1b2.jpg、a1b2_3.jpg
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_captcha_accuracy 验证码目录 [--ignore-case]
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from captcha import CaptchaSolver, preprocess
+
+SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".bmp"}
+
+
+def load_samples(directory: Path) -> list[tuple[str, bytes]]:
+    samples = []
+    for path in sorted(directory.iterdir()):
+        if path.suffix.lower() in SUFFIXES:
+            label = path.stem.split("_")[0]
+            samples.append((label, path.read_bytes()))
+    return samples
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(name: str, correct: int, rejected: int, total: int, times: list[float]):
+    print(
+        f"{name:<12} 准确率 {correct / total:6.1%}  "
+        f"拒绝率 {rejected / total:6.1%}  "
+        f"平均 {statistics.mean(times) * 1000:7.1f} ms  "
+        f"p95 {percentile(times, 0.95) * 1000:7.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=Path, help="验证码图片目录")
+    parser.add_argument("--ignore-case", action="store_true", help="忽略大小写比较")
+    args = parser.parse_args()
+
+    samples = load_samples(args.directory)
+    if not samples:
+        print(f"{args.directory} 中没有图片")
+        return
+
+    def same(a: str | None, b: str) -> bool:
+        if a is None:
+            return False
+        return a.lower() == b.lower() if args.ignore_case else a == b
+
+    solver = CaptchaSolver()
+    # 先加载模型，避免计入第一次识别
+    solver.classification(samples[0][1])
+
+    print(f"样本数：{len(samples)}")
+
+    # 单次识别（旧做法）
+    correct = rejected = 0
+    times = []
+    for label, img in samples:
+        t0 = time.perf_counter()
+        text = solver.classification(img).strip()
+        times.append(time.perf_counter() - t0)
+        rejected += not solver.is_valid(text)
+        correct += same(text, label)
+    report("single", correct, rejected, len(samples), times)
+
+    # 多轮投票
+    correct = rejected = 0
+    times = []
+    per_variant = {name: 0 for name in solver.variants}
+    for label, img in samples:
+        t0 = time.perf_counter()
+        text, answers = solver.vote(img)
+        times.append(time.perf_counter() - t0)
+        rejected += text is None
+        correct += same(text, label)
+        for name, answer in answers.items():
+            per_variant[name] += same(answer, label)
+    report("vote", correct, rejected, len(samples), times)
+
+    # 预处理本身的耗时
+    times = []
+    for _, img in samples:
+        t0 = time.perf_counter()
+        preprocess(img, solver.variants)
+        times.append(time.perf_counter() - t0)
+    print(f"预处理平均耗时 {statistics.mean(times) * 1000:.2f} ms")
+
+    print("各预处理单独的准确率：")
+    for name, n in per_variant.items():
+        print(f"    {name:<10} {n / len(samples):6.1%}")
+
+
+if __name__ == "__main__":
+    main()
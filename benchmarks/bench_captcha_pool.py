@@ -0,0 +1,94 @@
+"""并行重新登录对轮询延迟的影响（本地模拟服务器）
+
+一个线程按固定间隔选课（轮询），同时若干线程不断执行完整的登录流程，
+对比验证码在本进程识别（captcha.solver）与在进程池中识别（CaptchaPool）时
+轮询请求的延迟分位数，以及期间完成的登录次数。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_captcha_pool [--logins 4] [--workers 2] [--seconds 5]
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+import logs
+import utils
+from benchmarks.bench_e2e import percentiles
+from captcha import CaptchaPool, solver
+from tests.fake_server import EMAIL_CONFIG, FakeTMS, _captcha_image
+from User import User
+
+
+def run(user: User, teachId: str, captcha_solver, logins: int, seconds: float):
+    """返回 (轮询延迟列表, 完成的登录次数)"""
+    stop = threading.Event()
+    samples: list[float] = []
+    done = [0] * logins
+
+    def poll():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            user.select_course(teachId)
+            samples.append(time.perf_counter() - t0)
+            time.sleep(0.02)
+
+    def login(i: int):
+        while not stop.is_set():
+            utils.LoginPipeline(
+                "2022000000", "password", captcha_solver=captcha_solver
+            ).run()
+            done[i] += 1
+
+    threads = [threading.Thread(target=poll)]
+    if captcha_solver is not None:
+        threads += [threading.Thread(target=login, args=(i,)) for i in range(logins)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return samples, sum(done)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=4, help="并行登录的线程数")
+    parser.add_argument("--workers", type=int, default=2, help="进程池的进程数")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    tms = FakeTMS(latency=0.005, seed=0)
+    course = next(iter(tms.courses.values()))
+    course.selected = course.capacity
+    utils.set_base_url(tms.start())
+    pool = CaptchaPool(workers=args.workers)
+    # 不输出每次登录的日志
+    logs.LOG.console = False
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+        # 两种识别器都先加载好模型，只比较识别本身的影响
+        img = _captcha_image("a1b2")
+        pool.warmup()
+        pool.solve(img)
+        solver.solve(img)
+
+        cases = [("无登录", None), ("本进程识别", solver), ("CaptchaPool", pool)]
+        for name, captcha_solver in cases:
+            samples, logins = run(
+                user, course.teachId, captcha_solver, args.logins, args.seconds
+            )
+            print(f"{name:<12}轮询 {percentiles(samples)}")
+            if captcha_solver is not None:
+                print(f"{'':<12}完成登录 {logins} 次")
+    finally:
+        pool.close()
+        tms.stop()
+
+
+if __name__ == "__main__":
+    main()
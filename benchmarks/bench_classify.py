@@ -0,0 +1,126 @@
+"""选课响应处理的 CPU 开销（离线）
+
+对比每个选课响应的处理开销：
+    - 旧实现：res.text 解码，三次子串扫描检查登录过期，再用 re.findall 取出 <message>，
+      monitor_loop 再用子串判断是否完成、是否成功、是否未开放
+    - select_result.classify：在 res.content 上查找，只解码提示信息，
+      monitor_loop 直接读取 status
+
+响应分为声明了 charset、没有声明 charset 和没有 Content-Type 三种情况。
+后两种情况下 res.text 分别按 ISO-8859-1 解码（中文变成乱码），或对整个响应做编码探测。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_classify [--repeat 2000]
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from select_result import SelectStatus, classify
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _xml(message: str) -> bytes:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f"<root><message>{message}</message></root>"
+    ).encode()
+
+
+BODIES = {
+    "选课成功": _xml("选课成功"),
+    "人数已满": _xml("选课失败：该课程人数已满"),
+    "系统未开放": (ROOT / "test_resourse" / "选课系统未开放.html").read_bytes(),
+    "登录过期": (
+        "<html><body><script>alert('您还未登录或登录已超时，"
+        "请重新登录');</script>未登录</body></html>"
+    ).encode(),
+}
+
+CONTENT_TYPES = {
+    "声明 charset": "text/xml;charset=utf-8",
+    "未声明 charset": "text/xml",
+    "无 Content-Type": None,
+}
+
+
+def make_response(body: bytes, content_type: str | None) -> requests.Response:
+    """与 requests.adapters.HTTPAdapter.build_response 相同的方式构造响应"""
+    res = requests.Response()
+    res.status_code = 200
+    res.headers = CaseInsensitiveDict()
+    if content_type:
+        res.headers["Content-Type"] = content_type
+    res.encoding = get_encoding_from_headers(res.headers)
+    res._content = body
+    return res
+
+
+def legacy(res: requests.Response) -> tuple[str, bool, bool, bool]:
+    """旧实现：User.request 中的 check_session_expired、select_course 中的正则，
+    以及 monitor_loop 中的字符串判断"""
+    text = res.text
+    if "未登陆" in text or "未登录" in text or "没有操作权限" in text:
+        return "登录过期"
+    matches = re.findall("<message>(.*?)</message>", text)
+    result = matches[0] if matches else "选课系统未开放"
+    return (
+        result,
+        "未开放" in result,
+        any(s in result for s in ["选课成功", "选课申请成功", "冲突"]),
+        "成功" in result,
+    )
+
+
+def new(res: requests.Response) -> tuple[str, bool, bool, bool]:
+    result = classify(res.content)
+    status = result.status
+    return (
+        result,
+        status is SelectStatus.NOT_OPEN,
+        status.completed,
+        status.succeeded,
+    )
+
+
+def measure(func, res: requests.Response, repeat: int) -> float:
+    """每个响应的平均耗时（微秒）"""
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        func(res)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'响应':<10}{'Content-Type':<16}{'旧实现':>12}{'classify':>12}  加速")
+    for body_name, body in BODIES.items():
+        for ct_name, content_type in CONTENT_TYPES.items():
+            res = make_response(body, content_type)
+            # 编码探测较慢，减少重复次数
+            repeat = args.repeat if content_type else max(1, args.repeat // 20)
+            old_us = measure(legacy, res, repeat)
+            new_us = measure(new, res, args.repeat)
+            note = (
+                ""
+                if legacy(res)[0] == new(res)[0]
+                else f"  旧实现结果错误：{legacy(res)[0]!r}"
+            )
+            print(
+                f"{body_name:<10}{ct_name:<16}{old_us:10.1f}us{new_us:10.1f}us"
+                f"  {old_us / new_us:5.1f}x{note}"
+            )
+
+
+if __name__ == "__main__":
+    main()
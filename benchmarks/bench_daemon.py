@@ -0,0 +1,216 @@
+"""冷启动到第一个选课请求的耗时
+
+在模拟服务器上，从启动新进程到服务器收到第一个选课请求：
+    1. notebook：导入 marimo（已安装时）和 main.py 第一个单元格的模块，登录后选课
+    2. daemon 冷启动：python daemon.py serve，启动后发送 select 命令
+    3. daemon 已运行：用 python daemon.py select 添加任务（包括客户端进程的启动），
+       以及直接通过 socket 发送命令
+最后演示运行中修改间隔和取消任务。
+
+各进程在临时目录中运行，登录状态文件不会写入项目目录。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_daemon [--repeat 3]
+"""
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import daemon
+from tests.fake_server import FakeTMS
+
+ROOT = Path(__file__).resolve().parent.parent
+
+NOTEBOOK = """
+try:
+    import marimo
+except ImportError:
+    pass
+import Strategy as tasks
+from config import email_config, password, username
+from User import User
+
+user = User(username, password, email_config, session_file=".session.json")
+user.select_course({teachId!r})
+"""
+
+
+class FirstSelect:
+    """记录服务器收到选课请求的时刻"""
+
+    def __init__(self, tms: FakeTMS):
+        self.times: list[float] = []
+        self.event = threading.Event()
+        select = tms.select
+
+        def timed_select(*args):
+            self.times.append(time.perf_counter())
+            self.event.set()
+            return select(*args)
+
+        tms.select = timed_select
+
+    def reset(self) -> None:
+        self.times.clear()
+        self.event.clear()
+
+    def wait(self, timeout: float = 60) -> float:
+        if not self.event.wait(timeout):
+            raise TimeoutError("没有收到选课请求")
+        return self.times[0]
+
+
+def spawn(args: list[str], cwd: str, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(address: str, proc: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("daemon 已退出")
+        try:
+            daemon.request(address, {"cmd": "status"}, timeout=1)
+            return
+        except OSError:
+            time.sleep(0.01)
+    raise TimeoutError("daemon 没有启动")
+
+
+def bench_notebook(first: FirstSelect, teachId: str, env: dict) -> float:
+    with tempfile.TemporaryDirectory() as cwd:
+        first.reset()
+        t0 = time.perf_counter()
+        proc = spawn(["-c", NOTEBOOK.format(teachId=teachId)], cwd, env)
+        seconds = first.wait() - t0
+        proc.wait()
+    return seconds
+
+
+def bench_daemon_cold(first: FirstSelect, teachId: str, env: dict) -> float:
+    with tempfile.TemporaryDirectory() as cwd:
+        address = os.path.join(cwd, "d.sock")
+        first.reset()
+        t0 = time.perf_counter()
+        proc = spawn([str(ROOT / "daemon.py"), "--socket", address, "serve"], cwd, env)
+        try:
+            wait_ready(address, proc)
+            daemon.request(address, {"cmd": "select", "teachId": teachId})
+            seconds = first.wait() - t0
+            daemon.request(address, {"cmd": "shutdown"})
+            proc.wait(10)
+        finally:
+            proc.kill()
+    return seconds
+
+
+def bench_daemon_warm(
+    first: FirstSelect, teachIds: list[str], env: dict
+) -> tuple[list[float], list[float]]:
+    cli, direct = [], []
+    with tempfile.TemporaryDirectory() as cwd:
+        address = os.path.join(cwd, "d.sock")
+        proc = spawn([str(ROOT / "daemon.py"), "--socket", address, "serve"], cwd, env)
+        try:
+            wait_ready(address, proc)
+            daemon.request(address, {"cmd": "login"})
+            for i, teachId in enumerate(teachIds):
+                first.reset()
+                t0 = time.perf_counter()
+                if i % 2 == 0:
+                    args = ["--socket", address, "select", "--teachId", teachId]
+                    spawn([str(ROOT / "daemon.py"), *args], cwd, env).wait()
+                    cli.append(first.wait() - t0)
+                else:
+                    daemon.request(address, {"cmd": "select", "teachId": teachId})
+                    direct.append(first.wait() - t0)
+            demo_control(address, first)
+            daemon.request(address, {"cmd": "shutdown"})
+            proc.wait(10)
+        finally:
+            proc.kill()
+    return cli, direct
+
+
+def demo_control(address: str, first: FirstSelect) -> None:
+    """已满的课程持续重试，运行中修改间隔后取消"""
+    task = daemon.request(
+        address,
+        {"cmd": "select", "chooseId": "Z0002", "name": "已满", "interval": 0.05},
+    )["task"]
+
+    def rate(seconds: float) -> float:
+        first.reset()
+        time.sleep(seconds)
+        return len(first.times) / seconds
+
+    fast = rate(0.5)
+    daemon.request(address, {"cmd": "interval", "id": task["id"], "seconds": 0.2})
+    time.sleep(0.25)
+    slow = rate(1.0)
+    daemon.request(address, {"cmd": "cancel", "id": task["id"]})
+    time.sleep(0.1)
+    stopped = rate(0.5)
+    status = daemon.request(address, {"cmd": "status"})
+    state = next(t for t in status["tasks"] if t["id"] == task["id"])
+    print(
+        f"已满课程的任务：间隔 0.05 秒时 {fast:.1f} 次/秒，改为 0.2 秒后 {slow:.1f} 次/秒，"
+        f"取消后 {stopped:.1f} 次/秒（状态 {state['state']}，共尝试 {state['attempts']} 次）"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Z0002 是另一门课中已满的开课，用于演示修改间隔和取消
+    tms = FakeTMS(seed=0, extra_courses=5)
+    base_url = tms.start()
+    first = FirstSelect(tms)
+    teachId = tms.courses["B0872"].teachId
+    env = {
+        **os.environ,
+        "SWJTU_BASE_URL": base_url,
+        "PYTHONPATH": str(ROOT),
+    }
+    try:
+        if importlib.util.find_spec("marimo") is None:
+            print("marimo 未安装，notebook 路径不含导入 marimo 的耗时")
+        results = {
+            "notebook": [
+                bench_notebook(first, teachId, env) for _ in range(args.repeat)
+            ],
+            "daemon 冷启动": [
+                bench_daemon_cold(first, teachId, env) for _ in range(args.repeat)
+            ],
+        }
+        warm_ids = [tms.courses[c].teachId for c in ("B0868", "B0869", "B0871")]
+        cli, direct = bench_daemon_warm(first, warm_ids * args.repeat, env)
+        results["daemon 已运行（命令行）"] = cli
+        results["daemon 已运行（socket）"] = direct
+        for name, samples in results.items():
+            samples.sort()
+            print(
+                f"{name:<24}中位数 {samples[len(samples) // 2] * 1e3:8.1f} ms"
+                f"  最大 {samples[-1] * 1e3:8.1f} ms"
+            )
+    finally:
+        tms.stop()
+
+
+if __name__ == "__main__":
+    main()
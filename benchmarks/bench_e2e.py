@@ -0,0 +1,203 @@
+"""端到端基准测试（本地模拟服务器）
+
+启动 tests.fake_server，把 utils.BASE_URL 指向它，然后测量：
+    - 登录耗时（含各阶段耗时）
+    - User / Strategy 各入口的单次请求延迟分位数
+    - 多线程持续选课时的请求吞吐量（请求/秒）
+    - 多个选课任务运行中登录过期时，重新登录的次数
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_e2e [--latency 0.02] [--jitter 0.01] [--threads 8]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import threading
+import time
+
+import Strategy
+import utils
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from User import User
+
+
+def percentiles(samples: list[float]) -> str:
+    samples = sorted(samples)
+
+    def q(p: float) -> float:
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+    return (
+        f"n={len(samples):<5d} p50 {q(0.5):7.2f} ms  p90 {q(0.9):7.2f} ms  "
+        f"p99 {q(0.99):7.2f} ms  max {samples[-1] * 1000:7.2f} ms"
+    )
+
+
+def timed(func, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def bench_login(repeat: int) -> User:
+    samples = []
+    phases: dict[str, list[float]] = {}
+    user = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+        samples.append(time.perf_counter() - t0)
+        for phase, seconds in user.login_timings.items():
+            phases.setdefault(phase, []).append(seconds)
+
+    print(f"登录                    {percentiles(samples)}")
+    for phase, values in phases.items():
+        print(f"    {phase:<20} 平均 {statistics.mean(values) * 1000:7.2f} ms")
+    assert user is not None
+    return user
+
+
+def bench_operations(user: User, tms: FakeTMS, repeat: int) -> None:
+    chooseIds = list(tms.courses)[:5]
+    code = tms.courses[chooseIds[0]].course_code
+    teachId = tms.courses[chooseIds[0]].teachId
+
+    def select_and_delete():
+        user.select_course(teachId)
+        with contextlib.redirect_stdout(io.StringIO()):
+            Strategy.del_courses(user, [chooseIds[0]], quiet=True)
+
+    cases = [
+        ("query_by_chooseId", lambda: user.query_by_chooseId(chooseIds[0])),
+        ("query_selected_courses", user.query_selected_courses),
+        ("select_course", lambda: user.select_course(teachId)),
+        (
+            "Strategy.query_by_course_code",
+            lambda: Strategy.query_by_course_code(user, code),
+        ),
+        ("Strategy.query_teachIds", lambda: Strategy.query_teachIds(user, chooseIds)),
+        ("select + Strategy.del_courses", select_and_delete),
+    ]
+    for name, func in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            samples = timed(func, repeat)
+        print(f"{name:<30}{percentiles(samples)}")
+
+
+def bench_throughput(user: User, tms: FakeTMS, threads: int, seconds: float) -> None:
+    """多个线程持续对已满的课程选课，统计请求吞吐量"""
+    course = next(iter(tms.courses.values()))
+    course.selected = course.capacity
+    stop = threading.Event()
+    latencies: list[list[float]] = [[] for _ in range(threads)]
+
+    def worker(samples: list[float]):
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            user.select_course(course.teachId)
+            samples.append(time.perf_counter() - t0)
+
+    workers = [
+        threading.Thread(target=worker, args=(latencies[i],)) for i in range(threads)
+    ]
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+
+    samples = [s for per_thread in latencies for s in per_thread]
+    print(
+        f"{threads} 线程持续选课 {seconds:.0f} 秒：{len(samples) / seconds:8.1f} 请求/秒"
+    )
+    print(f"    单请求延迟             {percentiles(samples)}")
+
+
+def bench_run_select_courses(user: User, tms: FakeTMS) -> None:
+    """Strategy.run_select_courses 从开始到全部选上的耗时"""
+    for c in tms.courses.values():
+        c.selected = 0
+    for s in tms.sessions.values():
+        s.selected.clear()
+    chooseIds = list(tms.courses)[:1]
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Strategy.run_select_courses(user, chooseIds, interval=0.05)
+    elapsed = time.perf_counter() - t0
+    print(
+        f"Strategy.run_select_courses（{len(chooseIds)} 门）：{elapsed * 1000:.1f} ms"
+    )
+
+
+def bench_relogin(user: User, tms: FakeTMS, threads: int) -> None:
+    """threads 个 monitor_loop 运行中让登录状态过期，统计重新登录次数"""
+    course = next(iter(tms.courses.values()))
+    course.selected = course.capacity
+    stop = threading.Event()
+    workers = [
+        threading.Thread(
+            target=Strategy.monitor_loop,
+            kwargs={
+                "user": user,
+                "task_name": f"任务{i}",
+                "func": user.select_course,
+                "interval": 0.05,
+                "args": (course.teachId,),
+                "check": lambda _: stop.is_set(),
+                "quiet": True,
+            },
+        )
+        for i in range(threads)
+    ]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in workers:
+            t.start()
+        time.sleep(0.3)
+        logins, relogins = tms.logins, user.relogin_count
+        tms.expire_sessions()
+        time.sleep(2.0)
+        stop.set()
+        for t in workers:
+            t.join()
+    print(
+        f"{threads} 个任务运行中登录过期：服务器登录 {tms.logins - logins} 次，"
+        f"relogin_count +{user.relogin_count - relogins}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="服务器固定延迟（秒）"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="服务器随机延迟（秒）"
+    )
+    parser.add_argument("--logins", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    tms = FakeTMS(latency=args.latency, jitter=args.jitter, seed=0)
+    utils.set_base_url(tms.start())
+    print(f"模拟服务器：{tms.base_url}（延迟 {args.latency}s + 抖动 {args.jitter}s）")
+    try:
+        user = bench_login(args.logins)
+        bench_operations(user, tms, args.repeat)
+        bench_run_select_courses(user, tms)
+        bench_throughput(user, tms, args.threads, args.seconds)
+        bench_relogin(user, tms, args.threads)
+    finally:
+        tms.stop()
+
+
+if __name__ == "__main__":
+    main()
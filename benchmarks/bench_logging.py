@@ -0,0 +1,145 @@
+"""日志的调用开销（离线）
+
+对比旧的 print_log（每次调用都格式化时间并同步 print）与 logs.LOG：
+    - 输出到控制台时调用方的耗时和写 stdout 的次数
+    - quiet 时的耗时（旧实现仍会格式化时间）
+    - 按任务过滤掉的记录的耗时
+    - 多个线程同时记录时的吞吐量
+
+控制台输出写到计数的空设备，不包含终端或 notebook 渲染的耗时，
+实际环境中减少的 stdout 写入次数带来的收益更大。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_logging [--repeat 50000] [--threads 8]
+"""
+
+import argparse
+import contextlib
+import os
+import threading
+import time
+from datetime import datetime
+
+import logs
+
+
+class CountingStream:
+    """写到空设备，并统计 write 的次数"""
+
+    def __init__(self):
+        self.file = open(os.devnull, "w", encoding="utf-8")  # noqa: SIM115
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return self.file.write(text)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+def legacy_print_log(msg: str, quiet: bool = False) -> None:
+    """旧实现"""
+    time = datetime.now().strftime("%Y-%m-%d %H:%M:%S:%f")[:-3]
+    if not quiet:
+        print(f"[{time}] {msg}")
+
+
+def measure(func, repeat: int) -> float:
+    """每次调用的平均耗时（纳秒）"""
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - t0) / repeat * 1e9
+
+
+def bench_calls(repeat: int) -> None:
+    task, result = "张健-地球物理勘探", "选课失败：该课程人数已满"
+    print(f"{'场景':<16}{'旧 print_log':>14}{'logs.LOG':>12}{'写 stdout 次数':>18}")
+
+    def row(name, old, new, writes=""):
+        old_text = f"{old:10.0f} ns" if old is not None else f"{'-':>13}"
+        print(f"{name:<16}{old_text}{new:9.0f} ns{writes:>18}")
+
+    # 输出到控制台
+    stream = CountingStream()
+    with contextlib.redirect_stdout(stream):
+        old = measure(lambda i: legacy_print_log(f"{task} : {result}"), repeat)
+    old_writes = stream.writes
+    backend = logs.LogBackend(stream=CountingStream())
+    new = measure(
+        lambda i: backend.log(logs.INFO, "%s : %s", task, result, task=task), repeat
+    )
+    backend.flush(None)
+    row("控制台", old, new, f"{old_writes} → {backend.stream.writes}")
+
+    # quiet
+    old = measure(lambda i: legacy_print_log(f"{task} : {result}", True), repeat)
+    new = measure(
+        lambda i: backend.log(
+            logs.INFO, "%s : %s", task, result, task=task, quiet=True
+        ),
+        repeat,
+    )
+    row("quiet", old, new)
+
+    # 按任务过滤
+    backend.set_level(task, logs.WARNING)
+    new = measure(
+        lambda i: backend.log(logs.INFO, "%s : %s", task, result, task=task), repeat
+    )
+    row("任务级别过滤", None, new)
+    backend.close()
+
+
+def bench_threads(threads: int, seconds: float) -> None:
+    """threads 个线程持续记录日志，对比每秒的记录数"""
+
+    def run(log) -> int:
+        stop = threading.Event()
+        counts = [0] * threads
+
+        def worker(i: int):
+            while not stop.is_set():
+                log(f"任务 {i}", "选课失败：该课程人数已满")
+                counts[i] += 1
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for t in workers:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in workers:
+            t.join()
+        return sum(counts)
+
+    stream = CountingStream()
+    with contextlib.redirect_stdout(stream):
+        old = run(lambda task, result: legacy_print_log(f"{task} : {result}"))
+    backend = logs.LogBackend(stream=CountingStream())
+    new = run(
+        lambda task, result: backend.log(logs.INFO, "%s : %s", task, result, task=task)
+    )
+    backend.flush(None)
+    print(
+        f"{threads} 线程：旧 print_log {old / seconds:10.0f} 条/秒"
+        f"（写 stdout {stream.writes} 次），"
+        f"logs.LOG {new / seconds:10.0f} 条/秒（写 stdout {backend.stream.writes} 次）"
+    )
+    backend.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    bench_calls(args.repeat)
+    print()
+    bench_threads(args.threads, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
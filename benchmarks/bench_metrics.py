@@ -0,0 +1,107 @@
+"""指标记录的开销（本地模拟服务器）
+
+    - 单次 inc / observe / record_request 的耗时
+    - 多线程持续选课时，开启与关闭指标记录的吞吐量和每个请求的 CPU 时间
+    - 运行结束后通过 REGISTRY.serve 读取 /metrics，展示导出的内容
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_metrics [--threads 8] [--seconds 3]
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+import urllib.request
+
+import metrics
+import utils
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from User import User
+
+
+def bench_calls(repeat: int) -> None:
+    registry = metrics.Registry()
+    cases = [
+        ("inc", lambda: registry.inc("requests_total", endpoint="x", outcome="ok")),
+        ("observe", lambda: registry.observe("request_seconds", 0.02, endpoint="x")),
+    ]
+    for name, func in cases:
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        print(f"{name:<16}{(time.perf_counter() - t0) / repeat * 1e9:8.0f} ns")
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        metrics.record_request("addStudentCourseApply", 0.02, "full")
+    print(f"{'record_request':<16}{(time.perf_counter() - t0) / repeat * 1e9:8.0f} ns")
+
+
+def poll(user: User, teachId: str, threads: int, seconds: float) -> tuple[int, float]:
+    """threads 个线程持续选课，返回 (请求数, CPU 时间)"""
+    stop = threading.Event()
+    counts = [0] * threads
+
+    def worker(i: int):
+        while not stop.is_set():
+            user.select_course(teachId)
+            counts[i] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    cpu = time.process_time()
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+    return sum(counts), time.process_time() - cpu
+
+
+def bench_polling(user: User, teachId: str, threads: int, seconds: float) -> None:
+    for enabled in (False, True):
+        metrics.REGISTRY.enabled = enabled
+        total, cpu = poll(user, teachId, threads, seconds)
+        # 模拟服务器在同一进程中，CPU 时间包含服务器端的处理
+        print(
+            f"指标{'开启' if enabled else '关闭'}：{total / seconds:8.1f} 请求/秒，"
+            f"每个请求 CPU {cpu / total * 1e6:7.1f} us（含服务器）"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    bench_calls(args.repeat)
+    metrics.REGISTRY.clear()
+    print()
+
+    tms = FakeTMS(seed=0)
+    course = next(iter(tms.courses.values()))
+    course.selected = course.capacity
+    utils.set_base_url(tms.start())
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+        bench_polling(user, course.teachId, args.threads, args.seconds)
+
+        server = metrics.REGISTRY.serve(port=0)
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as res:
+            text = res.read().decode()
+        server.shutdown()
+        print(f"\n/metrics（共 {len(text.splitlines())} 行，节选）：")
+        for line in text.splitlines():
+            if "requests_total" in line or "login_seconds_count" in line:
+                print(f"    {line}")
+    finally:
+        tms.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""邮件通知的阻塞时间与连接数（本地模拟 SMTP 服务器）
+
+多个选课任务几乎同时完成并发送通知，对比：
+    - utils.send：在选课线程中同步发送，每封邮件新建连接并登录
+    - notify.Notifier：加入队列立即返回，后台合并发送并复用连接
+另外测量 SMTP 服务器暂时不可用时能否送达，以及 close() 时是否发完队列中的消息。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_notify [--tasks 8] [--connect-delay 0.3]
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+import utils
+from benchmarks.bench_e2e import percentiles
+from benchmarks.fake_smtp import FakeSMTP
+from notify import Notifier
+
+
+def burst(send, tasks: int) -> list[float]:
+    """tasks 个线程同时调用 send，返回每个调用方被阻塞的秒数"""
+    barrier = threading.Barrier(tasks)
+    blocked = [0.0] * tasks
+
+    def worker(i: int):
+        barrier.wait()
+        t0 = time.perf_counter()
+        send(f"选课完成: 课程 {i}", f"课程 {i} 选课成功")
+        blocked[i] = time.perf_counter() - t0
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(tasks)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return blocked
+
+
+def report(name: str, blocked: list[float], smtp: FakeSMTP, elapsed: float) -> None:
+    print(f"{name}：调用方阻塞 {percentiles(blocked)}")
+    print(
+        f"    SMTP 连接 {smtp.connections} 个，邮件 {len(smtp.messages)} 封，"
+        f"全部送达 {elapsed:.2f} s"
+    )
+
+
+def bench_burst(tasks: int, connect_delay: float) -> None:
+    smtp = FakeSMTP(connect_delay=connect_delay)
+    config = smtp.start()
+    t0 = time.perf_counter()
+    blocked = burst(lambda s, t: utils.send(config, s, t), tasks)
+    report("utils.send", blocked, smtp, time.perf_counter() - t0)
+    smtp.stop()
+
+    smtp = FakeSMTP(connect_delay=connect_delay)
+    config = smtp.start()
+    notifier = Notifier(config, batch_window=0.5)
+    t0 = time.perf_counter()
+    blocked = burst(notifier.send, tasks)
+    notifier.flush()
+    report("Notifier", blocked, smtp, time.perf_counter() - t0)
+
+    # 再来一批，复用已有连接
+    t0 = time.perf_counter()
+    blocked = burst(notifier.send, tasks)
+    notifier.flush()
+    report("Notifier 复用", blocked, smtp, time.perf_counter() - t0)
+    notifier.close()
+    smtp.stop()
+
+
+def bench_outage() -> None:
+    """前 2 个连接被直接关闭"""
+    for name in ("utils.send", "Notifier"):
+        smtp = FakeSMTP(fail_connections=2)
+        config = smtp.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if name == "utils.send":
+                utils.send(config, "选课完成", "")
+            else:
+                notifier = Notifier(config, batch_window=0, backoff=0.1)
+                notifier.send("选课完成", "")
+                notifier.close()
+        print(f"{name:<12}服务器前 2 次连接失败：送达 {len(smtp.messages)} 封")
+        smtp.stop()
+
+
+def bench_shutdown(count: int) -> None:
+    smtp = FakeSMTP(data_delay=0.05)
+    notifier = Notifier(smtp.start(), batch_window=2.0, max_batch=5)
+    for i in range(count):
+        notifier.send(f"通知 {i}", "")
+    t0 = time.perf_counter()
+    notifier.close()
+    received = sum(
+        1 if "等" not in m["Subject"] else int(m["Subject"].split()[-2])
+        for m in smtp.messages
+    )
+    print(
+        f"入队 {count} 条后立即 close()：{time.perf_counter() - t0:.2f} s 内"
+        f"发出 {len(smtp.messages)} 封邮件，包含 {received} 条通知"
+    )
+    smtp.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=8)
+    parser.add_argument(
+        "--connect-delay",
+        type=float,
+        default=0.3,
+        help="新建 SMTP 连接的耗时（秒），模拟 TLS 握手与登录",
+    )
+    args = parser.parse_args()
+
+    bench_burst(args.tasks, args.connect_delay)
+    print()
+    bench_outage()
+    print()
+    bench_shutdown(12)
+
+
+if __name__ == "__main__":
+    main()
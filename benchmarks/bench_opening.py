@@ -0,0 +1,131 @@
+"""开放前等待方式对比（本地模拟服务器，服务器时钟有偏差）
+
+模拟服务器的时钟比本机快 --clock-offset 秒，并在 --open-in 秒后开放选课。
+N 个任务用三种方式等待开放：
+    - 固定间隔轮询：从现在起按 interval 一直请求
+    - 本机时钟定时：按本机时间睡到开放时间再开始轮询（忽略时钟偏差）
+    - OpeningScheduler：测量时钟偏差，低频轮询，到开放时刻切回正常间隔
+
+统计开放前浪费的请求数，以及开放后（按服务器时间）多久完成第一个、最后一个任务。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_opening [--open-in 8] [--clock-offset 2.5]
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+import Strategy
+import utils
+from opening import OpeningScheduler
+from select_result import SelectStatus
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from User import User
+
+MODES = {
+    "polling": "固定间隔轮询",
+    "local": "本机时钟定时",
+    "scheduler": "OpeningScheduler",
+}
+
+
+def run(mode: str, args) -> None:
+    tms = FakeTMS(
+        latency=args.latency,
+        clock_offset=args.clock_offset,
+        is_open=False,
+        extra_courses=args.tasks,
+        seed=0,
+    )
+    utils.set_base_url(tms.start())
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+        # 登录后再设定开放时间，登录耗时不计入等待
+        tms.open_at = tms.now() + args.open_in
+        # 都留出空位，开放后第一次请求即完成（选上或与同代码课程冲突）
+        for course in tms.courses.values():
+            course.selected = 0
+        teachIds = [c.teachId for c in tms.courses.values()][: args.tasks]
+
+        lock = threading.Lock()
+        closed = 0
+        done: list[float] = []
+
+        def select(teachId):
+            nonlocal closed
+            result = user.select_course(teachId)
+            with lock:
+                if result.status is SelectStatus.NOT_OPEN:
+                    closed += 1
+                elif Strategy.check_completed(result):
+                    # 任务完成（选上或冲突）时的服务器时间
+                    done.append(tms.now() - tms.open_at)
+            return result
+
+        scheduler = None
+        if mode == "scheduler":
+            scheduler = OpeningScheduler(tms.open_at)
+
+        def task(tid: str):
+            if mode == "local":
+                # 把开放时间当作本机时间
+                time.sleep(max(0.0, tms.open_at - time.time()))
+            Strategy.monitor_loop(
+                user,
+                tid,
+                select,
+                args.interval,
+                args=(tid,),
+                quiet=True,
+                scheduler=scheduler,
+            )
+
+        threads = [threading.Thread(target=task, args=(tid,)) for tid in teachIds]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        extra = ""
+        if scheduler is not None:
+            clock = scheduler.clock
+            extra = (
+                f"，测量请求 {clock.samples} 个，"
+                f"估计偏差 {clock.offset:+.3f}s（±{clock.error:.3f}s，"
+                f"实际 {args.clock_offset:+.3f}s）"
+            )
+        print(f"{MODES[mode]}\n    开放前请求 {closed:4d} 个{extra}")
+        print(
+            f"    开放后完成第一个任务 {min(done) * 1000:8.1f} ms，"
+            f"最后一个 {max(done) * 1000:8.1f} ms"
+        )
+    finally:
+        tms.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=4, help="选课任务数")
+    parser.add_argument("--interval", type=float, default=0.5, help="选课间隔（秒）")
+    parser.add_argument("--open-in", type=float, default=8.0, help="多少秒后开放")
+    parser.add_argument(
+        "--clock-offset", type=float, default=2.5, help="服务器时钟比本机快多少秒"
+    )
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(
+        f"{args.tasks} 个任务，间隔 {args.interval}s，{args.open_in}s 后开放，"
+        f"服务器时钟偏差 {args.clock_offset:+}s\n"
+    )
+    for mode in MODES:
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""固定间隔与自适应节奏控制对比（本地模拟服务器，高峰期过载）
+
+模拟服务器在子进程中运行，只能同时处理 --capacity 个请求，
+排队超过 --queue-timeout 秒的请求返回 503，客户端等待超过 --timeout 秒放弃，
+这两种都是无效请求：客户端没有得到结果，服务器却可能仍在处理。
+N 个任务的固定间隔轮询远超服务器处理能力，对比：
+    - 固定间隔：每个 monitor_loop 各自 sleep(interval)
+    - 节奏控制：所有任务共用一个 PacingController，初始速率等于固定间隔的总速率
+
+统计有效响应的吞吐量、无效请求数量与比例、响应时间分位数。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_pacing [--tasks 40] [--interval 0.1] [--capacity 4]
+"""
+
+import argparse
+import contextlib
+import io
+import subprocess
+import sys
+import threading
+import time
+
+import Strategy
+import utils
+from benchmarks.bench_e2e import percentiles
+from pacing import PacingController
+from tests.fake_server import EMAIL_CONFIG
+from User import User
+
+
+def run(
+    name: str,
+    user: User,
+    teachIds: list[tuple[str, str]],
+    interval: float,
+    seconds: float,
+    timeout: float,
+    pacer: PacingController | None,
+) -> None:
+    stop = threading.Event()
+    lock = threading.Lock()
+    ok: list[float] = []
+    dead: list[float] = []
+
+    def select(teachId):
+        start = time.perf_counter()
+        try:
+            res = user.request(
+                "GET", User.select_course_url(teachId), op="select", timeout=timeout
+            )
+        except Exception:
+            with lock:
+                dead.append(time.perf_counter() - start)
+            raise
+        with lock:
+            ok.append(time.perf_counter() - start)
+        return User.parse_select_message(res.content)
+
+    workers = [
+        threading.Thread(
+            target=Strategy.monitor_loop,
+            kwargs={
+                "user": user,
+                "task_name": task_name,
+                "func": select,
+                "interval": interval,
+                "args": (tid,),
+                "check": lambda _: stop.is_set(),
+                "quiet": True,
+                "pacer": pacer,
+            },
+        )
+        for tid, task_name in teachIds
+    ]
+    rates = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in workers:
+            t.start()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            time.sleep(0.5)
+            if pacer is not None:
+                rates.append(pacer.rate)
+        stop.set()
+        for t in workers:
+            t.join()
+
+    total = len(ok) + len(dead)
+    print(name)
+    print(f"    请求总数      {total:8d}")
+    print(f"    有效响应      {len(ok) / seconds:8.1f} 个/秒")
+    print(f"    无效请求      {len(dead):8d}（{len(dead) / max(total, 1):6.1%}）")
+    if ok:
+        print(f"    有效响应时间  {percentiles(ok)}")
+    if pacer is not None:
+        print(
+            "    速率变化      "
+            + " ".join(f"{r:.0f}" for r in rates[:: max(1, len(rates) // 10)])
+            + f"（最终 {pacer.rate:.1f} 请求/秒，降速 {pacer.decreases} 次）"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=40, help="选课任务数")
+    parser.add_argument(
+        "--interval", type=float, default=0.1, help="每个任务的请求间隔（秒）"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="服务器处理一个请求的时间（秒）"
+    )
+    parser.add_argument(
+        "--capacity", type=int, default=4, help="服务器同时处理的请求数"
+    )
+    parser.add_argument(
+        "--queue-timeout", type=float, default=1.0, help="服务器排队超时（秒）"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=0.5, help="客户端请求超时（秒）"
+    )
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "tests.fake_server",
+            "--port",
+            "0",
+            "--latency",
+            str(args.latency),
+            "--extra-courses",
+            str(max(0, args.tasks - 5)),
+            "--full",
+            "--capacity",
+            str(args.capacity),
+            "--queue-timeout",
+            str(args.queue_timeout),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        base_url = server.stdout.readline().strip().split("：", 1)[1]
+        utils.set_base_url(base_url)
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+            user.prefetch_catalog()
+        rows = sorted(user.catalog._rows.values(), key=lambda item: item[0].chooseId)
+        teachIds = [(row.teachId, row.chooseId) for row, _ in rows][: args.tasks]
+
+        capacity = args.capacity / args.latency
+        offered = args.tasks / args.interval
+        print(
+            f"{args.tasks} 个任务，间隔 {args.interval}s（约 {offered:.0f} 请求/秒），"
+            f"服务器处理能力约 {capacity:.0f} 请求/秒，各运行 {args.seconds}s\n"
+        )
+
+        pacer = PacingController(
+            rate=offered,
+            max_rate=offered,
+            increase=capacity / 20,
+            latency_target=args.latency * 4,
+        )
+        for name, p in (("固定间隔", None), ("节奏控制 PacingController", pacer)):
+            run(name, user, teachIds, args.interval, args.seconds, args.timeout, p)
+            print()
+            # 等服务器上积压的请求处理完
+            time.sleep(args.queue_timeout + args.latency)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
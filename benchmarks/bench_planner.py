@@ -0,0 +1,204 @@
+"""选课志愿规划的耗时与正确性
+
+    1. 小规模随机志愿上与穷举对比，校验方案最优且无冲突
+    2. 十几到几十门课、每门课 10 个开课的随机志愿：首次规划与排除开课后重新规划的耗时
+    3. 模拟服务器：缓存中的开课实际已满，run_wishlist 在运行中排除它并重新规划
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_planner [--courses 20] [--sections 10]
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import random
+
+import logs
+import Strategy
+import utils
+from course_parser import CourseRow
+from planner import Wish, WishlistPlanner, section_rank
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from timetable import parse_date
+from User import User
+
+DAYS = "一二三四五"
+BLOCKS = ["1-2", "3-4", "6-7", "8-9", "11-12"]
+HALVES = ["1-8", "9-16"]
+
+
+def random_instance(
+    rng: random.Random, courses: int, sections: int
+) -> tuple[list[Wish], dict[str, list[CourseRow]]]:
+    """随机志愿：每门课上半或下半学期、每周 1-2 次课，每门课偏好 2 位教师
+
+    先为每门课安排一个互不冲突的开课，保证所有课程都能选上，其余开课随机。
+    """
+    units = [(d, b, w) for d in DAYS for b in BLOCKS for w in HALVES]
+    rng.shuffle(units)
+    wishes, table = [], {}
+    for c in range(courses):
+        code = f"C{c:04d}"
+        weeks = rng.choice(HALVES)
+        count = rng.choice([1, 1, 2])
+        hidden = rng.randrange(sections)
+        rows = []
+        for s in range(sections):
+            if s == hidden:
+                picked = []
+                for unit in units:
+                    if unit[2] == weeks and all(unit[0] != p[0] for p in picked):
+                        picked.append(unit)
+                        if len(picked) == count:
+                            break
+                for unit in picked:
+                    units.remove(unit)
+                segments = [(d, b) for d, b, _ in picked]
+            else:
+                segments = rng.sample([(d, b) for d in DAYS for b in BLOCKS], count)
+            rows.append(
+                CourseRow(
+                    teacher=f"老师{s}",
+                    date=", ".join(f"{weeks}周 星期{d} {b}节" for d, b in segments),
+                    campus="犀浦",
+                    course=f"课程{c}",
+                    course_code=code,
+                    selected=f"{rng.randint(0, 40)}/50",
+                    chooseId=f"{code}-{s}",
+                    teachId=f"T{c:04d}{s:03d}",
+                )
+            )
+        table[code] = rows
+        prefer = tuple(r.teacher for r in rng.sample(rows, 2))
+        wishes.append(Wish(code, prefer))
+    return wishes, table
+
+
+def brute_force(wishes: list[Wish], table: dict[str, list[CourseRow]]) -> tuple:
+    """穷举所有组合（每门课可以不选），返回最优评分"""
+    n = len(wishes)
+    choices = []
+    for wish in wishes:
+        options = [
+            (section_rank(wish, r), parse_date(r.date), r)
+            for r in table[wish.course_code]
+        ]
+        choices.append([None] + [o for o in options if o[0] is not None])
+    best = None
+    for combo in itertools.product(*choices):
+        occupied, placed, got, ranks, ok = 0, 0, 0, 0, True
+        for i, option in enumerate(combo):
+            if option is None:
+                continue
+            if option[1] & occupied:
+                ok = False
+                break
+            occupied |= option[1]
+            placed, got, ranks = placed + 1, got | 1 << (n - 1 - i), ranks + option[0]
+        if ok and (best is None or (placed, got, -ranks) > best):
+            best = (placed, got, -ranks)
+    return best
+
+
+def score(wishes: list[Wish], plan) -> tuple:
+    n, placed, got, ranks, occupied = len(wishes), 0, 0, 0, 0
+    for i, wish in enumerate(wishes):
+        row = plan.assignments.get(wish.course_code)
+        if row is None:
+            continue
+        mask = parse_date(row.date)
+        assert not mask & occupied, "方案中存在冲突"
+        occupied |= mask
+        placed, got, ranks = (
+            placed + 1,
+            got | 1 << (n - 1 - i),
+            ranks + section_rank(wish, row),
+        )
+    return placed, got, -ranks
+
+
+def check_optimal(trials: int) -> None:
+    rng = random.Random(1)
+    for _ in range(trials):
+        wishes, table = random_instance(rng, 6, 3)
+        # 打乱开课时间，让部分课程无法安排
+        dates = [row.date for rows in table.values() for row in rows]
+        for code, rows in table.items():
+            table[code] = [row._replace(date=rng.choice(dates)) for row in rows]
+        plan = WishlistPlanner(wishes, table, skip_full=False).solve()
+        assert score(wishes, plan) == brute_force(wishes, table)
+    print(f"{trials} 个小规模随机志愿（6 门课 × 3 个开课）的方案均与穷举结果一致")
+
+
+def bench_scale(courses: int, sections: int, trials: int) -> None:
+    rng = random.Random(0)
+    print(f"{courses} 门课 × {sections} 个开课：")
+    times = []
+    for t in range(trials):
+        wishes, table = random_instance(rng, courses, sections)
+        planner = WishlistPlanner(wishes, table)
+        plan = planner.solve()
+        score(wishes, plan)
+        first = plan
+        # 排除方案中的 3 个开课（模拟运行中已满或冲突）后重新规划
+        for row in list(plan.assignments.values())[:3]:
+            planner.exclude(row.chooseId)
+        replan = planner.solve()
+        score(wishes, replan)
+        times.append(first.seconds)
+        print(
+            f"    #{t + 1} 首次 {first.seconds * 1e3:7.2f} ms（{first.nodes} 节点，"
+            f"安排 {len(first.assignments)} 门{'' if first.optimal else '，未搜索完'}）"
+            f"  重新规划 {replan.seconds * 1e3:7.2f} ms（{replan.nodes} 节点"
+            f"{'' if replan.optimal else '，未搜索完'}）"
+        )
+    times.sort()
+    print(f"首次规划耗时中位数 {times[len(times) // 2] * 1e3:.2f} ms")
+
+
+def bench_runtime() -> None:
+    tms = FakeTMS(latency=0.002, extra_courses=10, seed=0)
+    utils.set_base_url(tms.start())
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+        wishes = [
+            Wish("FGEE007012", ("张志厚", "张立")),
+            Wish("FAKE000000", ("胥鸿睿",)),
+        ]
+        # 先查询放入缓存，之后张志厚的开课在服务器上满员，缓存中仍显示有余量
+        for wish in wishes:
+            user.query_by_course_code(wish.course_code)
+        tms.courses["B0868"].selected = tms.courses["B0868"].capacity
+
+        logs.LOG.console = True
+        plan = Strategy.run_wishlist(user, wishes, interval=0.05, full_retries=3)
+        logs.LOG.flush()
+        logs.LOG.console = False
+        print("最终方案：")
+        for code, row in plan.assignments.items():
+            print(f"    {code} {row.teacher}（{row.chooseId}）{row.date}")
+    finally:
+        tms.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--sections", type=int, default=10)
+    parser.add_argument("--trials", type=int, default=10)
+    args = parser.parse_args()
+
+    logs.LOG.console = False
+    check_optimal(50)
+    print()
+    bench_scale(12, 10, args.trials)
+    print()
+    bench_scale(args.courses, args.sections, args.trials)
+    print()
+    bench_runtime()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""录制与回放
+
+在模拟服务器上（每个请求附加 --latency 秒延迟）录制一段真实的使用过程：
+登录、按课程代码查询、查询已选列表、对已满的开课轮询选课、选课、退课、
+用 Strategy 的批量选课（engine="async"）重新选上、登录过期后重新登录。
+然后：
+    1. 检查归档中没有学号、密码和 JSESSIONID，统计归档大小
+    2. 分别以录制时的速度和不等待的方式回放，两次回放的结果与录制时相同
+    3. 用归档中的响应离线统计各解析函数的耗时，并对回放过程做 cProfile
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_replay [--polls 50] [--latency 0.02]
+"""
+
+import argparse
+import contextlib
+import cProfile
+import gzip
+import io
+import os
+import pstats
+import tempfile
+import time
+from urllib.parse import parse_qsl
+
+import course_parser
+import logs
+import metrics
+import Strategy
+import utils
+from recorder import RecordingAdapter, ReplayAdapter, load_archive
+from select_result import classify, delete_succeeded
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from transport import Transport
+from User import SELECT_ENDPOINT, User
+
+USERNAME, PASSWORD = "2022000000", "password-secret"
+CODE, FULL, TARGET = "FGEE007012", "B0870", "B0868"
+
+# 各接口响应对应的解析函数
+PARSERS = {
+    "studentCourseSysSchedule": course_parser.parse_course_rows,
+    "studentCourseSysList": course_parser.parse_selected_rows,
+    SELECT_ENDPOINT: classify,
+    "delStudentCourseList": delete_succeeded,
+}
+
+
+def scenario(transport: Transport, polls: int, expire=None) -> list:
+    """一段典型的使用过程，返回各步骤的结果用于比较"""
+    user = User(USERNAME, PASSWORD, EMAIL_CONFIG, transport=transport)
+    out: list = [sorted(row["chooseId"] for row in user.query_by_course_code(CODE))]
+    out.append(sorted(user.query_selected_courses()))
+    full = user.get_teachId(FULL)
+    out += [str(user.select_course(full)) for _ in range(polls)]
+    out.append(str(user.select_course(user.get_teachId(TARGET))))
+    listId = user.query_selected_courses()[TARGET]
+    out.append(user.del_course(listId, TARGET))
+    # 录制和回放时异步引擎不经过 adapter，批量选课会改用多线程，选课请求同样被录下
+    Strategy.run_select_courses_with_teachIds(
+        user,
+        [(user.get_teachId(TARGET), TARGET)],
+        interval=0,
+        check_conflicts=False,
+        engine="async",
+    )
+    out.append(sorted(user.query_selected_courses()))
+    if expire is not None:
+        expire()
+    try:
+        user.query_selected_courses()
+    except utils.LoginExpiredError as e:
+        out.append("expired")
+        user.relogin(e.generation, quiet=True)
+    out.append(sorted(user.query_selected_courses()))
+    return out
+
+
+def check_scrubbed(path: str) -> None:
+    with gzip.open(path, "rb") as f:
+        raw = f.read()
+    for secret in (USERNAME, PASSWORD, "JSESSIONID"):
+        assert secret.encode() not in raw, f"归档中含有 {secret}"
+    # 正文经过 zlib 压缩，还要检查解压后的内容
+    for ex in load_archive(path):
+        for secret in (USERNAME, PASSWORD):
+            assert secret.encode() not in ex.content, f"响应中含有 {secret}"
+
+
+def profile_parsers(path: str, repeat: int = 20) -> None:
+    exchanges = load_archive(path)
+    totals: dict[str, list[float]] = {}
+    for ex in exchanges:
+        name = metrics.endpoint(ex.url, dict(parse_qsl(ex.body or "")))
+        parser = PARSERS.get(name)
+        if parser is None or not ex.content:
+            continue
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            # 登录过期页面也要经过解析函数
+            with contextlib.suppress(utils.LoginExpiredError):
+                utils.check_session_expired(ex.content)
+            parser(ex.content)
+        stats = totals.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += (time.perf_counter() - t0) / repeat
+    print("按归档中的响应离线解析（含登录过期检查）")
+    for name, (count, seconds) in totals.items():
+        print(f"    {name:<26}{count:5d} 个响应  平均 {seconds / count * 1e6:8.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    logs.LOG.console = False
+    tms = FakeTMS(latency=args.latency, seed=0)
+    utils.set_base_url(tms.start())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traffic.jsonl.gz")
+        try:
+            adapter = RecordingAdapter(path, secrets=[USERNAME, PASSWORD])
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                live = scenario(
+                    Transport(adapter=adapter), args.polls, tms.expire_sessions
+                )
+            live_seconds = time.perf_counter() - t0
+            adapter.finish()
+        finally:
+            tms.stop()
+
+        check_scrubbed(path)
+        exchanges = load_archive(path)
+        selects = sum(SELECT_ENDPOINT in ex.url for ex in exchanges)
+        # 轮询、直接选课和批量选课各自的选课请求
+        assert selects == args.polls + 2, selects
+        raw = sum(len(ex.content) for ex in exchanges)
+        print(
+            f"录制 {len(exchanges)} 个请求，响应共 {raw / 1024:.0f} KiB，"
+            f"归档 {os.path.getsize(path) / 1024:.1f} KiB，已确认不含学号、密码和 Cookie"
+        )
+
+        # 回放时服务器已经关闭，所有响应都来自归档
+        utils.set_base_url("http://127.0.0.1:9/TMS")
+        print(f"录制时：{live_seconds * 1e3:.1f} ms")
+        for name, speed in [("按录制速度回放", 1.0), ("不等待回放", 0.0)]:
+            replay = ReplayAdapter(path, speed=speed)
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = scenario(Transport(adapter=replay), args.polls)
+            seconds = time.perf_counter() - t0
+            assert result == live, (result, live)
+            print(
+                f"{name}：{seconds * 1e3:.1f} ms，结果与录制时相同，"
+                f"未匹配的请求 {replay.misses} 个"
+            )
+        print()
+
+        profile_parsers(path)
+        print()
+        profiler = cProfile.Profile()
+        with contextlib.redirect_stdout(io.StringIO()):
+            profiler.runcall(
+                scenario, Transport(adapter=ReplayAdapter(path)), args.polls
+            )
+        logs.LOG.flush()
+        print("不等待回放的 cProfile（按自身耗时）")
+        pstats.Stats(profiler).sort_stats("tottime").print_stats(8)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""换课的退课到选课耗时
+
+在模拟服务器上（每个请求附加 --latency 秒延迟），同一门课的两个开课来回交换：
+    1. 手动换课：Strategy.del_courses 后再 run_select_courses
+    2. CourseSwap：信息预先准备好，退课后紧接着选课
+统计服务器处理退课到处理选课之间的时间（名额空出的窗口），以及整个过程的耗时。
+最后演示目标已满时选课失败、立即选回原课程。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_swap [--swaps 20] [--latency 0.02]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import logs
+import Strategy
+import utils
+from benchmarks.bench_e2e import percentiles
+from swap import CourseSwap
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from User import User
+
+PAIR = ("B0868", "B0869")
+
+
+class Timing:
+    """在服务器端记录每次退课到下一次选课之间的时间，即名额空出、可能被别人抢走的窗口"""
+
+    def __init__(self, tms: FakeTMS):
+        self.deleted_at: float | None = None
+        self.latencies: list[float] = []
+        delete, select = tms.delete, tms.select
+
+        def timed_delete(*args):
+            self.deleted_at = time.perf_counter()
+            return delete(*args)
+
+        def timed_select(*args):
+            result = select(*args)
+            if self.deleted_at is not None:
+                self.latencies.append(time.perf_counter() - self.deleted_at)
+                self.deleted_at = None
+            return result
+
+        tms.delete = timed_delete
+        tms.select = timed_select
+
+    def take(self) -> list[float]:
+        latencies, self.latencies = self.latencies, []
+        return latencies
+
+
+def bench_manual(user: User, timing: Timing, swaps: int) -> tuple[list, list]:
+    totals = []
+    for i in range(swaps):
+        drop, target = PAIR if i % 2 == 0 else PAIR[::-1]
+        t0 = time.perf_counter()
+        Strategy.del_courses(user, [drop])
+        Strategy.run_select_courses(user, [target], interval=0.01)
+        totals.append(time.perf_counter() - t0)
+    return timing.take(), totals
+
+
+def bench_swap(user: User, timing: Timing, swaps: int) -> tuple[list, list]:
+    totals = []
+    for i in range(swaps):
+        drop, target = PAIR if i % 2 == 0 else PAIR[::-1]
+        swap = CourseSwap(user, drop, target)
+        # 准备在等待空位期间完成，不计入交换耗时
+        swap.prepare()
+        t0 = time.perf_counter()
+        result = swap.execute()
+        totals.append(time.perf_counter() - t0)
+        assert result.swapped, result
+    return timing.take(), totals
+
+
+def demo_restore(tms: FakeTMS, user: User) -> None:
+    drop, target = PAIR
+    swap = CourseSwap(user, drop, target)
+    swap.prepare()
+    course = tms.courses[target]
+    course.selected = course.capacity
+    logs.LOG.console = True
+    result = swap.execute()
+    logs.LOG.flush()
+    logs.LOG.console = False
+    print(f"目标已满：{result.outcome}，已选 {sorted(result.selected)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--swaps", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    logs.LOG.console = False
+    tms = FakeTMS(latency=args.latency, seed=0)
+    utils.set_base_url(tms.start())
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+            user.select_course(tms.courses[PAIR[0]].teachId)
+            timing = Timing(tms)
+            manual = bench_manual(user, timing, args.swaps)
+        # bench_manual 交换偶数次后仍是 PAIR[0]
+        swap = bench_swap(user, timing, args.swaps)
+
+        print(f"每个请求延迟 {args.latency * 1e3:.0f} ms，交换 {args.swaps} 次")
+        for name, (latencies, totals) in [("手动换课", manual), ("CourseSwap", swap)]:
+            print(f"{name}")
+            print(f"    退课到选课  {percentiles(latencies)}（服务器端）")
+            print(f"    整个过程    {percentiles(totals)}")
+        print()
+        demo_restore(tms, user)
+    finally:
+        tms.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""上课时间冲突检查
+
+    1. 校验：test_resourse 选课页面中的上课时间都能解析，且两两冲突的结果
+       与按 (周次, 星期, 节次) 集合求交集的朴素实现一致
+    2. 课表规模的两两冲突检查：位图按位与，对比集合求交集和每次重新解析字符串
+    3. 模拟服务器：已选一门课后，冲突的任务在发送选课请求前被跳过
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_timetable [--courses 2000]
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import random
+import time
+from pathlib import Path
+
+import course_parser
+import logs
+import Strategy
+import timetable
+import utils
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from User import User
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = ["第一次选课.html", "第二次选课.html"]
+DAYS = "一二三四五六日"
+
+
+def naive_slots(date: str) -> set[tuple[int, int, int]]:
+    """朴素实现：逐段解析为 (周次, 星期, 节次) 集合，只支持 "a-b周 星期X c-d节" 格式"""
+    result = set()
+    for segment in date.split(", "):
+        weeks, day, periods = segment.split()
+        w1, w2 = map(int, weeks[:-1].split("-"))
+        p1, p2 = map(int, periods[:-1].split("-"))
+        d = DAYS.index(day[-1]) + 1
+        for w in range(w1, w2 + 1):
+            for p in range(p1, p2 + 1):
+                result.add((w, d, p))
+    return result
+
+
+def random_date(rng: random.Random) -> str:
+    segments = []
+    for _ in range(rng.randint(1, 3)):
+        w1 = rng.randint(1, 12)
+        w2 = rng.randint(w1, min(w1 + 16, timetable.WEEKS))
+        p1 = rng.choice([1, 3, 6, 8, 9, 11])
+        segments.append(f"{w1}-{w2}周 星期{rng.choice(DAYS[:5])} {p1}-{p1 + 1}节")
+    return ", ".join(segments)
+
+
+def check_fixtures() -> None:
+    dates = []
+    for name in FIXTURES:
+        content = (ROOT / "test_resourse" / name).read_bytes()
+        dates += [row.date for row in course_parser.parse_course_rows(content)]
+    masks = [timetable.parse_date(d) for d in dates]
+    assert all(m is not None for m in masks), "存在无法解析的上课时间"
+    for (d1, m1), (d2, m2) in itertools.combinations(zip(dates, masks), 2):
+        assert bool(m1 & m2) == bool(naive_slots(d1) & naive_slots(d2)), (d1, d2)
+        assert set(timetable.slots(m1)) == naive_slots(d1), d1
+    print(f"fixture 中 {len(dates)} 个上课时间全部解析，两两冲突结果与朴素实现一致")
+
+
+def bench_pairwise(courses: int) -> None:
+    rng = random.Random(0)
+    dates = [random_date(rng) for _ in range(courses)]
+    pairs = courses * (courses - 1) // 2
+
+    timetable.parse_date.cache_clear()
+    t0 = time.perf_counter()
+    masks = [timetable.parse_date(d) for d in dates]
+    parse = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for d in dates:
+        timetable.parse_date(d)
+    cached = time.perf_counter() - t0
+    print(
+        f"解析 {courses} 个上课时间：{parse / courses * 1e6:.1f} us/个，"
+        f"命中缓存 {cached / courses * 1e6:.2f} us/个"
+    )
+
+    t0 = time.perf_counter()
+    bitset = sum(1 for a, b in itertools.combinations(masks, 2) if a & b)
+    bitset_time = time.perf_counter() - t0
+
+    sets = [naive_slots(d) for d in dates]
+    t0 = time.perf_counter()
+    naive = sum(1 for a, b in itertools.combinations(sets, 2) if not a.isdisjoint(b))
+    naive_time = time.perf_counter() - t0
+    assert bitset == naive
+
+    # 不缓存时每次检查都要解析两个字符串，只抽样测量
+    sample = list(itertools.islice(itertools.combinations(dates, 2), 20000))
+    t0 = time.perf_counter()
+    for a, b in sample:
+        _ = naive_slots(a) & naive_slots(b)
+    reparse_time = (time.perf_counter() - t0) / len(sample) * pairs
+
+    print(f"两两检查 {pairs} 对，冲突 {bitset} 对：")
+    for name, seconds in [
+        ("位图按位与", bitset_time),
+        ("集合求交集", naive_time),
+        ("每次重新解析（估算）", reparse_time),
+    ]:
+        print(f"    {name:<20}{seconds:8.2f} s  {seconds / pairs * 1e9:8.0f} ns/对")
+
+
+def bench_precheck() -> None:
+    tms = FakeTMS(seed=0)
+    utils.set_base_url(tms.start())
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+        courses = {c.chooseId: c for c in tms.courses.values()}
+        # B0868 与 B0869 都在星期三 3-4 节
+        user.select_course(courses["B0868"].teachId)
+        tasks = [(courses[cid].teachId, cid) for cid in ("B0869", "B0872")]
+        user.resolve_courses([cid for _, cid in tasks])
+
+        logs.LOG.console = True
+        kept = Strategy.precheck_conflicts(user, tasks)
+        logs.LOG.flush()
+        print(f"任务 {[n for _, n in tasks]} 检查后保留 {[n for _, n in kept]}")
+    finally:
+        tms.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=2000)
+    args = parser.parse_args()
+
+    logs.LOG.console = False
+    check_fixtures()
+    print()
+    bench_pairwise(args.courses)
+    print()
+    bench_precheck()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""耗时追踪的开销与示例
+
+1. 关闭追踪时每个埋点的额外耗时，以及单线程选课时关闭、开启追踪、开启采样的每请求耗时
+2. 在模拟服务器上登录（各阶段有最小间隔）后运行几个选课任务，中途让登录过期，
+   记录 Chrome trace 和采样结果，按 span 名称汇总耗时，并检查 trace 中的线程名和任务名
+3. 安装了 aiohttp 时，用异步引擎运行同样的任务，检查同一线程上的 span 带有各自的任务名
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_tracing [--requests 2000] [--seconds 2] [--out trace.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import timeit
+
+import async_engine
+import logs
+import Strategy
+import tracing
+import utils
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from User import User
+
+# 都是已满的开课，选课任务会一直重试，直到被取消
+TASKS = ("B0870", "Z0002", "Z0003")
+
+
+def bench_noop() -> None:
+    page = b"<html><body>" + b"x" * 2000 + b"</body></html>"
+    number = 200_000
+    wrapped = timeit.timeit(lambda: utils.check_session_expired(page), number=number)
+    raw = timeit.timeit(
+        lambda: utils.check_session_expired.__wrapped__(page), number=number
+    )
+
+    def span():
+        with tracing.TRACER.span("request", "http", endpoint="x", op="select"):
+            pass
+
+    noop = timeit.timeit(span, number=number)
+    empty = timeit.timeit(lambda: None, number=number)
+    print("关闭追踪时")
+    print(f"    装饰器  {(wrapped - raw) / number * 1e9:6.0f} ns/次")
+    print(f"    span()  {(noop - empty) / number * 1e9:6.0f} ns/次")
+
+
+def bench_requests(user: User, teachId: str, n: int) -> None:
+    def run() -> tuple[float, float]:
+        cpu, t0 = time.process_time(), time.perf_counter()
+        for _ in range(n):
+            user.select_course(teachId)
+        return (time.perf_counter() - t0) / n, (time.process_time() - cpu) / n
+
+    run()
+    print(f"单线程选课 {n} 次（CPU 时间包括同一进程中的模拟服务器）")
+    modes = [
+        ("关闭", False, None),
+        ("开启", True, None),
+        ("开启 + 采样", True, "sampling"),
+    ]
+    for name, enabled, profile in modes:
+        if enabled:
+            tracing.TRACER.start(profile)
+        wall, cpu = run()
+        tracing.TRACER.stop()
+        print(f"    {name:<8}  {wall * 1e6:7.0f} us/请求  CPU {cpu * 1e6:7.0f} us/请求")
+
+
+def demo(tms: FakeTMS, seconds: float, path: str) -> None:
+    delays = {"captcha": 0.05, "login_action": 0.1}
+    controls = []
+    for chooseId in TASKS:
+        course = tms.courses[chooseId]
+        course.selected = course.capacity
+    with (
+        tracing.TRACER.record(path, profile="sampling"),
+        contextlib.redirect_stdout(io.StringIO()),
+    ):
+        user = User("2022000000", "password", EMAIL_CONFIG, login_delays=delays)
+        threads = []
+        for chooseId in TASKS:
+            teachId = user.get_teachId(chooseId)
+            control = Strategy.TaskControl(0.02)
+            controls.append(control)
+            thread = threading.Thread(
+                target=Strategy.monitor_loop,
+                args=(user, chooseId, user.select_course, 0.02),
+                kwargs={"args": (teachId,), "quiet": True, "control": control},
+                name=f"task-{chooseId}",
+            )
+            thread.start()
+            threads.append(thread)
+        time.sleep(seconds / 2)
+        tms.expire_sessions()
+        time.sleep(seconds / 2)
+        for control in controls:
+            control.cancel()
+        for thread in threads:
+            thread.join()
+
+    summary = sorted(tracing.TRACER.summary().items(), key=lambda kv: -kv[1][1])
+    print(f"{len(TASKS)} 个选课任务运行 {seconds} 秒，中途登录过期")
+    for name, (count, total) in summary:
+        print(f"    {name:<24}{count:6d} 次  共 {total * 1e3:8.1f} ms")
+
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)["traceEvents"]
+    threads = {e["args"]["name"] for e in trace if e["ph"] == "M"}
+    tasks = {e["args"].get("task") for e in trace if e["ph"] == "X"} - {None}
+    assert {f"task-{c}" for c in TASKS} <= threads, threads
+    assert set(TASKS) <= tasks, tasks
+    print(
+        f"trace 共 {len(trace)} 个事件，线程 {sorted(threads)}，"
+        f"任务 {sorted(tasks)}：{path}"
+    )
+    profiler = tracing.TRACER.profiler
+    assert isinstance(profiler, tracing.SamplingProfiler)
+    print("采样最多的栈顶函数")
+    for func, count in profiler.top(5):
+        print(f"    {count:5d}  {func}")
+
+
+def demo_async(seconds: float) -> None:
+    # demo 中登录已过期，重新登录
+    with contextlib.redirect_stdout(io.StringIO()):
+        user = User("2022000000", "password", EMAIL_CONFIG)
+    selector = async_engine.AsyncSelector(user, 0.02, quiet=True)
+    teachIds = [(user.get_teachId(chooseId), chooseId) for chooseId in TASKS]
+
+    async def run():
+        asyncio.get_running_loop().call_later(seconds, selector.cancel)
+        await selector.run(teachIds)
+
+    tracing.TRACER.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(run())
+    finally:
+        tracing.TRACER.stop()
+
+    tasks: dict[str, dict[str, int]] = {}
+    threads = set()
+    for name, _, _, _, tid, args in tracing.TRACER.events:
+        if name in ("monitor_loop.iteration", "request"):
+            counts = tasks.setdefault(name, {})
+            counts[args.get("task")] = counts.get(args.get("task"), 0) + 1
+            threads.add(tid)
+    print(f"异步引擎运行 {seconds} 秒，所有任务在 {len(threads)} 个线程上")
+    for name, counts in tasks.items():
+        assert set(counts) == set(TASKS), counts
+        print(f"    {name:<24}{dict(sorted(counts.items()))}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--out", default=None, help="trace 文件路径，默认写入临时目录")
+    args = parser.parse_args()
+
+    logs.LOG.console = False
+    bench_noop()
+    print()
+
+    tms = FakeTMS(seed=0, extra_courses=5)
+    utils.set_base_url(tms.start())
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+        bench_requests(user, user.get_teachId("B0870"), args.requests)
+        print()
+        with tempfile.TemporaryDirectory() as tmp:
+            demo(tms, args.seconds, args.out or os.path.join(tmp, "trace.json"))
+        print()
+        if async_engine.available():
+            demo_async(args.seconds / 2)
+        else:
+            print("未安装 aiohttp，跳过异步引擎：pip install aiohttp")
+    finally:
+        tms.stop()
+
+
+if __name__ == "__main__":
+    main()
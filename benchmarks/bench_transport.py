@@ -0,0 +1,107 @@
+"""连接池大小与开放前预热对比（本地模拟服务器，新建连接有握手延迟）
+
+模拟服务器的每个新连接额外耗时 --handshake 秒（相当于 TCP + TLS 握手），
+N 个任务在开放时刻同时选课，连续 --rounds 轮，对比：
+    - 默认连接池（10 个连接），不预热
+    - 连接池与任务数一致，不预热
+    - 连接池与任务数一致，开放前 warmup()
+
+统计第一轮与之后各轮的请求延迟，以及新建、复用的连接数。
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_transport [--tasks 20] [--handshake 0.05]
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import threading
+import time
+
+import utils
+from benchmarks.bench_e2e import percentiles
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from transport import Transport
+from User import User
+
+CONFIGS = [
+    ("默认连接池，不预热", False, False),
+    ("连接池 = 任务数，不预热", True, False),
+    ("连接池 = 任务数，开放前预热", True, True),
+]
+
+
+def burst(user: User, teachId: str, tasks: int) -> list[float]:
+    """tasks 个线程同时选课一次，返回各请求的延迟"""
+    barrier = threading.Barrier(tasks)
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def task():
+        barrier.wait()
+        start = time.perf_counter()
+        user.select_course(teachId)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=task) for _ in range(tasks)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=20, help="选课任务数")
+    parser.add_argument("--rounds", type=int, default=5, help="开放后的请求轮数")
+    parser.add_argument(
+        "--handshake", type=float, default=0.05, help="新建连接的额外延迟（秒）"
+    )
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    # 默认连接池满时 urllib3 每丢弃一个连接都会打印警告
+    logging.getLogger("urllib3").setLevel(logging.ERROR)
+
+    tms = FakeTMS(latency=args.latency, handshake=args.handshake, seed=0)
+    course = next(iter(tms.courses.values()))
+    course.selected = course.capacity
+    utils.set_base_url(tms.start())
+    print(
+        f"{args.tasks} 个任务同时选课 {args.rounds} 轮，"
+        f"新建连接额外 {args.handshake * 1000:.0f} ms，"
+        f"服务器延迟 {args.latency * 1000:.0f} ms\n"
+    )
+    try:
+        for name, sized, warm in CONFIGS:
+            transport = Transport(pool_size=args.tasks) if sized else Transport()
+            with contextlib.redirect_stdout(io.StringIO()):
+                user = User("2022000000", "password", EMAIL_CONFIG, transport=transport)
+                if warm:
+                    user.warmup(args.tasks)
+            before = transport.stats()
+            connections = tms.connections
+
+            first = burst(user, course.teachId, args.tasks)
+            rest: list[float] = []
+            for _ in range(args.rounds - 1):
+                rest += burst(user, course.teachId, args.tasks)
+
+            stats = transport.stats()
+            print(name)
+            print(f"    第一轮    {percentiles(first)}")
+            if rest:
+                print(f"    之后各轮  {percentiles(rest)}")
+            print(
+                f"    开放后新建连接 {stats['created'] - before['created']:4d} 个，"
+                f"复用 {stats['reused'] - before['reused']:4d} 次"
+                f"（服务器端新连接 {tms.connections - connections} 个）\n"
+            )
+    finally:
+        tms.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""课程监控的每次查询开销
+
+    1. 离线：在 test_resourse 的选课页面上，对比每次查询都完整解析（lxml 和 course_parser）
+       与截取 table3 片段计算哈希的 CPU 耗时
+    2. 模拟服务器：CourseWatcher 连续查询，期间修改已选人数，
+       统计实际解析的次数和产生的变化事件
+
+用法（在项目根目录）：
+    python -m benchmarks.bench_watch [--repeat 200] [--polls 50]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import time
+from pathlib import Path
+
+import course_parser
+import logs
+import utils
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from User import User
+from watcher import CourseWatcher
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = ["第一次选课.html", "第二次选课.html"]
+
+
+def unchanged_poll(content: bytes) -> bytes:
+    section = course_parser.table3_section(content)
+    return hashlib.blake2b(section, digest_size=16).digest()
+
+
+def measure(func, content: bytes, repeat: int) -> float:
+    """每次调用的平均耗时（微秒）"""
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        func(content)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def bench_offline(repeat: int) -> None:
+    cases = [
+        ("lxml 解析", lambda c: course_parser._lxml_course_rows(c, "utf-8")),
+        ("course_parser 解析", course_parser.parse_course_rows),
+        ("table3 哈希", unchanged_poll),
+    ]
+    for name in FIXTURES:
+        content = (ROOT / "test_resourse" / name).read_bytes()
+        rows = len(course_parser.parse_course_rows(content))
+        print(f"{name}（{len(content) // 1024} KiB，{rows} 行）")
+        for case, func in cases:
+            print(f"    {case:<20}{measure(func, content, repeat):10.1f} us")
+
+
+def bench_watcher(polls: int) -> None:
+    tms = FakeTMS(seed=0)
+    course = next(iter(tms.courses.values()))
+    utils.set_base_url(tms.start())
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User("2022000000", "password", EMAIL_CONFIG)
+        watcher = CourseWatcher(user, [course.course_code], quiet=True)
+        events = []
+        watcher.subscribe(events.append)
+        for i in range(polls):
+            # 在中间两次修改已选人数
+            if i in (polls // 3, 2 * polls // 3):
+                course.selected += 1
+            watcher.poll_all()
+        parsed = watcher.polls - watcher.unchanged
+        print(
+            f"查询 {watcher.polls} 次，解析 {parsed} 次（含第一次），"
+            f"跳过 {watcher.unchanged} 次，变化事件 {len(events)} 个："
+        )
+        for change in events:
+            print(f"    {change.kind.value:<8}{change.describe()}")
+    finally:
+        tms.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=50)
+    args = parser.parse_args()
+
+    logs.LOG.console = False
+    bench_offline(args.repeat)
+    print()
+    bench_watcher(args.polls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""本地模拟 SMTP 服务器（明文，不校验密码）
+
+只实现发信所需的命令：EHLO/HELO、AUTH、MAIL、RCPT、DATA、RSET、NOOP、QUIT。
+收到的邮件保存在 messages 中，用于测试 notify.Notifier 和 utils.send。
+
+支持：
+    - 新建连接的额外耗时（模拟 TLS 握手和登录）
+    - 每封邮件的处理耗时
+    - 前若干个连接直接断开，模拟服务器暂时不可用
+    - 空闲连接超时关闭
+
+用法：
+    python -m benchmarks.fake_smtp --port 2525
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+from email import message_from_bytes, policy
+
+
+class FakeSMTP:
+    def __init__(
+        self,
+        connect_delay: float = 0.0,
+        data_delay: float = 0.0,
+        fail_connections: int = 0,
+        idle_timeout: float = 30.0,
+    ):
+        """
+        参数:
+            connect_delay: 每个新连接在发出欢迎信息前等待的秒数
+            data_delay: 每封邮件接收完成后等待的秒数
+            fail_connections: 前多少个连接直接关闭
+            idle_timeout: 连接空闲多少秒后由服务器关闭
+        """
+        self.connect_delay = connect_delay
+        self.data_delay = data_delay
+        self.fail_connections = fail_connections
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        # 收到的邮件（email.message.EmailMessage）
+        self.messages = []
+        self.lock = threading.Lock()
+        self.server: socketserver.ThreadingTCPServer | None = None
+
+    def config(self) -> dict:
+        """指向本服务器的邮件配置"""
+        host, port = self.server.server_address[:2]
+        return {
+            "smtp_server": host,
+            "smtp_port": port,
+            "ssl": False,
+            "from": "bench@example.com",
+            "pwd": "password",
+            "to": ["bench@example.com"],
+        }
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> dict:
+        handler = type("Handler", (_Handler,), {"smtp": self})
+        self.server = socketserver.ThreadingTCPServer((host, port), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.config()
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    smtp: FakeSMTP
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        smtp = self.smtp
+        with smtp.lock:
+            smtp.connections += 1
+            fail = smtp.connections <= smtp.fail_connections
+        if fail:
+            return
+        self.request.settimeout(smtp.idle_timeout)
+        time.sleep(smtp.connect_delay)
+        self.reply("220 fake-smtp ready")
+        try:
+            while line := self.rfile.readline():
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    self.reply("250-fake-smtp")
+                    self.reply("250 AUTH PLAIN LOGIN")
+                elif verb == "AUTH":
+                    self.reply("235 Authentication successful")
+                elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                    self.reply("250 OK")
+                elif verb == "DATA":
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = []
+                    while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+                        data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                    time.sleep(smtp.data_delay)
+                    message = message_from_bytes(b"".join(data), policy=policy.default)
+                    with smtp.lock:
+                        smtp.messages.append(message)
+                    self.reply("250 OK queued")
+                elif verb == "QUIT":
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("502 Command not implemented")
+        except (TimeoutError, ConnectionError):
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--connect-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    smtp = FakeSMTP(connect_delay=args.connect_delay)
+    smtp.start(args.host, args.port)
+    print(f"模拟 SMTP 服务器已启动: {args.host}:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        smtp.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import asyncio
+import concurrent.futures
+import io
+import multiprocessing
+import re
+import threading
+from collections import Counter
+
+import logs
+import metrics
+
+# 教务系统验证码为 4 位字母或数字
+CAPTCHA_LENGTH = 4
+CAPTCHA_CHARSET = "0-9A-Za-z"
+
+# 多轮识别使用的预处理方式，按优先级排列（票数相同时靠前的胜出）
+VARIANTS = ("raw", "binary", "denoise", "crop")
+
+
+def preprocess(img: bytes, variants=VARIANTS) -> dict:
+    """生成验证码图片的多种预处理版本
+
+    返回：
+        {预处理名称: 图片} 格式的字典，raw 为原始字节，其余为 PIL.Image。
+    """
+    # PIL 是 ddddocr 的依赖，延迟导入以免拖慢启动
+    from PIL import Image, ImageFilter, ImageOps
+
+    ret: dict = {}
+    gray = None
+    for name in variants:
+        if name == "raw":
+            ret[name] = img
+            continue
+        if gray is None:
+            gray = ImageOps.grayscale(Image.open(io.BytesIO(img)))
+        if name == "binary":
+            # 以平均亮度为阈值二值化，去掉浅色背景和干扰线
+            hist = gray.histogram()
+            mean = sum(i * n for i, n in enumerate(hist)) / max(sum(hist), 1)
+            ret[name] = gray.point(lambda p, t=mean: 255 if p > t else 0).convert("L")
+        elif name == "denoise":
+            ret[name] = gray.filter(ImageFilter.MedianFilter(3))
+        elif name == "crop":
+            # 裁掉四周各 2 像素的边框
+            w, h = gray.size
+            ret[name] = gray.crop((2, 2, w - 2, h - 2)) if w > 4 and h > 4 else gray
+        else:
+            raise ValueError(f"未知的预处理方式: {name}")
+    return ret
+
+
+class CaptchaSolver:
+    """验证码识别器
+
+    ddddocr 加载 ONNX 模型耗时较长，因此延迟到第一次识别时才加载，
+    也可以调用 warmup 在后台提前加载（例如在请求登录页的同时）。
+    所有 User 共享同一个实例，模型只加载一次。
+
+    solve 会对多种预处理结果分别识别并投票，
+    不符合长度和字符集的结果在本地丢弃，无需提交登录请求。
+    """
+
+    def __init__(
+        self,
+        length: int = CAPTCHA_LENGTH,
+        charset: str = CAPTCHA_CHARSET,
+        variants=VARIANTS,
+    ):
+        """
+        参数:
+            length: 验证码长度
+            charset: 验证码允许的字符，正则字符集写法
+            variants: 多轮识别使用的预处理方式，见 VARIANTS
+        """
+        self.pattern = re.compile(f"[{charset}]{{{length}}}")
+        self.variants = tuple(variants)
+        self._ocr = None
+        self._lock = threading.Lock()
+        self._warmup_thread: threading.Thread | None = None
+
+    @property
+    def loaded(self) -> bool:
+        """模型是否已加载"""
+        return self._ocr is not None
+
+    def _load(self):
+        # 双重检查，避免多个线程重复加载模型
+        if self._ocr is None:
+            with self._lock:
+                if self._ocr is None:
+                    import ddddocr
+
+                    self._ocr = ddddocr.DdddOcr(show_ad=False)
+        return self._ocr
+
+    def warmup(self) -> None:
+        """在后台线程中加载模型，立即返回"""
+        if self._ocr is not None or self._warmup_thread is not None:
+            return
+        with self._lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(
+                    target=self._load, name="captcha-warmup", daemon=True
+                )
+                self._warmup_thread.start()
+
+    def classification(self, img: bytes) -> str:
+        """识别验证码，模型未加载时会先阻塞加载"""
+        return self._load().classification(img)
+
+    def is_valid(self, text: str) -> bool:
+        """识别结果是否符合验证码的长度和字符集"""
+        return self.pattern.fullmatch(text) is not None
+
+    def vote(self, img: bytes) -> tuple[str | None, dict[str, str]]:
+        """对每种预处理结果分别识别，返回 (投票结果, {预处理名称: 识别结果})
+
+        没有合法结果时，投票结果为 None。
+        """
+        ocr = self._load()
+        try:
+            images = preprocess(img, self.variants)
+        except Exception:
+            # 图片无法解码时，只用原图识别
+            images = {"raw": img}
+
+        answers = {
+            name: ocr.classification(image).strip() for name, image in images.items()
+        }
+        valid = [text for text in answers.values() if self.is_valid(text)]
+        if not valid:
+            return None, answers
+        # Counter 按首次出现的顺序处理平票，即优先级靠前的预处理胜出
+        return Counter(valid).most_common(1)[0][0], answers
+
+    def solve(self, img: bytes) -> str | None:
+        """多轮识别验证码，结果不合法时返回 None"""
+        return self.vote(img)[0]
+
+    async def solve_async(self, img: bytes) -> str | None:
+        """在线程中识别，不阻塞事件循环"""
+        return await asyncio.to_thread(self.solve, img)
+
+
+# 全局共享的识别器
+solver = CaptchaSolver()
+
+
+# 进程池中每个工作进程的识别器，由 _init_worker 创建并预先加载模型
+_worker_solver: CaptchaSolver | None = None
+
+
+def _init_worker(length: int, charset: str, variants: tuple) -> None:
+    global _worker_solver
+    _worker_solver = CaptchaSolver(length, charset, variants)
+    _worker_solver._load()
+
+
+def _worker_solve(img: bytes) -> str | None:
+    return _worker_solver.solve(img)
+
+
+def _worker_ready() -> bool:
+    return _worker_solver is not None and _worker_solver.loaded
+
+
+class CaptchaPool:
+    """进程池验证码识别
+
+    ONNX 推理在调用线程中执行时会与轮询线程争抢 GIL 和 CPU，
+    多个 User 同时登录或重新登录时，轮询的延迟会明显上升。
+    CaptchaPool 把识别放到独立的工作进程中，每个进程启动时加载一次模型。
+
+    与 CaptchaSolver 接口相同（solve / solve_async / warmup），可传给
+    User(..., captcha_solver=…) 或 LoginPipeline。进程池不可用或超时时，
+    改用 fallback 在本进程中识别。
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        timeout: float = 10.0,
+        fallback: CaptchaSolver | None = None,
+        length: int = CAPTCHA_LENGTH,
+        charset: str = CAPTCHA_CHARSET,
+        variants=VARIANTS,
+    ):
+        """
+        参数:
+            workers: 工作进程数
+            timeout: 每张验证码的识别超时（秒），第一次识别包含模型加载，调用 warmup 可提前加载
+            fallback: 进程池失败时使用的识别器，默认为全局的 solver，None 时不回退
+            length / charset / variants: 同 CaptchaSolver
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.fallback = fallback if fallback is not None else solver
+        self._args = (length, charset, tuple(variants))
+        self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # 回退到本进程识别的次数
+        self.fallbacks = 0
+
+    @property
+    def loaded(self) -> bool:
+        """进程池是否已启动"""
+        return self._executor is not None
+
+    def _pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # 选课线程已在运行，用 spawn 而不是 fork，避免子进程继承锁的状态
+                    self._executor = concurrent.futures.ProcessPoolExecutor(
+                        self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=self._args,
+                    )
+        return self._executor
+
+    def warmup(self) -> None:
+        """启动所有工作进程并加载模型，立即返回"""
+        pool = self._pool()
+        for _ in range(self.workers):
+            pool.submit(_worker_ready)
+
+    def _reset(self, executor) -> None:
+        """进程池损坏时丢弃，下次识别时重新创建"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fallback(self, img: bytes, error: BaseException) -> str | None:
+        self.fallbacks += 1
+        metrics.REGISTRY.inc("captcha_fallbacks_total", error=type(error).__name__)
+        if self.fallback is None:
+            raise error
+        logs.LOG.log(
+            logs.WARNING,
+            "验证码进程池识别失败（%s），改为本进程识别",
+            type(error).__name__,
+        )
+        return self.fallback.solve(img)
+
+    def solve(self, img: bytes) -> str | None:
+        """在工作进程中识别验证码，结果不合法时返回 None"""
+        executor = self._pool()
+        try:
+            return executor.submit(_worker_solve, img).result(self.timeout)
+        except concurrent.futures.process.BrokenProcessPool as e:
+            self._reset(executor)
+            return self._fallback(img, e)
+        except (TimeoutError, OSError, RuntimeError) as e:
+            return self._fallback(img, e)
+
+    async def solve_async(self, img: bytes) -> str | None:
+        """在工作进程中识别验证码，不阻塞事件循环"""
+        executor = self._pool()
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, _worker_solve, img), self.timeout
+            )
+        except concurrent.futures.process.BrokenProcessPool as e:
+            self._reset(executor)
+            error = e
+        except (TimeoutError, OSError, RuntimeError) as e:
+            error = e
+        return await asyncio.to_thread(self._fallback, img, error)
+
+    def close(self) -> None:
+        """停止工作进程"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
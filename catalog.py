@@ -0,0 +1,225 @@
+import json
+import sqlite3
+import threading
+import time
+
+from course_parser import CourseRow
+
+# 查询整个课表时使用的查询方式：页面 selectAction 中的「按课程名称查询」，关键字为空
+QUERY_ALL = ("QueryName", "")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    chooseId TEXT PRIMARY KEY,
+    teachId TEXT,
+    course_code TEXT,
+    course TEXT,
+    teacher TEXT,
+    date TEXT,
+    campus TEXT,
+    selected TEXT,
+    fetched_at REAL
+);
+CREATE TABLE IF NOT EXISTS queries (
+    action TEXT,
+    key TEXT,
+    fetched_at REAL,
+    chooseIds TEXT,
+    PRIMARY KEY (action, key)
+);
+"""
+
+
+class CourseCatalog:
+    """课程信息缓存
+
+    以 chooseId 为主键保存解析后的课程行，并建立 teachId、课程代码、教师的二级索引。
+    同时记录每次查询（查询方式 + 关键字）返回了哪些课程，
+    这样按课程代码查询时，也能判断缓存中的结果是否完整。
+
+    超过 ttl 秒的数据视为过期。指定 path 时会持久化到 SQLite 文件，重启后仍可使用。
+    """
+
+    def __init__(self, ttl: float = 120.0, path: str | None = None):
+        """
+        参数:
+            ttl: 缓存有效期（秒）
+            path: SQLite 文件路径，None 表示只保存在内存中
+        """
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.RLock()
+        # {chooseId: (CourseRow, 获取时间)}
+        self._rows: dict[str, tuple[CourseRow, float]] = {}
+        self._by_teachId: dict[str, str] = {}
+        self._by_code: dict[str, set[str]] = {}
+        self._by_teacher: dict[str, set[str]] = {}
+        # {(查询方式, 关键字): (获取时间, [chooseId, ...])}
+        self._queries: dict[tuple[str, str], tuple[float, list[str]]] = {}
+
+        self._db: sqlite3.Connection | None = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _fresh(self, fetched_at: float, max_age: float | None = None) -> bool:
+        return time.time() - fetched_at < (self.ttl if max_age is None else max_age)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _index(self, row: CourseRow, fetched_at: float) -> None:
+        old = self._rows.get(row.chooseId)
+        if old is not None:
+            self._unindex(old[0])
+        self._rows[row.chooseId] = (row, fetched_at)
+        if row.teachId:
+            self._by_teachId[row.teachId] = row.chooseId
+        self._by_code.setdefault(row.course_code, set()).add(row.chooseId)
+        for name in row.teacher.split():
+            self._by_teacher.setdefault(name, set()).add(row.chooseId)
+
+    def _unindex(self, row: CourseRow) -> None:
+        if self._by_teachId.get(row.teachId) == row.chooseId:
+            del self._by_teachId[row.teachId]
+        self._by_code.get(row.course_code, set()).discard(row.chooseId)
+        for name in row.teacher.split():
+            self._by_teacher.get(name, set()).discard(row.chooseId)
+
+    def add(
+        self,
+        rows: list[CourseRow],
+        query: tuple[str, str] | None = None,
+        fetched_at: float | None = None,
+    ) -> None:
+        """加入一次查询得到的课程行
+
+        参数:
+            rows: 解析得到的课程行
+            query: (查询方式, 关键字)，表示 rows 是该查询的完整结果
+            fetched_at: 获取时间，默认为当前时间
+        """
+        if fetched_at is None:
+            fetched_at = time.time()
+        with self._lock:
+            for row in rows:
+                self._index(row, fetched_at)
+            if query is not None:
+                self._queries[query] = (fetched_at, [r.chooseId for r in rows])
+            self._save(rows, query, fetched_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+            self._by_teachId.clear()
+            self._by_code.clear()
+            self._by_teacher.clear()
+            self._queries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM courses")
+                self._db.execute("DELETE FROM queries")
+                self._db.commit()
+
+    # ------------------------------------------------------------------
+    # 查询，数据过期或不完整时返回 None，由调用方重新请求
+    # ------------------------------------------------------------------
+
+    def get(self, chooseId: str) -> CourseRow | None:
+        """根据选课编号查询未过期的课程行"""
+        with self._lock:
+            item = self._rows.get(chooseId)
+            if item is not None and self._fresh(item[1]):
+                return item[0]
+            return None
+
+    def by_teachId(self, teachId: str) -> CourseRow | None:
+        with self._lock:
+            chooseId = self._by_teachId.get(teachId)
+        return self.get(chooseId) if chooseId else None
+
+    def _query_result(
+        self, query: tuple[str, str], max_age: float | None = None
+    ) -> list[CourseRow] | None:
+        q = self._queries.get(query)
+        if q is None or not self._fresh(q[0], max_age):
+            return None
+        ret = []
+        for chooseId in q[1]:
+            item = self._rows.get(chooseId)
+            if item is None:
+                return None
+            ret.append(item[0])
+        return ret
+
+    def by_course_code(
+        self, code: str, max_age: float | None = None
+    ) -> list[CourseRow] | None:
+        """按课程代码查询，缓存中没有该代码的完整结果时返回 None
+
+        结果来自该课程代码的查询，或整个课表的查询，只使用这次查询返回的课程，
+        之后被删除的开课不会出现。余量（selected）是查询时的数据，
+        需要当前余量时传入较小的 max_age（秒，默认为 ttl）。
+        """
+        with self._lock:
+            rows = self._query_result(("CourseCode", code), max_age)
+            if rows is not None:
+                return rows
+            rows = self._query_result(QUERY_ALL, max_age)
+            if rows is None:
+                return None
+            rows = [row for row in rows if row.course_code == code]
+            return sorted(rows, key=lambda row: row.chooseId) or None
+
+    def by_teacher(self, name: str) -> list[CourseRow]:
+        """按教师姓名查询缓存中未过期的课程"""
+        with self._lock:
+            ids = sorted(self._by_teacher.get(name, ()))
+            return [self._rows[i][0] for i in ids if self._fresh(self._rows[i][1])]
+
+    # ------------------------------------------------------------------
+    # SQLite 持久化
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        assert self._db is not None
+        cur = self._db.execute(
+            "SELECT teacher, date, campus, course, course_code, selected, "
+            "chooseId, teachId, fetched_at FROM courses"
+        )
+        for *fields, fetched_at in cur:
+            self._index(CourseRow(*fields), fetched_at)
+        cur = self._db.execute("SELECT action, key, fetched_at, chooseIds FROM queries")
+        for action, key, fetched_at, chooseIds in cur:
+            self._queries[(action, key)] = (fetched_at, json.loads(chooseIds))
+
+    def _save(
+        self,
+        rows: list[CourseRow],
+        query: tuple[str, str] | None,
+        fetched_at: float,
+    ) -> None:
+        if self._db is None:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO courses (teacher, date, campus, course, "
+            "course_code, selected, chooseId, teachId, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(*row, fetched_at) for row in rows],
+        )
+        if query is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?)",
+                (*query, fetched_at, json.dumps([r.chooseId for r in rows])),
+            )
+        self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -7,6 +7,12 @@ password = "2023114566"
 # False: 使用原本的教务系统（日常使用的）
 USE_NEW_SYSTEM = True
 
+# HTTP 后端，见 backends.py
+# "requests": 默认，urllib3 连接池
+# "httpx": 需要安装 httpx；HTTP2 = True 时使用 HTTP/2（还需要 pip install httpx[http2]）
+HTTP_BACKEND = "requests"
+HTTP2 = False
+
 # email config
 email_config = {
     "smtp_server": "smtp.qq.com",  # QQ 邮箱
@@ -0,0 +1,380 @@
+"""课程表格解析
+
+直接在响应的字节内容上截取 table3 片段，一次扫描切出所有行和单元格，
+再按位置读取需要的单元格，只解码用到的文本。
+遇到嵌套表格、标签未闭合等不规则结构时，退回到 lxml 解析，保证结果与 XPath 一致。
+"""
+
+import html
+import re
+import threading
+from typing import NamedTuple
+
+from lxml import etree  # type: ignore
+
+import tracing
+
+# 教务系统页面均为 UTF-8 编码
+ENCODING = "utf-8"
+
+_TABLE_MARKERS = (b'id="table3"', b"id='table3'", b"id=table3")
+
+_TAG = re.compile(rb"<[^>]*>")
+# 行和单元格的开闭标签，在小写后的内容上匹配
+_STRUCT = re.compile(rb"<(/?t[rd])(?=[\s/>])[^>]*>")
+_TAG_NAME = re.compile(rb"</?([a-zA-Z][a-zA-Z0-9]*)")
+_COMMENT = re.compile(rb"<!--.*?-->", re.S)
+_SPAN = re.compile(rb"<span\b[^>]*>(.*?)</span\s*>", re.S | re.I)
+_LINK = re.compile(rb"<a\b[^>]*>(.*?)</a\s*>", re.S | re.I)
+_ONCLICK = re.compile(
+    rb"""<input\b[^>]*?\sonclick\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.I
+)
+
+_PAGE_COUNT = re.compile("共\\[(\\d+)\\]页".encode())
+
+_local = threading.local()
+
+
+class CourseRow(NamedTuple):
+    """课程表格中的一行，字段顺序与 utils.parse_course_table 的字典一致"""
+
+    teacher: str
+    date: str
+    campus: str
+    course: str
+    course_code: str
+    selected: str
+    chooseId: str
+    teachId: str
+
+
+class SelectedRow(NamedTuple):
+    """已选课程列表中的一行"""
+
+    chooseId: str
+    listId: str
+
+
+class _Irregular(Exception):
+    """页面结构不规则，需要退回 lxml 解析"""
+
+
+def table3_section(content: bytes) -> bytes | None:
+    """截取 table3 的 HTML 片段（从 <table 到对应的 </table>）
+
+    找不到时返回 None。
+    """
+    for marker in _TABLE_MARKERS:
+        pos = content.find(marker)
+        if pos != -1:
+            break
+    else:
+        return None
+
+    start = content.rfind(b"<table", 0, pos)
+    if start == -1:
+        return None
+
+    # 处理嵌套表格，找到与开头匹配的 </table>
+    depth = 0
+    cursor = start
+    while True:
+        open_pos = content.find(b"<table", cursor + 1)
+        close_pos = content.find(b"</table>", cursor + 1)
+        if close_pos == -1:
+            return content[start:]
+        if open_pos != -1 and open_pos < close_pos:
+            depth += 1
+            cursor = open_pos
+        elif depth:
+            depth -= 1
+            cursor = close_pos
+        else:
+            return content[start : close_pos + len(b"</table>")]
+
+
+def _to_bytes(content: str | bytes, encoding: str) -> bytes:
+    if isinstance(content, str):
+        return content.encode(encoding)
+    return content
+
+
+# ---------------------------------------------------------------------------
+# 扫描实现
+# ---------------------------------------------------------------------------
+
+
+def _scan_rows(section: bytes) -> list[list[bytes]]:
+    """把 table3 片段切分为 [[单元格内容, ...], ...]"""
+    if b"<!--" in section:
+        section = _COMMENT.sub(b"", section)
+    if b"\r" in section:
+        # 与 libxml2 一致，统一换行符
+        section = section.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    # 只在小写副本上查找标签位置，下标与原片段一一对应
+    low = section.lower()
+    if low.count(b"<table") != 1:
+        raise _Irregular
+
+    rows = []
+    cells = None
+    cell_start = -1
+    # 出现未闭合或嵌套的 tr、td 时视为不规则
+    for m in _STRUCT.finditer(low):
+        tag = m.group(1)
+        if tag == b"td":
+            if cells is None or cell_start != -1:
+                raise _Irregular
+            cell_start = m.end()
+        elif tag == b"/td":
+            if cell_start == -1:
+                raise _Irregular
+            cells.append(section[cell_start : m.start()])
+            cell_start = -1
+        elif tag == b"tr":
+            if cells is not None:
+                raise _Irregular
+            cells = []
+        else:
+            if cells is None or cell_start != -1:
+                raise _Irregular
+            rows.append(cells)
+            cells = None
+    if cells is not None:
+        raise _Irregular
+    return rows
+
+
+def _check_brackets(cell: bytes) -> None:
+    """属性值或文本中出现裸露的 < 或 > 时，简单的标签匹配会出错"""
+    if cell.count(b"<") != cell.count(b">"):
+        raise _Irregular
+
+
+def _texts(cell: bytes | None, encoding: str) -> list[str]:
+    """单元格中的所有文本节点，等价于 XPath 的 .//text()"""
+    if not cell:
+        return []
+    _check_brackets(cell)
+    ret = []
+    for frag in _TAG.split(cell):
+        if frag:
+            text = frag.decode(encoding)
+            if "&" in text:
+                text = html.unescape(text)
+            ret.append(text)
+    return ret
+
+
+def _only_tags(cell: bytes, allowed: tuple[bytes, ...]) -> None:
+    """单元格中只能出现 allowed 中的标签，否则视为不规则"""
+    _check_brackets(cell)
+    for tag in _TAG.findall(cell):
+        m = _TAG_NAME.match(tag)
+        if m is None or m.group(1).lower() not in allowed:
+            raise _Irregular
+
+
+def _span_text(cell: bytes | None, n: int, encoding: str) -> str:
+    """等价于 string(td/span[n+1])"""
+    if not cell:
+        return ""
+    _only_tags(cell, (b"span",))
+    spans = _SPAN.findall(cell)
+    if len(spans) <= n:
+        return ""
+    inner = spans[n]
+    if b"<span" in inner.lower():
+        raise _Irregular
+    return "".join(_texts(inner, encoding)).strip()
+
+
+def _link_span_text(cell: bytes | None, encoding: str) -> str:
+    """等价于 string(td/a/span)"""
+    if not cell:
+        return ""
+    for link in _LINK.findall(cell):
+        _only_tags(link, (b"span", b"u", b"br"))
+        spans = _SPAN.findall(link)
+        if spans:
+            return "".join(_texts(spans[0], encoding)).strip()
+    return ""
+
+
+def _scan_course_rows(section: bytes, encoding: str) -> list[CourseRow]:
+    rows = _scan_rows(section)
+    if len(rows) < 2:
+        return []
+
+    ret = []
+    for cells in rows[1:-1]:
+        cells = cells + [None] * (15 - len(cells))
+
+        def string(i: int) -> str:
+            return "".join(_texts(cells[i], encoding)).strip()
+
+        def joined(i: int, sep: str) -> str:
+            texts = (t.strip() for t in _texts(cells[i], encoding))
+            return sep.join(t for t in texts if t)
+
+        # 第二次选课开始，没有第十四行的「申请人数」，校区改为十四行
+        campus = _link_span_text(cells[14], encoding) or _link_span_text(
+            cells[13], encoding
+        )
+        ret.append(
+            CourseRow(
+                joined(8, " "),
+                joined(10, ", "),
+                campus,
+                string(3),
+                string(2),
+                string(12),
+                _span_text(cells[1], 1, encoding),
+                _span_text(cells[1], 0, encoding),
+            )
+        )
+    return ret
+
+
+def _scan_selected_rows(section: bytes, encoding: str) -> list[SelectedRow]:
+    ret = []
+    for cells in _scan_rows(section)[1:-1]:
+        if len(cells) < 12:
+            continue
+
+        # 等价于 td[3]/text()[0]
+        cell = cells[2]
+        if b"<" in cell:
+            raise _Irregular
+        if not cell:
+            continue
+        text = cell.decode(encoding)
+        if "&" in text:
+            text = html.unescape(text)
+
+        _only_tags(cells[11], (b"input",))
+        m = _ONCLICK.search(cells[11])
+        if m is None:
+            continue
+        raw = next(g for g in m.groups() if g is not None).decode(encoding)
+        onclick_attr = html.unescape(raw)
+        # 解析如: onclick="...delCourse('...','LIST_ID',...)"
+        parts = onclick_attr.strip().split(",")
+        if len(parts) < 2:
+            continue
+        ret.append(SelectedRow(text.strip(), parts[-2].strip("'\"")))
+    return ret
+
+
+# ---------------------------------------------------------------------------
+# lxml 实现，用于不规则页面
+# ---------------------------------------------------------------------------
+
+
+def _parser(encoding: str):
+    # lxml 的解析器不保证线程安全，每个线程各用一个
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    parser = parsers.get(encoding)
+    if parser is None:
+        parser = parsers[encoding] = etree.HTMLParser(encoding=encoding)
+    return parser
+
+
+def _lxml_rows(content: bytes, encoding: str) -> list:
+    """返回 table3 下所有 tr 元素"""
+    root = etree.fromstring(content, _parser(encoding))
+    if root is None:
+        return []
+    found = root.xpath('//*[@id="table3"]')
+    if not found:
+        return []
+    return list(found[0].iterchildren("tr"))
+
+
+@tracing.traced("lxml_course_rows", "parse")
+def _lxml_course_rows(content: bytes, encoding: str) -> list[CourseRow]:
+    rows = _lxml_rows(content, encoding)
+    if len(rows) < 2:
+        return []
+
+    ret = []
+    for item in rows[1:-1]:
+        text_nodes = item.xpath("td[9]//text()")
+        date_nodes = item.xpath("td[11]//text()")
+        campus = (
+            item.xpath("string(td[15]/a/span)") or item.xpath("string(td[14]/a/span)")
+        ).strip()
+        ret.append(
+            CourseRow(
+                " ".join([t.strip() for t in text_nodes if t.strip()]),
+                ", ".join([t.strip() for t in date_nodes if t.strip()]),
+                campus,
+                item.xpath("string(td[4])").strip(),
+                item.xpath("string(td[3])").strip(),
+                item.xpath("string(td[13])").strip(),
+                item.xpath("string(td[2]/span[2])").strip(),
+                item.xpath("string(td[2]/span[1])").strip(),
+            )
+        )
+    return ret
+
+
+@tracing.traced("lxml_selected_rows", "parse")
+def _lxml_selected_rows(content: bytes, encoding: str) -> list[SelectedRow]:
+    ret = []
+    for element in _lxml_rows(content, encoding)[1:-1]:
+        try:
+            current_chooseId = element.xpath("td[3]/text()")[0].strip()
+            onclick_attr = element.xpath("td[12]/input/@onclick")[0]
+            list_id = onclick_attr.strip().split(",")[-2].strip("'\"")
+        except IndexError:
+            continue
+        ret.append(SelectedRow(current_chooseId, list_id))
+    return ret
+
+
+# ---------------------------------------------------------------------------
+# 对外接口
+# ---------------------------------------------------------------------------
+
+
+def parse_page_count(content: str | bytes, encoding: str = ENCODING) -> int:
+    """解析查询结果的总页数，如「共有记录[5]条，当前第[1]页，50条/页，共[1]页」"""
+    m = _PAGE_COUNT.search(_to_bytes(content, encoding))
+    return int(m.group(1)) if m else 1
+
+
+@tracing.traced("parse_course_rows", "parse")
+def parse_course_rows(
+    content: str | bytes, encoding: str = ENCODING
+) -> list[CourseRow]:
+    """解析课程表格，返回 CourseRow 列表"""
+    content = _to_bytes(content, encoding)
+    if b"table3" not in content:
+        return []
+    section = table3_section(content)
+    try:
+        if section is None:
+            raise _Irregular
+        return _scan_course_rows(section, encoding)
+    except _Irregular:
+        return _lxml_course_rows(content, encoding)
+
+
+@tracing.traced("parse_selected_rows", "parse")
+def parse_selected_rows(
+    content: str | bytes, encoding: str = ENCODING
+) -> list[SelectedRow]:
+    """解析已选课程列表，返回 SelectedRow 列表"""
+    content = _to_bytes(content, encoding)
+    if b"table3" not in content:
+        return []
+    section = table3_section(content)
+    try:
+        if section is None:
+            raise _Irregular
+        return _scan_selected_rows(section, encoding)
+    except _Irregular:
+        return _lxml_selected_rows(content, encoding)
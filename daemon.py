@@ -0,0 +1,527 @@
+"""无界面的常驻进程
+
+main.py 需要 marimo，启动慢，已经开始的选课线程也只能重启内核才能停止。
+daemon 不导入 marimo，保持登录状态并在后台运行选课和监控任务，
+通过本地 Unix socket 接收命令：添加、取消任务，修改间隔，查看状态和指标，都不需要重启或重新登录。
+
+用法（在项目根目录）：
+    python daemon.py serve                       # 启动，默认用 config.py 中的账号
+    python daemon.py select --teachId XXXXX --name 张健-地球物理勘探 --interval 0.5
+    python daemon.py select --chooseId B0870
+    python daemon.py watch FGEE007012 --interval 5
+    python daemon.py status
+    python daemon.py interval 1 2.0
+    python daemon.py cancel 1
+    python daemon.py metrics [--prometheus]
+    python daemon.py logs [-n 20] [--task 任务名]
+    python daemon.py shutdown
+
+协议：每个请求和响应都是一行 JSON，请求为 {"cmd": 命令, 参数...}，
+响应为 {"ok": true, ...} 或 {"ok": false, "error": 原因}。
+socket 文件的权限为仅当前用户可读写。没有 AF_UNIX 的平台改用 "127.0.0.1:端口"。
+
+客户端命令只导入标准库，选课相关的模块在 serve 时才导入。
+"""
+
+import argparse
+import concurrent.futures
+import inspect
+import itertools
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+DEFAULT_ADDRESS = ".daemon.sock" if hasattr(socket, "AF_UNIX") else "127.0.0.1:9465"
+
+
+def _tcp_address(address: str) -> tuple[str, int] | None:
+    """地址为 "host:port" 时返回 (host, port)，为 Unix socket 路径时返回 None"""
+    host, sep, port = address.rpartition(":")
+    if sep and host and port.isdigit():
+        return host, int(port)
+    return None
+
+
+class Task:
+    """daemon 中的一个任务：选课（monitor_loop）或监控（CourseWatcher）"""
+
+    def __init__(self, task_id: str, kind: str, name: str, username: str):
+        self.id = task_id
+        self.kind = kind
+        self.name = name
+        self.username = username
+        self.created = time.time()
+        # 选课任务的 Strategy.TaskControl 与线程
+        self.control = None
+        self.thread: threading.Thread | None = None
+        # 监控任务的 CourseWatcher，及收到的变化事件数和最近一条
+        self.watcher = None
+        self.changes = 0
+        self.last_change: str | None = None
+        # 是否由 cancel 结束
+        self.cancelled = False
+
+    @property
+    def state(self) -> str:
+        if self.control is not None:
+            if self.control.done:
+                return "done"
+            if self.control.cancelled:
+                return "cancelled"
+            alive = self.thread is not None and self.thread.is_alive()
+            return "running" if alive else "stopped"
+        if self.watcher.running:
+            return "running"
+        if self.watcher.error is not None:
+            return "error"
+        return "cancelled" if self.cancelled else "done"
+
+    @property
+    def interval(self) -> float:
+        if self.control is not None:
+            return self.control.interval
+        return self.watcher.interval
+
+    def set_interval(self, seconds: float) -> None:
+        if self.control is not None:
+            self.control.interval = seconds
+        else:
+            self.watcher.interval = seconds
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self.control is not None:
+            self.control.cancel()
+        else:
+            self.watcher.stop()
+
+    def status(self) -> dict:
+        status = {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "user": self.username,
+            "state": self.state,
+            "interval": self.interval,
+            "created": self.created,
+        }
+        if self.control is not None:
+            status["attempts"] = self.control.attempts
+            status["last_result"] = self.control.last_result
+        else:
+            status["polls"] = self.watcher.polls
+            status["changes"] = self.changes
+            status["last_change"] = self.last_change
+            if self.watcher.error is not None:
+                status["error"] = str(self.watcher.error)
+        return status
+
+
+class Daemon:
+    """保存登录的用户和任务，处理命令，线程安全"""
+
+    def __init__(self, config=None):
+        """
+        参数:
+            config: 默认账号的配置模块（含 username、password、email_config），
+                    默认为 config.py
+        """
+        if config is None:
+            import config
+        self.config = config
+        self.users: dict = {}
+        self.tasks: dict[str, Task] = {}
+        self.server: socketserver.BaseServer | None = None
+        self.stopping = False
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # 正在登录的 {学号: Future}，同一账号同时只登录一次，其他调用等待结果
+        self._logins: dict[str, concurrent.futures.Future] = {}
+
+    def handle(self, request: dict) -> dict:
+        """执行一条命令，返回响应"""
+        cmd = request.pop("cmd", None)
+        handler = getattr(self, f"cmd_{cmd}", None) if isinstance(cmd, str) else None
+        if handler is None:
+            return {"ok": False, "error": f"未知命令: {cmd}"}
+        try:
+            inspect.signature(handler).bind(**request)
+        except TypeError as e:
+            return {"ok": False, "error": f"参数错误: {e}"}
+        try:
+            return {"ok": True, **handler(**request)}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def user(self, username: str | None = None):
+        """取出已登录的用户；没有指定时使用唯一的用户，还没有用户时登录默认账号"""
+        with self._lock:
+            if username is None and len(self.users) == 1:
+                return next(iter(self.users.values()))
+            if username is not None and username in self.users:
+                return self.users[username]
+        if username is None or username == self.config.username:
+            return self.login(self.config.username, self.config.password)
+        raise KeyError(f"用户 {username} 未登录")
+
+    def login(self, username: str, password: str):
+        """登录并保存用户
+
+        登录要获取并识别验证码，需要几秒，不能持有 _lock：
+        否则 status 等其他命令都要等登录结束。登录完成后才在锁内加入 users。
+        """
+        from User import User
+
+        with self._lock:
+            if username in self.users:
+                return self.users[username]
+            future = self._logins.get(username)
+            owner = future is None
+            if owner:
+                future = self._logins[username] = concurrent.futures.Future()
+        if not owner:
+            return future.result()
+
+        # 与 main.py 共用默认账号的登录状态文件，其他账号各用一个
+        session_file = (
+            ".session.json"
+            if username == self.config.username
+            else f".session-{username}.json"
+        )
+        try:
+            user = User(
+                username,
+                password,
+                self.config.email_config,
+                session_file=session_file,
+            )
+        except BaseException as e:
+            with self._lock:
+                del self._logins[username]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self.users[username] = user
+            del self._logins[username]
+        future.set_result(user)
+        return user
+
+    def _add(self, kind: str, name: str, username: str) -> Task:
+        task = Task(str(next(self._ids)), kind, name, username)
+        with self._lock:
+            self.tasks[task.id] = task
+        return task
+
+    def _task(self, task_id) -> Task:
+        task = self.tasks.get(str(task_id))
+        if task is None:
+            raise KeyError(f"没有任务 {task_id}")
+        return task
+
+    def cmd_login(self, username=None, password=None) -> dict:
+        if username is None:
+            user = self.user()
+        else:
+            user = self.login(username, password or self.config.password)
+        return {"user": user.username}
+
+    def cmd_select(
+        self,
+        teachId=None,
+        chooseId=None,
+        name=None,
+        interval=0.5,
+        send_email=False,
+        username=None,
+    ) -> dict:
+        import Strategy
+
+        user = self.user(username)
+        if teachId is None:
+            if chooseId is None:
+                raise ValueError("需要 teachId 或 chooseId")
+            teachId = user.get_teachId(chooseId)
+            if teachId is None:
+                raise ValueError(f"编号 {chooseId} 无效")
+        task = self._add("select", name or chooseId or teachId, user.username)
+        task.control = Strategy.TaskControl(float(interval))
+        with self._lock:
+            tasks = list(self.tasks.values())
+        # 只计算仍在运行的选课任务（新任务的线程还未启动，另加 1）
+        running = 1 + sum(
+            1
+            for t in tasks
+            if t.kind == "select"
+            and t.username == user.username
+            and t.thread is not None
+            and t.thread.is_alive()
+        )
+        user.transport.ensure_pool_size(running)
+        task.thread = threading.Thread(
+            target=Strategy.monitor_loop,
+            name=f"task-{task.id}",
+            kwargs={
+                "user": user,
+                "task_name": task.name,
+                "func": user.select_course,
+                "interval": float(interval),
+                "args": (teachId,),
+                "send_email": send_email,
+                "control": task.control,
+            },
+            daemon=True,
+        )
+        task.thread.start()
+        return {"task": task.status()}
+
+    def cmd_watch(self, codes, interval=5.0, username=None) -> dict:
+        from watcher import CourseWatcher
+
+        if isinstance(codes, str):
+            codes = [codes]
+        user = self.user(username)
+        task = self._add("watch", ",".join(codes), user.username)
+        task.watcher = CourseWatcher(user, codes, float(interval))
+
+        def on_change(change) -> None:
+            task.changes += 1
+            task.last_change = change.describe()
+
+        task.watcher.subscribe(on_change)
+        task.watcher.start()
+        return {"task": task.status()}
+
+    def cmd_cancel(self, id) -> dict:
+        task = self._task(id)
+        task.cancel()
+        return {"task": task.status()}
+
+    def cmd_interval(self, id, seconds) -> dict:
+        task = self._task(id)
+        task.set_interval(float(seconds))
+        return {"task": task.status()}
+
+    def cmd_status(self) -> dict:
+        with self._lock:
+            users = list(self.users.values())
+            tasks = list(self.tasks.values())
+        return {
+            "users": [
+                {
+                    "user": u.username,
+                    "relogins": u.relogin_count,
+                    "transport": u.transport.stats(),
+                }
+                for u in users
+            ],
+            "tasks": [t.status() for t in tasks],
+        }
+
+    def cmd_metrics(self, prometheus=False) -> dict:
+        import metrics
+
+        if prometheus:
+            return {"text": metrics.REGISTRY.to_prometheus()}
+        return {"metrics": metrics.REGISTRY.snapshot()}
+
+    def cmd_logs(self, n=20, task=None) -> dict:
+        import logs
+
+        return {"lines": logs.LOG.tail(int(n), task)}
+
+    def cmd_shutdown(self) -> dict:
+        # 回复写出后再关闭服务器，见 _Handler
+        self.stopping = True
+        return {}
+
+    def close(self) -> None:
+        """取消所有任务"""
+        for task in list(self.tasks.values()):
+            if task.state == "running":
+                task.cancel()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon: Daemon = self.server.daemon
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"无法解析请求: {e}"}
+            else:
+                if isinstance(request, dict):
+                    response = daemon.handle(request)
+                else:
+                    response = {"ok": False, "error": "请求应为 JSON 对象"}
+            self.wfile.write(
+                json.dumps(response, ensure_ascii=False, default=str).encode() + b"\n"
+            )
+            self.wfile.flush()
+            if daemon.stopping:
+                # 在处理请求的线程中调用 shutdown 会一直等待自己，需要另开线程
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _warmup(daemon: Daemon) -> None:
+    try:
+        daemon.user()
+        # 第一个选课命令不必再等待导入
+        import Strategy  # noqa: F401
+    except Exception as e:
+        print(f"登录默认账号失败: {e}", file=sys.stderr, flush=True)
+
+
+def serve(address: str = DEFAULT_ADDRESS, daemon: Daemon | None = None) -> None:
+    """在当前线程中运行，直到收到 shutdown 命令或 Ctrl+C"""
+    if daemon is None:
+        daemon = Daemon()
+    tcp = _tcp_address(address)
+    if tcp is not None:
+        server = _TCPServer(tcp, _Handler)
+    else:
+        if os.path.exists(address):
+            # 上次没有正常退出留下的文件；仍有进程在监听时不覆盖
+            try:
+                request(address, {"cmd": "status"}, timeout=1)
+            except OSError:
+                os.remove(address)
+            else:
+                raise RuntimeError(f"{address} 上已有 daemon 在运行")
+        old_umask = os.umask(0o177)
+        try:
+            server = _UnixServer(address, _Handler)
+        finally:
+            os.umask(old_umask)
+    server.daemon = daemon
+    daemon.server = server
+
+    # 在后台登录默认账号，期间收到的命令等待登录完成后立即执行
+    threading.Thread(target=_warmup, args=(daemon,), daemon=True).start()
+    print(f"daemon 已启动: {address}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+        server.server_close()
+        if tcp is None and os.path.exists(address):
+            os.remove(address)
+
+
+def request(address: str, payload: dict, timeout: float | None = 30) -> dict:
+    """向 daemon 发送一条命令并返回响应"""
+    tcp = _tcp_address(address)
+    if tcp is not None:
+        sock = socket.create_connection(tcp, timeout=timeout)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(address)
+    with sock, sock.makefile("rwb") as f:
+        f.write(json.dumps(payload, ensure_ascii=False).encode() + b"\n")
+        f.flush()
+        line = f.readline()
+    if not line:
+        raise ConnectionError("daemon 关闭了连接")
+    return json.loads(line)
+
+
+def _print_status(response: dict) -> None:
+    for user in response["users"]:
+        print(f"用户 {user['user']}，重新登录 {user['relogins']} 次")
+    if not response["tasks"]:
+        print("没有任务")
+    for task in response["tasks"]:
+        if task["kind"] == "select":
+            detail = f"尝试 {task['attempts']} 次，最近：{task['last_result']}"
+        else:
+            detail = (
+                f"查询 {task['polls']} 次，变化 {task['changes']} 个，"
+                f"最近：{task['last_change']}"
+            )
+        print(
+            f"[{task['id']}] {task['kind']:<6} {task['name']}  {task['state']}"
+            f"  间隔 {task['interval']} 秒  {detail}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="选课脚本的常驻进程与控制命令")
+    parser.add_argument(
+        "--socket", default=DEFAULT_ADDRESS, help="socket 路径或 host:port"
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("serve", help="启动 daemon")
+    p = sub.add_parser("login", help="登录账号，默认为 config.py 中的账号")
+    p.add_argument("--username")
+    p.add_argument("--password")
+    p = sub.add_parser("select", help="添加选课任务")
+    p.add_argument("--teachId")
+    p.add_argument("--chooseId")
+    p.add_argument("--name")
+    p.add_argument("--interval", type=float, default=0.5)
+    p.add_argument("--send-email", action="store_true")
+    p.add_argument("--username")
+    p = sub.add_parser("watch", help="添加余量监控任务")
+    p.add_argument("codes", nargs="+")
+    p.add_argument("--interval", type=float, default=5.0)
+    p.add_argument("--username")
+    p = sub.add_parser("cancel", help="取消任务")
+    p.add_argument("id")
+    p = sub.add_parser("interval", help="修改任务的间隔")
+    p.add_argument("id")
+    p.add_argument("seconds", type=float)
+    sub.add_parser("status", help="查看用户和任务")
+    p = sub.add_parser("metrics", help="导出指标")
+    p.add_argument("--prometheus", action="store_true")
+    p = sub.add_parser("logs", help="最近的日志")
+    p.add_argument("-n", type=int, default=20)
+    p.add_argument("--task")
+    sub.add_parser("shutdown", help="取消所有任务并退出")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "serve":
+        serve(args.socket)
+        return 0
+
+    payload = {k: v for k, v in vars(args).items() if k != "socket" and v is not None}
+    if "send_email" in payload and not payload["send_email"]:
+        del payload["send_email"]
+    try:
+        response = request(args.socket, payload)
+    except OSError as e:
+        print(f"无法连接 daemon（{args.socket}）: {e}", file=sys.stderr)
+        return 1
+    if not response.pop("ok"):
+        print(response["error"], file=sys.stderr)
+        return 1
+
+    if args.cmd == "status":
+        _print_status(response)
+    elif args.cmd == "logs":
+        print("\n".join(response["lines"]))
+    elif args.cmd == "metrics" and args.prometheus:
+        print(response["text"], end="")
+    elif response:
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""日志后端
+
+utils.print_log 把日志记录放进队列，由后台线程统一写出，调用方不再做时间格式化和控制台 I/O：
+    - 控制台：后台线程每批只写一次 stdout，轮询时不会每个请求都触发一次输出
+    - JSONL 文件：每行一条记录，包含时间、级别、任务名、线程名和消息
+    - 内存环形缓冲区：保留最近 ring_size 条记录（包括 quiet 的记录），
+      可以在 notebook 中随时用 LOG.tail() 查看（marimo 只显示单元格所在线程的输出，
+      main.py 的日志单元格定时刷新 LOG.tail()）
+
+按任务设置日志级别（LOG.set_level(task, WARNING)），被过滤的记录在调用处直接返回；
+消息支持 % 格式的参数（print_log("%s : %s", args=(name, result))），只在写出时才格式化。
+"""
+
+import atexit
+import collections
+import json
+import queue
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+# 一条记录：(时间戳, 级别, 任务名, 线程名, 消息, 参数, 是否输出到控制台)
+Record = tuple[float, int, str | None, str, str, tuple, bool]
+
+
+def format_message(record: Record) -> str:
+    msg, args = record[4], record[5]
+    if not args:
+        return msg
+    try:
+        return msg % args
+    except (TypeError, ValueError):
+        return " ".join([msg, *map(str, args)])
+
+
+class _TimeFormatter:
+    """与原来的 print_log 相同的时间格式：2025-12-31 14:09:42:444
+
+    同一秒内的记录复用 strftime 的结果。缓存的秒数和前缀放在一个元组中整体替换，
+    写出线程和调用 tail() 的线程同时使用时也不会拼出错误的时间。
+    """
+
+    def __init__(self):
+        self._cache: tuple[int | None, str] = (None, "")
+
+    def __call__(self, timestamp: float) -> str:
+        second = int(timestamp)
+        cached, prefix = self._cache
+        if second != cached:
+            prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            self._cache = (second, prefix)
+        return f"{prefix}:{int((timestamp - second) * 1000):03d}"
+
+
+class LogBackend:
+    """线程安全的日志后端"""
+
+    def __init__(
+        self,
+        level: int = INFO,
+        console: bool = True,
+        jsonl_path: str | None = None,
+        ring_size: int = 1000,
+        stream=None,
+    ):
+        """
+        参数:
+            level: 默认日志级别，低于它的记录直接丢弃
+            console: 是否输出到控制台
+            jsonl_path: JSONL 日志文件（追加写入），None 表示不写文件
+            ring_size: 内存中保留的最近记录数，0 表示不保留
+            stream: 控制台输出流，默认为写出时的 sys.stdout
+        """
+        self.level = level
+        self.console = console
+        self.stream = stream
+        # {任务名: 级别}，未设置的任务使用 level
+        self.levels: dict[str, int] = {}
+        self.ring: collections.deque[Record] = collections.deque(maxlen=ring_size)
+        self.jsonl_path = jsonl_path
+        self._file = None
+        self._queue: queue.SimpleQueue[Record | None] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._format_time = _TimeFormatter()
+
+    # -- 配置 ----------------------------------------------------------------
+
+    def set_level(self, task: str | None, level: int | None) -> None:
+        """设置任务的日志级别，task 为 None 时设置默认级别，level 为 None 时恢复默认"""
+        if task is None:
+            self.level = level if level is not None else INFO
+        elif level is None:
+            self.levels.pop(task, None)
+        else:
+            self.levels[task] = level
+
+    def set_jsonl(self, path: str | None) -> None:
+        """更换 JSONL 日志文件，None 表示停止写文件，之后的记录写入新文件"""
+        self.flush()
+        self.jsonl_path = path
+
+    # -- 记录 ----------------------------------------------------------------
+
+    def enabled(self, level: int, task: str | None = None) -> bool:
+        """该任务的这一级别是否记录，按任务设置的级别优先"""
+        return level >= (self.levels.get(task, self.level) if task else self.level)
+
+    def log(
+        self,
+        level: int,
+        msg: str,
+        *args,
+        task: str | None = None,
+        quiet: bool = False,
+    ) -> None:
+        """记录一条日志，quiet 的记录只进入环形缓冲区和 JSONL 文件"""
+        if not self.enabled(level, task):
+            return
+        record = (
+            time.time(),
+            level,
+            task,
+            threading.current_thread().name,
+            msg,
+            args,
+            self.console and not quiet,
+        )
+        self.ring.append(record)
+        if record[6] or self.jsonl_path:
+            self._ensure_started()
+            with self._idle:
+                self._pending += 1
+            self._queue.put(record)
+
+    # -- 读取 ----------------------------------------------------------------
+
+    def format(self, record: Record) -> str:
+        """控制台格式：[时间] 消息"""
+        return f"[{self._format_time(record[0])}] {format_message(record)}"
+
+    def tail(
+        self, n: int = 50, task: str | None = None, level: int = DEBUG
+    ) -> list[str]:
+        """环形缓冲区中最近 n 条记录，可按任务名和最低级别筛选"""
+        records = [
+            r
+            for r in list(self.ring)
+            if r[1] >= level and (task is None or r[2] == task)
+        ]
+        return [self.format(r) for r in records[-n:]]
+
+    def records(self, n: int | None = None) -> list[dict]:
+        """环形缓冲区中最近 n 条记录（字典形式）"""
+        records = list(self.ring)
+        if n is not None:
+            records = records[-n:]
+        return [self.to_dict(r) for r in records]
+
+    def to_dict(self, record: Record) -> dict:
+        return {
+            "time": record[0],
+            "level": LEVEL_NAMES.get(record[1], str(record[1])),
+            "task": record[2],
+            "thread": record[3],
+            "message": format_message(record),
+        }
+
+    # -- 写出 ----------------------------------------------------------------
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """等待队列中的记录全部写出"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """写出剩余的记录并停止后台线程"""
+        self.flush()
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join(5.0)
+                self._thread = None
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="log-writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # 一次取出队列中已有的全部记录，合并写出
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            records = [r for r in batch if r is not None]
+            try:
+                self._write(records)
+            except Exception as e:  # noqa: BLE001
+                # 写日志失败不能影响选课
+                sys.__stderr__.write(f"写出日志失败: {e}\n")
+            finally:
+                with self._idle:
+                    self._pending -= len(records)
+                    self._idle.notify_all()
+            if stop:
+                return
+
+    def _write(self, records: list[Record]) -> None:
+        lines = [self.format(r) + "\n" for r in records if r[6]]
+        if lines:
+            stream = self.stream if self.stream is not None else sys.stdout
+            stream.write("".join(lines))
+            stream.flush()
+
+        # 文件只在写出线程中打开和关闭
+        path = self.jsonl_path
+        if self._file is not None and self._file.name != path:
+            self._file.close()
+            self._file = None
+        if path:
+            if self._file is None:
+                self._file = open(path, "a", encoding="utf-8")  # noqa: SIM115
+            self._file.write(
+                "".join(
+                    json.dumps(self.to_dict(r), ensure_ascii=False) + "\n"
+                    for r in records
+                )
+            )
+            self._file.flush()
+
+
+# 全局日志后端，utils.print_log 记录到这里
+LOG = LogBackend()
@@ -8,21 +8,38 @@ app = marimo.App(width="medium")
 def _():
     import marimo as mo
 
+    import logs
     import Strategy as tasks
     from config import email_config, password, username
     from User import User
 
-    return User, email_config, mo, password, tasks, username
+    return User, email_config, logs, mo, password, tasks, username
 
 
 @app.cell
 def _(User, email_config, password, username):
     # 先创建用户并登录，用 marimo 就是为了这里登录后，下面有问题可以快速调整，不重新登陆
-    user = User(username, password, email_config)
+    # 登录状态保存在 .session.json，重启内核后会先尝试恢复，失效时才重新登录
+    user = User(username, password, email_config, session_file=".session.json")
     # 登录成功会显示「【{时间}】登录成功！」
     return (user,)
 
 
+@app.cell
+def _(mo):
+    # 选课线程的日志由后台线程写出，marimo 不会显示在调用的单元格下，在这里定时刷新查看
+    log_refresh = mo.ui.refresh(default_interval="2s")
+    log_refresh
+    return (log_refresh,)
+
+
+@app.cell
+def _(log_refresh, logs, mo):
+    log_refresh
+    mo.plain_text("\n".join(logs.LOG.tail(30)))
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(r"""
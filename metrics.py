@@ -0,0 +1,346 @@
+"""运行指标
+
+User.request、登录流程和选课循环把耗时与结果记录到 REGISTRY：
+    swjtu_request_seconds{endpoint}          请求耗时直方图，endpoint 为 setAction 或页面名
+    swjtu_requests_total{endpoint,outcome}   请求结果计数，选课请求的 outcome 为 SelectStatus 的值
+    swjtu_login_seconds / swjtu_login_phase_seconds{phase} / swjtu_logins_total{outcome}
+    swjtu_relogins_total                     登录过期后实际重新登录的次数
+    swjtu_captcha_fallbacks_total{error}     CaptchaPool 失败后改为本进程识别的次数
+    swjtu_task_done{task}                    选课任务是否已完成（0 或 1）
+    swjtu_task_attempts_total{task}          每个选课任务的请求次数
+    swjtu_task_exceptions_total{task,error}  每个选课任务的异常次数
+    swjtu_attempts_until_done                任务完成前的请求次数直方图
+    swjtu_notifications_total{outcome}       通知消息数，outcome 为 sent / dropped / skipped
+    swjtu_notification_mails_total           实际发出的邮件数（多条消息可能合并为一封）
+    swjtu_notification_retries_total         邮件发送失败后的重试次数
+
+导出方式：
+    - REGISTRY.snapshot() / write_json(path)：JSON 快照
+    - REGISTRY.write_prometheus(path)：Prometheus 文本格式，可配合 node_exporter 的 textfile
+    - REGISTRY.start_export(...)：后台线程定期写出上面两种文件
+    - REGISTRY.serve(port)：在本机端口提供 /metrics 和 /metrics.json
+
+记录一次只需要一次加锁和几次字典操作（几微秒），与一次请求相比可以忽略，轮询时可以一直开着。
+"""
+
+import bisect
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+PREFIX = "swjtu_"
+
+# 请求耗时的直方图分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 任务完成前请求次数的分桶
+ATTEMPT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+class Histogram:
+    """固定分桶的直方图，counts[i] 为落在第 i 个桶（不累计）的数量，最后一个桶为 +Inf"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[int]:
+        total, result = 0, []
+        for c in self.counts:
+            total += c
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> float | None:
+        """按分桶估计分位数（取所在桶的上界），没有数据时为 None"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        for bound, total in zip((*self.buckets, math.inf), self.cumulative()):
+            if total >= rank:
+                return bound
+        return math.inf
+
+
+class Registry:
+    """线程安全的指标注册表"""
+
+    def __init__(self, enabled: bool = True):
+        """
+        参数:
+            enabled: 为 False 时所有记录操作直接返回
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # {(名称, 标签): 值}，标签为排好序的 ((键, 值), ...)
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._histograms: dict[tuple, Histogram] = {}
+        self._export_stop: threading.Event | None = None
+
+    # -- 记录 ----------------------------------------------------------------
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """计数器加 value"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """设置仪表值"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        **labels,
+    ) -> None:
+        """向直方图加入一个值，第一次记录时按 buckets 分桶"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # -- 读取 ----------------------------------------------------------------
+
+    def counter(self, name: str, **labels) -> float:
+        """计数器当前值，labels 为空时返回所有标签的合计"""
+        with self._lock:
+            if labels:
+                return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+            return sum(v for (n, _), v in self._counters.items() if n == name)
+
+    def snapshot(self) -> dict:
+        """所有指标的 JSON 快照"""
+
+        def entry(key, **values):
+            name, labels = key
+            return {"name": PREFIX + name, "labels": dict(labels), **values}
+
+        with self._lock:
+            return {
+                "time": time.time(),
+                "counters": [entry(k, value=v) for k, v in self._counters.items()],
+                "gauges": [entry(k, value=v) for k, v in self._gauges.items()],
+                "histograms": [
+                    entry(
+                        k,
+                        count=h.count,
+                        sum=h.sum,
+                        mean=h.sum / h.count if h.count else None,
+                        p50=_bound(h.quantile(0.5)),
+                        p90=_bound(h.quantile(0.9)),
+                        p99=_bound(h.quantile(0.99)),
+                        buckets=dict(
+                            zip(
+                                [str(b) for b in h.buckets] + ["+Inf"],
+                                h.cumulative(),
+                            )
+                        ),
+                    )
+                    for k, h in self._histograms.items()
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        lines: list[str] = []
+        typed: set[str] = set()
+
+        def header(name: str, kind: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                header(name, "counter")
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {_number(value)}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                header(name, "gauge")
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {_number(value)}")
+            for (name, labels), hist in sorted(
+                self._histograms.items(), key=lambda item: item[0]
+            ):
+                header(name, "histogram")
+                bounds = [_number(b) for b in hist.buckets] + ["+Inf"]
+                for le, total in zip(bounds, hist.cumulative()):
+                    lines.append(
+                        f"{PREFIX}{name}_bucket{_labels((*labels, ('le', le)))} {total}"
+                    )
+                lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {hist.sum!r}")
+                lines.append(f"{PREFIX}{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    # -- 导出 ----------------------------------------------------------------
+
+    def write_json(self, path: str) -> None:
+        _atomic_write(path, json.dumps(self.snapshot(), ensure_ascii=False))
+
+    def write_prometheus(self, path: str) -> None:
+        _atomic_write(path, self.to_prometheus())
+
+    def start_export(
+        self,
+        json_path: str | None = None,
+        prometheus_path: str | None = None,
+        interval: float = 10.0,
+    ) -> None:
+        """在后台线程中每隔 interval 秒写出快照，再次调用会替换之前的导出线程"""
+        self.stop_export()
+        stop = self._export_stop = threading.Event()
+
+        def loop():
+            while True:
+                try:
+                    if json_path:
+                        self.write_json(json_path)
+                    if prometheus_path:
+                        self.write_prometheus(prometheus_path)
+                except OSError as e:
+                    print(f"写出指标失败: {e}")
+                if stop.wait(interval):
+                    return
+
+        threading.Thread(target=loop, name="metrics-export", daemon=True).start()
+
+    def stop_export(self) -> None:
+        if self._export_stop is not None:
+            self._export_stop.set()
+            self._export_stop = None
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """在后台线程提供 /metrics（Prometheus）和 /metrics.json，返回服务器对象
+
+        默认只监听本机，停止时调用返回值的 shutdown()。
+        """
+        handler = type("Handler", (_Handler,), {"registry": self})
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        threading.Thread(
+            target=server.serve_forever, name="metrics-http", daemon=True
+        ).start()
+        return server
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry: Registry
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/metrics":
+            body = self.registry.to_prometheus().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode()
+            content_type = "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _bound(value: float | None) -> float | str | None:
+    """JSON 中没有无穷大，落在 +Inf 桶时写成字符串"""
+    return "+Inf" if value == math.inf else value
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _atomic_write(path: str, text: str) -> None:
+    """先写入同目录下的临时文件再替换，读取方不会看到写了一半的文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".metrics-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def endpoint(url: str, data=None) -> str:
+    """请求对应的接口名：setAction 参数，没有时为路径的最后一段"""
+    if isinstance(data, dict) and data.get("setAction"):
+        return data["setAction"]
+    parts = urlsplit(url)
+    for pair in parts.query.split("&"):
+        if pair.startswith("setAction="):
+            return pair[len("setAction=") :]
+    return parts.path.rsplit("/", 1)[-1] or "/"
+
+
+def error_outcome(e: BaseException) -> str:
+    """请求异常对应的 outcome，按类名判断，同时适用于 requests 和 aiohttp"""
+    name = type(e).__name__
+    if isinstance(e, TimeoutError) or "Timeout" in name:
+        return "timeout"
+    if isinstance(e, ConnectionError) or "Connect" in name or "Disconnect" in name:
+        return "connection_error"
+    return "error"
+
+
+def record_request(endpoint: str, seconds: float, outcome: str) -> None:
+    """记录一次请求的耗时和结果"""
+    REGISTRY.observe("request_seconds", seconds, endpoint=endpoint)
+    REGISTRY.inc("requests_total", endpoint=endpoint, outcome=outcome)
+
+
+# 全局注册表，User、LoginPipeline、Strategy 和 async_engine 记录到这里
+REGISTRY = Registry()
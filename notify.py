@@ -0,0 +1,245 @@
+"""后台邮件通知
+
+utils.send 每封邮件都要新建 SMTP_SSL 连接并登录，而且在选课线程中同步执行，
+SMTP 服务器慢或连不上时，刚选上课的线程会被卡住。Notifier 改为：
+    - send() 只把消息放进队列，立即返回，可以在任意线程调用
+    - 后台线程把 batch_window 秒内到达的消息合并成一封邮件
+    - 复用同一个 SMTP 连接，空闲超过 idle_timeout 秒后断开
+    - 发送失败时按指数退避重试
+    - 进程退出或调用 close() 时发送队列中剩余的消息
+
+邮件配置与 utils.send 相同，另外支持 "ssl": False（明文 SMTP，用于本地测试）。
+"""
+
+import atexit
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from html import escape
+
+import logs
+import metrics
+import utils
+
+
+class Notifier:
+    """邮件通知队列，线程安全"""
+
+    def __init__(
+        self,
+        config: dict,
+        batch_window: float = 2.0,
+        max_batch: int = 20,
+        retries: int = 5,
+        backoff: float = 2.0,
+        max_backoff: float = 60.0,
+        idle_timeout: float = 60.0,
+        timeout: float = 10.0,
+    ):
+        """
+        参数:
+            config: 邮件配置，见 config.email_config
+            batch_window: 收到第一条消息后再等待多少秒，期间到达的消息合并发送
+            max_batch: 一封邮件最多合并的消息数
+            retries: 发送失败后的最大重试次数
+            backoff: 第 n 次重试前等待 backoff * 2 ** (n - 1) 秒
+            max_backoff: 重试等待的上限（秒）
+            idle_timeout: SMTP 连接空闲多少秒后断开
+            timeout: SMTP 连接和每条命令的超时（秒）
+        """
+        self.config = config
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        # 已发送的邮件数、其中包含的消息数、放弃发送的消息数、建立的 SMTP 连接数
+        self.sent = 0
+        self.messages = 0
+        self.dropped = 0
+        self.connections = 0
+
+        self._queue: queue.Queue[tuple[str, str] | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._smtp: smtplib.SMTP | None = None
+        self._closed = threading.Event()
+
+    @property
+    def configured(self) -> bool:
+        """是否填写了发件邮箱和 SMTP 服务器"""
+        return bool(self.config.get("smtp_server") and self.config.get("from"))
+
+    def send(self, subject: str, text: str = "") -> None:
+        """加入发送队列，立即返回"""
+        if self._closed.is_set():
+            utils.print_log(f"通知队列已关闭，未发送: {subject}")
+            return
+        self._ensure_started()
+        self._queue.put((subject, text))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """等待队列中的消息全部处理完，返回是否在 timeout 秒内完成"""
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: float | None = 30.0) -> None:
+        """发送剩余的消息并停止后台线程"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                utils.print_log("邮件发送超时，剩余通知未发送")
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="notifier", daemon=True
+            )
+            self._thread.start()
+            # 后台线程是守护线程，退出前先把剩余的消息发出去
+            atexit.register(self.close)
+
+    # -- 后台线程 ------------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            if item is None:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                # 关闭时不再等待，直接取出已有的消息
+                remaining = 0 if self._closed.is_set() else deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(0.0, remaining))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.task_done()
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                self._deliver_safe(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                # 处理 None 之后才放入的消息
+                while not self._queue.empty():
+                    item = self._queue.get()
+                    if item is not None:
+                        self._deliver_safe([item])
+                    self._queue.task_done()
+                break
+        self._disconnect()
+
+    def _compose(self, batch: list[tuple[str, str]]) -> MIMEText:
+        if len(batch) == 1:
+            subject, text = batch[0]
+        else:
+            subject = f"{batch[0][0]} 等 {len(batch)} 条通知"
+            text = "<hr>".join(f"<h3>{escape(s)}</h3><p>{t}</p>" for s, t in batch)
+        msg = MIMEText(text, "html", "utf-8")
+        msg["From"] = self.config["from"]
+        msg["To"] = ",".join(self.config["to"])
+        msg["Subject"] = subject
+        return msg
+
+    def _deliver_safe(self, batch: list[tuple[str, str]]) -> None:
+        """发送一批通知，任何异常都只记录日志，后台线程继续处理之后的通知"""
+        try:
+            self._deliver(batch)
+        except Exception as e:
+            # 如配置缺少字段、内容无法编码，重试也不会成功
+            self._disconnect()
+            utils.print_log(
+                f"邮件发送出错，丢弃 {len(batch)} 条通知: {type(e).__name__}: {e}",
+                level=logs.ERROR,
+            )
+            self.dropped += len(batch)
+            metrics.REGISTRY.inc("notifications_total", len(batch), outcome="dropped")
+
+    def _deliver(self, batch: list[tuple[str, str]]) -> None:
+        if not self.configured:
+            utils.print_log(f"未配置邮箱，跳过 {len(batch)} 条通知")
+            self.dropped += len(batch)
+            metrics.REGISTRY.inc("notifications_total", len(batch), outcome="skipped")
+            return
+
+        msg = self._compose(batch)
+        for attempt in range(self.retries + 1):
+            reused = self._smtp is not None
+            try:
+                self._connect().send_message(msg)
+                self.sent += 1
+                self.messages += len(batch)
+                metrics.REGISTRY.inc("notifications_total", len(batch), outcome="sent")
+                metrics.REGISTRY.inc("notification_mails_total")
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                self._disconnect()
+                if attempt == self.retries:
+                    utils.print_log(f"邮件发送失败: {e}")
+                    self.dropped += len(batch)
+                    metrics.REGISTRY.inc(
+                        "notifications_total", len(batch), outcome="dropped"
+                    )
+                    return
+                metrics.REGISTRY.inc("notification_retries_total")
+                if reused and attempt == 0:
+                    # 复用的连接可能已被服务器断开，立即用新连接重试
+                    continue
+                delay = min(self.max_backoff, self.backoff * 2**attempt)
+                utils.print_log(f"邮件发送失败: {e}，{delay:.0f} 秒后重试")
+                # 关闭时不再等待退避
+                self._closed.wait(delay)
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            host, port = self.config["smtp_server"], self.config["smtp_port"]
+            if self.config.get("ssl", True):
+                smtp = smtplib.SMTP_SSL(host, port, timeout=self.timeout)
+            else:
+                smtp = smtplib.SMTP(host, port, timeout=self.timeout)
+            self.connections += 1
+            if self.config.get("pwd"):
+                smtp.login(self.config["from"], self.config["pwd"])
+            self._smtp = smtp
+        return self._smtp
+
+    def _disconnect(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
@@ -0,0 +1,319 @@
+"""选课开放时间调度
+
+选课系统未开放时，每次选课只会得到「选课系统未开放」。
+与其按正常间隔一直轮询，不如在已知开放时间的情况下：
+    - 用 HTTP Date 头和请求往返时间估计服务器时钟与本机时钟的偏差
+    - 开放前低频轮询（以防提前开放），到开放时刻再切回正常间隔
+    - 等待使用 monotonic 时钟，不受本机时间被校准的影响
+    - 开放前几秒调用 warmup 预先建立连接，开放后的第一批请求不必等待握手
+
+Date 头只精确到秒，单次测量的误差接近 1 秒。ClockSync 会调整后续请求的发送时间，
+让请求到达服务器时恰好跨过一个整秒，每次测量把偏差的范围缩小约一半，
+最终误差接近往返时间的一半。
+"""
+
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+import logs
+import utils
+from transport import Transport
+
+# 教务系统页面上的时间均为北京时间
+SERVER_TZ = timezone(timedelta(hours=8), "Asia/Shanghai")
+
+_OPEN_TIME = re.compile(
+    r"选课系统开放时间：\s*(\d{4}-\d{1,2}-\d{1,2})\s+(\d{1,2}:\d{1,2}:\d{1,2})(\.\d+)?"
+)
+
+
+def parse_opening_time(text: str) -> float | None:
+    """从未开放页面中解析开放时间
+
+    如「选课系统开放时间：2025-12-30 0:00:00.000至2026-01-07 23:59:59.000」。
+
+    返回：
+        开放时间的时间戳，找不到时为 None。
+    """
+    m = _OPEN_TIME.search(text)
+    if m is None:
+        return None
+    t = datetime.strptime(f"{m.group(1)} {m.group(2)}", "%Y-%m-%d %H:%M:%S")
+    fraction = float(m.group(3)) if m.group(3) else 0.0
+    return t.replace(tzinfo=SERVER_TZ).timestamp() + fraction
+
+
+def to_timestamp(value: float | str | datetime) -> float:
+    """把开放时间转换为时间戳，字符串和不带时区的 datetime 按北京时间处理"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=SERVER_TZ)
+    return value.timestamp()
+
+
+def fetch_opening_time(user) -> float | None:
+    """请求选课页面，系统未开放时从页面中解析开放时间"""
+    url = f"{utils.BASE_URL}/vatuu/CourseStudentAction?setAction=studentCourseSysList&viewType=delCourse"
+    res = user.request("GET", url)
+    return parse_opening_time(res.text)
+
+
+class ClockSync:
+    """估计服务器时钟与本机时钟的偏差
+
+    offset 表示服务器时间 - 本机时间（秒），真实值在 [offset - error, offset + error] 内。
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        timeout: float | None = None,
+        transport: Transport | None = None,
+    ):
+        """
+        参数:
+            url: 用于测量的地址，默认为登录页
+            timeout: 单次请求超时（秒），默认为 transport 中 "clock" 操作的超时
+            transport: 发送请求的 Transport，为 None 时 Strategy 和 async_engine
+                会设置为 user.transport，单独使用时新建一个
+        """
+        self.url = url
+        self.timeout = timeout
+        self.transport = transport
+        # 偏差的上下界
+        self.lo = -math.inf
+        self.hi = math.inf
+        self.samples = 0
+        # 最小往返时间
+        self.rtt: float | None = None
+
+    @property
+    def offset(self) -> float:
+        if self.samples == 0:
+            return 0.0
+        return (self.lo + self.hi) / 2
+
+    @property
+    def error(self) -> float:
+        return (self.hi - self.lo) / 2
+
+    def server_time(self, earliest: bool = False) -> float:
+        """估计的服务器当前时间
+
+        earliest 为 True 时返回误差范围内最早的可能值，据此定时不会早于服务器。
+        """
+        if earliest and self.samples:
+            return time.time() + self.lo
+        return time.time() + self.offset
+
+    def add_sample(self, t0: float, t1: float, date: str) -> None:
+        """加入一次测量
+
+        参数:
+            t0: 发送请求时的本机时间
+            t1: 收到响应时的本机时间
+            date: 响应的 Date 头
+        """
+        server = parsedate_to_datetime(date).timestamp()
+        # 服务器在 [t0, t1] 中的某一时刻生成 Date，当时的服务器时间在 [server, server + 1) 内
+        lo, hi = server - t1, server + 1 - t0
+        if lo > self.hi or hi < self.lo:
+            # 与之前的范围矛盾，说明某一方的时钟被调整过，重新开始
+            self.lo, self.hi = lo, hi
+        else:
+            self.lo, self.hi = max(self.lo, lo), min(self.hi, hi)
+        self.samples += 1
+        rtt = t1 - t0
+        self.rtt = rtt if self.rtt is None else min(self.rtt, rtt)
+
+    def measure(self, samples: int = 6) -> None:
+        """向服务器发送 samples 个请求估计偏差，大约需要 samples 秒
+
+        请求失败或 Date 头无法解析时停止测量，只使用已有的样本；
+        一个样本都没有时 offset 为 0，即按本机时钟定时。
+        """
+        url = self.url or f"{utils.BASE_URL}/service/login.html"
+        if self.transport is None:
+            self.transport = Transport()
+        # 单独的 session，与登录状态共用连接池，但不影响其 Cookie
+        ss = self.transport.mount(requests.Session())
+        kwargs = {} if self.timeout is None else {"timeout": self.timeout}
+        for _ in range(samples):
+            if self.samples:
+                # 让请求到达服务器时，按当前估计恰好是一个整秒
+                half_rtt = (self.rtt or 0.0) / 2
+                arrive = time.time() + half_rtt + self.offset
+                send_at = math.floor(arrive) + 1 - half_rtt - self.offset
+                time.sleep(max(0.0, send_at - time.time()))
+            t0 = time.time()
+            try:
+                res = self.transport.request(ss, "GET", url, op="clock", **kwargs)
+                t1 = time.time()
+                date = res.headers.get("Date")
+                if date:
+                    self.add_sample(t0, t1, date)
+            except (requests.RequestException, ValueError, TypeError) as e:
+                source = "已有的测量" if self.samples else "本机时钟"
+                utils.print_log(
+                    f"测量服务器时钟失败，改用{source}: {e}", level=logs.WARNING
+                )
+                break
+        ss.close()
+
+
+class OpeningScheduler:
+    """按开放时间调度选课请求
+
+    配合 Strategy.monitor_loop 和 async_engine 使用：收到「选课系统未开放」时，
+    下一次请求前等待 closed_delay() 秒，而不是正常的间隔。
+    """
+
+    def __init__(
+        self,
+        open_at: float | str | datetime,
+        clock: ClockSync | None = None,
+        lead: float = 0.0,
+        closed_interval: float = 30.0,
+        resync_before: float = 60.0,
+        samples: int = 6,
+        warmup=None,
+        warmup_before: float = 3.0,
+    ):
+        """
+        参数:
+            open_at: 开放时间（服务器时间），可以是时间戳、datetime 或 "2025-12-30 00:00:00"
+            clock: 时钟偏差估计，默认新建一个，第一次使用时测量
+            lead: 提前多少秒开始正常选课
+            closed_interval: 未开放时的轮询间隔（秒）
+            resync_before: 开放前多少秒重新测量一次偏差
+            samples: 每次测量的请求数
+            warmup: 开放前调用的函数（如 User.warmup），在后台线程中执行；
+                为 None 时 Strategy 和 async_engine 会设置为预热各自的连接
+            warmup_before: 开放前多少秒调用 warmup
+        """
+        self.open_at = to_timestamp(open_at)
+        self.clock = clock or ClockSync()
+        self.lead = lead
+        self.closed_interval = closed_interval
+        self.resync_before = resync_before
+        self.samples = samples
+        self.warmup = warmup
+        self.warmup_before = warmup_before
+
+        self._lock = threading.Lock()
+        self._resynced = False
+        # 是否有线程正在进行第一次测量，及第一次测量完成的事件
+        self._syncing = False
+        self._synced = threading.Event()
+        # 开放时刻对应的 monotonic 时间
+        self._deadline: float | None = None
+        self._warmup_timer: threading.Timer | None = None
+        self._warmed = False
+
+    def sync(self) -> None:
+        """测量时钟偏差，并据此计算开放时刻
+
+        测量要发出多个请求，不持有 _lock，只在更新开放时刻时加锁，
+        其他线程调用 remaining() 不会等待测量。
+        """
+        self.clock.measure(self.samples)
+        # 按最早的可能时间计算，宁可晚几十毫秒，也不要在开放前发出请求再多等一个间隔
+        wait = self.open_at - self.clock.server_time(earliest=True) - self.lead
+        with self._lock:
+            self._deadline = time.monotonic() + wait
+            self._schedule_warmup()
+        if self.clock.samples:
+            utils.print_log(
+                f"服务器时钟偏差 {self.clock.offset:+.3f}s（±{self.clock.error:.3f}s），"
+                f"距开放还有 {wait:.1f}s"
+            )
+        else:
+            utils.print_log(f"按本机时钟计算，距开放还有 {wait:.1f}s")
+
+    def _schedule_warmup(self) -> None:
+        """按最新的开放时刻安排预热，重新测量后会替换之前的定时器，调用时持有 _lock"""
+        if self.warmup is None or self._warmed:
+            return
+        if self._warmup_timer is not None:
+            self._warmup_timer.cancel()
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        timer = threading.Timer(
+            max(0.0, remaining - self.warmup_before), self._run_warmup
+        )
+        timer.daemon = True
+        timer.start()
+        self._warmup_timer = timer
+
+    def _run_warmup(self) -> None:
+        self._warmed = True
+        try:
+            self.warmup()
+        except Exception as e:
+            utils.print_log(f"预热连接失败: {e}")
+
+    def remaining(self) -> float:
+        """距离开放还有多少秒，第一次调用时会测量时钟偏差
+
+        测量在调用线程中进行，不持有 _lock。第一次测量时还不知道开放时刻，
+        其他线程等待测量结果（按本机时钟估计会在服务器时钟较快时晚醒来）；
+        开放前重新测量时，其他线程不等待，继续使用上一次的结果。
+        """
+        with self._lock:
+            deadline = self._deadline
+            measure = False
+            if deadline is None:
+                measure = not self._syncing
+                if measure:
+                    self._syncing = True
+                    self._synced.clear()
+            elif (
+                # 每个样本最多等 1 秒，来不及在开放前测完时不再测量
+                self.samples + 1 < deadline - time.monotonic() <= self.resync_before
+                and not self._resynced
+            ):
+                # 开放前再测一次，缩短测量到开放之间的时间，减小时钟漂移的影响
+                self._resynced = True
+                measure = True
+        if measure:
+            try:
+                self.sync()
+            finally:
+                with self._lock:
+                    self._syncing = False
+                self._synced.set()
+            deadline = self._deadline
+        if deadline is None:
+            # 其他线程正在进行第一次测量；测量出错时由下一个调用者重新测量
+            self._synced.wait()
+            return self.remaining()
+        return deadline - time.monotonic()
+
+    def is_open(self) -> bool:
+        return self.remaining() <= 0
+
+    def closed_delay(self, interval: float) -> float:
+        """收到「选课系统未开放」后，下一次请求前等待的秒数
+
+        距离开放超过 closed_interval 时低频轮询，否则正好在开放时刻醒来；
+        已过开放时间（服务器推迟开放）时按正常间隔 interval 轮询。
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            return interval
+        return min(self.closed_interval, remaining)
+
+    def wait(self) -> None:
+        """阻塞到开放时刻"""
+        while (remaining := self.remaining()) > 0:
+            time.sleep(min(remaining, self.closed_interval))
@@ -0,0 +1,133 @@
+"""全局请求节奏控制
+
+所有选课任务共用一个 PacingController，发送请求前先领取发送时间：
+    - 全局速率不超过 rate（请求/秒），按领取顺序排队，各任务轮流发送
+    - 响应变慢（超过 latency_target）或出错、超时时，rate 按比例下降
+    - 响应正常时 rate 缓慢回升（加性增加，乘性减少，即 AIMD）
+
+这样高峰期服务器变慢时，客户端会自动减少请求，
+避免大量请求在服务器排队后超时，也减轻对教务系统的压力。
+"""
+
+import asyncio
+import threading
+import time
+
+
+class PacingController:
+    """AIMD 请求节奏控制器，线程安全，同时支持同步和异步任务"""
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        min_rate: float = 0.5,
+        max_rate: float = 50.0,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_target: float = 1.0,
+    ):
+        """
+        参数:
+            rate: 初始速率（请求/秒）
+            min_rate: 速率下限
+            max_rate: 速率上限，即全局请求预算
+            increase: 响应正常时，速率每秒约增加多少
+            decrease: 变慢或出错时速率乘以该系数
+            latency_target: 响应时间超过该值（秒）视为服务器过载
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+
+        self._lock = threading.Lock()
+        self._rate = min(max(rate, min_rate), max_rate)
+        # 下一个可用的发送时间（monotonic）
+        self._next_slot = 0.0
+        # 上次降速的时间，之前发出的请求再变慢也不会重复降速
+        self._last_decrease = float("-inf")
+        # 上次降速时的响应时间，排队逐渐消化时响应时间下降，不必继续降速
+        self._decrease_latency = 0.0
+        # 响应时间的指数滑动平均
+        self._latency: float | None = None
+
+        self.requests = 0
+        self.errors = 0
+        self.slow = 0
+        self.decreases = 0
+
+    @property
+    def rate(self) -> float:
+        """当前速率（请求/秒）"""
+        return self._rate
+
+    @property
+    def latency(self) -> float | None:
+        """平滑后的响应时间（秒）"""
+        return self._latency
+
+    def stats(self) -> dict[str, float | int | None]:
+        with self._lock:
+            return {
+                "rate": self._rate,
+                "latency": self._latency,
+                "requests": self.requests,
+                "errors": self.errors,
+                "slow": self.slow,
+                "decreases": self.decreases,
+            }
+
+    def _reserve(self) -> float:
+        """领取下一个发送时间，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self._rate
+            return slot - now
+
+    def acquire(self) -> None:
+        """等待到可以发送下一个请求（同步）"""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """等待到可以发送下一个请求（异步）"""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, latency: float, error: bool = False) -> None:
+        """记录一次请求的结果，调整速率
+
+        参数:
+            latency: 响应时间（秒）
+            error: 是否出错或超时
+        """
+        with self._lock:
+            self.requests += 1
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += 0.2 * (latency - self._latency)
+
+            slow = latency > self.latency_target
+            if error or slow:
+                self.errors += error
+                self.slow += slow
+                now = time.monotonic()
+                # 降速前发出的请求按旧速率排队，它们变慢不说明新速率仍然过高
+                sent_after = now - latency >= self._last_decrease
+                growing = latency > self._decrease_latency * 1.1
+                if sent_after and (error or growing):
+                    self._last_decrease = now
+                    self._decrease_latency = latency
+                    self._rate = max(self.min_rate, self._rate * self.decrease)
+                    self.decreases += 1
+            else:
+                if self._latency <= self.latency_target:
+                    # 排队已经消化完
+                    self._decrease_latency = 0.0
+                # 每个正常响应增加 increase / rate，约等于每秒增加 increase
+                self._rate = min(self.max_rate, self._rate + self.increase / self._rate)
@@ -0,0 +1,265 @@
+"""选课志愿规划
+
+志愿（Wish）是一门课的课程代码和按优先级排列的开课偏好（教师名或选课编号）。
+规划器从课程缓存取出每门课的所有开课及上课时间（timetable 位图），
+用分支定界搜索（开课用位集做前向检查）找出互不冲突、也不与已选课程冲突的最优方案：
+    1. 选上的课程数最多
+    2. 课程数相同时，优先保留排在前面的志愿
+    3. 再按开课偏好的名次之和最小
+
+选课过程中某个开课已满或冲突时，调用 exclude 排除它，已选上的调用 lock 固定，
+再次 solve 只重新安排尚未选上的课程，并以上一次的方案作为初始解加快剪枝。
+"""
+
+import time
+from typing import NamedTuple
+
+from course_parser import CourseRow
+from timetable import parse_date
+from watcher import parse_seats
+
+
+class Wish(NamedTuple):
+    """一门课的志愿"""
+
+    course_code: str
+    # 按优先级排列的偏好，每项为教师名（包含即可）或选课编号
+    prefer: tuple[str, ...] = ()
+    # 偏好中的开课都不可用时，是否接受其他开课
+    any_section: bool = True
+
+
+class Plan(NamedTuple):
+    # {课程代码: 开课}
+    assignments: dict[str, CourseRow]
+    # 无法安排的课程代码，按志愿顺序
+    unassigned: list[str]
+    # 是否在 max_nodes 内搜索完毕（否则为目前找到的最好方案）
+    optimal: bool
+    nodes: int
+    seconds: float
+
+    def tasks(self) -> list[tuple[str, str]]:
+        """可以直接传给 run_select_courses_with_teachIds 的任务列表"""
+        return [
+            (row.teachId, f"{row.teacher}-{row.course}")
+            for row in self.assignments.values()
+        ]
+
+
+class _Stop(Exception):
+    """搜索的节点数超过上限"""
+
+
+def section_rank(wish: Wish, row: CourseRow) -> int | None:
+    """开课在志愿中的名次，0 最优，不接受时返回 None"""
+    for rank, key in enumerate(wish.prefer):
+        if key == row.chooseId or key in row.teacher:
+            return rank
+    return len(wish.prefer) if wish.any_section else None
+
+
+def is_full(row: CourseRow) -> bool:
+    seats = parse_seats(row.selected)
+    return seats is not None and seats[0] >= seats[1]
+
+
+class WishlistPlanner:
+    def __init__(
+        self,
+        wishes: list[Wish],
+        sections: dict[str, list[CourseRow]],
+        occupied: int = 0,
+        skip_full: bool = True,
+        max_nodes: int = 20_000,
+    ):
+        """
+        参数:
+            wishes: 志愿列表，排在前面的优先
+            sections: {课程代码: 开课列表}
+            occupied: 已选课程的上课时间位图，见 timetable.Timetable.occupied
+            skip_full: 是否排除已满的开课
+            max_nodes: 搜索节点数上限，超过时返回目前最好的方案
+        """
+        self.wishes = list(wishes)
+        self.sections = sections
+        self.occupied = occupied
+        self.skip_full = skip_full
+        self.max_nodes = max_nodes
+        # 选课过程中排除的选课编号
+        self.excluded: set[str] = set()
+        # 已选上的 {课程代码: 开课}
+        self.locked: dict[str, CourseRow] = {}
+        self.plan: Plan | None = None
+
+    @classmethod
+    def from_user(cls, user, wishes: list[Wish], **kwargs) -> "WishlistPlanner":
+        """从课程缓存（缺少时查询）取出开课，并以已选课程为占用时间"""
+        sections = {}
+        for wish in wishes:
+            rows = user.catalog.by_course_code(wish.course_code)
+            if rows is None:
+                rows, _ = user.query_courses("CourseCode", wish.course_code)
+            sections[wish.course_code] = rows
+        occupied = user.selected_timetable().occupied
+        return cls(wishes, sections, occupied, **kwargs)
+
+    def exclude(self, chooseId: str) -> None:
+        """排除一个开课（已满或冲突），下次 solve 时不再安排"""
+        self.excluded.add(chooseId)
+
+    def lock(self, course_code: str, row: CourseRow) -> None:
+        """固定已选上的开课"""
+        self.locked[course_code] = row
+        self.occupied |= parse_date(row.date) or 0
+
+    def _options(self, wish: Wish, occupied: int) -> list[tuple[int, int, CourseRow]]:
+        """志愿可用的 (名次, 位图, 开课)，按名次排序
+
+        与 occupied 冲突的开课直接去掉；名次不优于另一个开课、上课时间又包含它的开课
+        （如同一时间的不同教师）不会让方案更好，也去掉以缩小搜索范围。
+        """
+        options = []
+        for row in self.sections.get(wish.course_code, ()):
+            if row.chooseId in self.excluded or (self.skip_full and is_full(row)):
+                continue
+            rank = section_rank(wish, row)
+            if rank is None:
+                continue
+            # 上课时间无法识别时视为不占用时间
+            mask = parse_date(row.date) or 0
+            if not mask & occupied:
+                options.append((rank, mask, row))
+        options.sort(key=lambda option: option[0])
+        kept = []
+        for option in options:
+            if not any(r <= option[0] and m & option[1] == m for r, m, _ in kept):
+                kept.append(option)
+        return kept
+
+    def solve(self) -> Plan:
+        """计算方案，结果同时保存在 self.plan"""
+        start = time.perf_counter()
+        pending = [
+            i for i, w in enumerate(self.wishes) if w.course_code not in self.locked
+        ]
+        n_wishes = len(self.wishes)
+        options = [self._options(self.wishes[i], self.occupied) for i in pending]
+        ranks = [[option[0] for option in opts] for opts in options]
+        n = len(pending)
+        # 排在前面的志愿对应更高的位，「保留前面的志愿」即该整数更大
+        bits = [1 << (n_wishes - 1 - i) for i in pending]
+        # kills[k][a]：选了课程 k 的第 a 个开课后，与它冲突的 (课程, 开课位集)
+        kills = []
+        for k, opts in enumerate(options):
+            row_kills = []
+            for _, mask, _ in opts:
+                conflicts = []
+                for j, others in enumerate(options):
+                    if j == k:
+                        continue
+                    dead = 0
+                    for b, (_, other, _) in enumerate(others):
+                        if mask & other:
+                            dead |= 1 << b
+                    if dead:
+                        conflicts.append((j, dead))
+                row_kills.append(conflicts)
+            kills.append(row_kills)
+
+        # 方案的评分 (课程数, 志愿位, -名次和)，越大越好
+        best_score = (-1, 0, 0)
+        best: list[int | None] = [None] * n
+        chosen: list[int | None] = [None] * n
+        nodes = 0
+
+        def record(placed, got, rank_sum):
+            nonlocal best_score, best
+            score = (placed, got, -rank_sum)
+            if score > best_score:
+                best_score, best = score, list(chosen)
+
+        # 上一次的方案仍然可行时作为初始解
+        if self.plan is not None:
+            occupied, placed, got, rank_sum = 0, 0, 0, 0
+            for k, i in enumerate(pending):
+                row = self.plan.assignments.get(self.wishes[i].course_code)
+                for a, (rank, mask, option) in enumerate(options[k]):
+                    if row and option.chooseId == row.chooseId:
+                        if not mask & occupied:
+                            occupied |= mask
+                            chosen[k] = a
+                            placed, got = placed + 1, got | bits[k]
+                            rank_sum += rank
+                        break
+            record(placed, got, rank_sum)
+            chosen = [None] * n
+
+        def search(alive: list[int], remaining: list[int], placed, got, rank_sum):
+            """alive[k] 为课程 k 仍可选的开课位集（前向检查），remaining 为尚未决定的课程"""
+            nonlocal nodes
+            nodes += 1
+            if nodes > self.max_nodes:
+                raise _Stop
+            # 剩余课程只要还有可选开课，就假设都能按最优名次选上，不超过已有方案就剪枝
+            live = []
+            bound_got, bound_rank = got, rank_sum
+            pick, pick_count = -1, 0
+            for k in remaining:
+                a = alive[k]
+                if a:
+                    live.append(k)
+                    bound_got |= bits[k]
+                    bound_rank += ranks[k][(a & -a).bit_length() - 1]
+                    count = a.bit_count()
+                    if pick < 0 or count < pick_count:
+                        pick, pick_count = k, count
+            if (placed + len(live), bound_got, -bound_rank) <= best_score:
+                return
+            if not live:
+                record(placed, got, rank_sum)
+                return
+            # 可选开课最少的课程先决定，更早发现冲突
+            live.remove(pick)
+            a = alive[pick]
+            while a:
+                low = a & -a
+                a ^= low
+                b = low.bit_length() - 1
+                narrowed = list(alive)
+                for j, dead in kills[pick][b]:
+                    narrowed[j] &= ~dead
+                chosen[pick] = b
+                search(
+                    narrowed,
+                    live,
+                    placed + 1,
+                    got | bits[pick],
+                    rank_sum + ranks[pick][b],
+                )
+            chosen[pick] = None
+            search(alive, live, placed, got, rank_sum)
+
+        optimal = True
+        try:
+            search([(1 << len(opts)) - 1 for opts in options], list(range(n)), 0, 0, 0)
+        except _Stop:
+            optimal = False
+
+        assignments = dict(self.locked)
+        for k, i in enumerate(pending):
+            if best[k] is not None:
+                assignments[self.wishes[i].course_code] = options[k][best[k]][2]
+        # 按志愿顺序排列
+        assignments = {
+            w.course_code: assignments[w.course_code]
+            for w in self.wishes
+            if w.course_code in assignments
+        }
+        unassigned = [
+            w.course_code for w in self.wishes if w.course_code not in assignments
+        ]
+        self.plan = Plan(
+            assignments, unassigned, optimal, nodes, time.perf_counter() - start
+        )
+        return self.plan
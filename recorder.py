@@ -0,0 +1,369 @@
+"""HTTP 流量录制与回放
+
+test_resourse 中只有手动保存的几个页面，没有选课返回的 XML、登录过期页面、退课结果，
+也没有真实请求的耗时。RecordingAdapter 挂在 Transport 上，User.request、登录流程、
+预热和查询的所有请求都经过它，把请求与响应连同耗时写入压缩的归档文件：
+    - gzip 压缩的 JSON Lines，第一行是文件头，之后每行是一个请求或一个响应正文
+    - 相同的响应正文只保存一次，轮询时大部分响应都相同
+    - 不保存请求头、Cookie 和 Set-Cookie；表单中的学号、密码、验证码和 loginMsg 替换为 ***，
+      学号和密码在响应正文中出现的地方也一并替换，登录成功响应中的 loginMsg 同样替换
+    - 请求地址和参数中的地址只保存路径，不含服务器地址，回放时与 BASE_URL 无关
+
+选课的异步引擎（async_engine）直接用 aiohttp 发送请求，不经过 adapter；
+录制和回放时 Strategy 的批量选课即使传入 engine="async" 也会改用多线程，选课请求同样会被录下。
+
+ReplayAdapter 读取归档，按请求依次返回录制的响应，解析、登录过期检查和选课策略
+走的仍是原来的代码。speed 为 1 时按录制时的耗时等待后再返回，为 0 时立即返回。
+
+录制：
+    adapter = RecordingAdapter("traffic.jsonl.gz", secrets=[username, password])
+    user = User(username, password, email_config, transport=Transport(adapter=adapter))
+    ...
+    adapter.finish()
+
+回放：
+    transport = Transport(adapter=ReplayAdapter("traffic.jsonl.gz", speed=0))
+    user = User("2022000000", "password", email_config, transport=transport)
+"""
+
+import base64
+import collections
+import datetime
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from http.client import responses
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+ARCHIVE_VERSION = 1
+
+# 替换为 *** 的表单字段和查询参数
+SECRET_FIELDS = frozenset({"username", "password", "ranstring", "loginMsg"})
+
+# 每次请求都不同的时间戳参数，匹配请求时忽略
+VOLATILE_PARAMS = frozenset({"tt", "test"})
+
+# 保存的响应头，Set-Cookie 等不保存
+KEPT_HEADERS = ("Content-Type", "Date", "Location")
+
+MASK = "***"
+
+_JSESSIONID = re.compile(r";jsessionid=[^?#&\"'\s<>]*", re.IGNORECASE)
+_JSESSIONID_BYTES = re.compile(rb";jsessionid=[^?#&\"'\s<>]*", re.IGNORECASE)
+
+
+class Exchange(NamedTuple):
+    """一次录制的请求与响应"""
+
+    # 距录制开始的秒数
+    t: float
+    # 从发出请求到读完响应的秒数
+    elapsed: float
+    method: str
+    # 路径和查询参数，不含服务器地址
+    url: str
+    # 脱敏后的表单，没有请求体时为 None
+    body: str | None
+    status: int
+    headers: dict[str, str]
+    content: bytes
+    # 请求失败时的异常类名，此时没有响应
+    error: str | None
+    thread: str
+
+
+def _scrub_value(key: str, value: str) -> str:
+    if key in SECRET_FIELDS and value:
+        return MASK
+    # 参数中的完整地址（如 UserLoadingAction 的 url）只保留路径
+    if value.startswith(("http://", "https://")):
+        parts = urlsplit(value)
+        return parts.path + (f"?{parts.query}" if parts.query else "")
+    return value
+
+
+def _scrub_pairs(pairs: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    return [(k, _scrub_value(k, v)) for k, v in pairs]
+
+
+def scrub_url(url: str) -> str:
+    """去掉服务器地址、jsessionid，替换查询参数中的敏感字段"""
+    parts = urlsplit(_JSESSIONID.sub("", url))
+    if not parts.query:
+        return parts.path
+    pairs = parse_qsl(parts.query, keep_blank_values=True)
+    return f"{parts.path}?{urlencode(_scrub_pairs(pairs))}"
+
+
+def scrub_form(body) -> str | None:
+    """替换表单中的敏感字段，没有请求体时返回 None"""
+    if not body:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    return urlencode(_scrub_pairs(parse_qsl(body, keep_blank_values=True)))
+
+
+def request_key(method: str, url: str, body: str | None) -> tuple:
+    """回放时匹配请求的键：方法、路径和去掉时间戳后的查询参数与表单"""
+
+    def stable(query: str | None) -> tuple:
+        pairs = parse_qsl(query or "", keep_blank_values=True)
+        return tuple((k, v) for k, v in _scrub_pairs(pairs) if k not in VOLATILE_PARAMS)
+
+    parts = urlsplit(_JSESSIONID.sub("", url))
+    return (method.upper(), parts.path, stable(parts.query), stable(body))
+
+
+class Recorder:
+    """把请求与响应写入归档文件，线程安全"""
+
+    def __init__(self, path: str, secrets=()):
+        """
+        参数:
+            path: 归档文件路径，已存在时覆盖
+            secrets: 需要从响应正文中替换掉的字符串，如学号、密码；
+                登录表单中的学号和密码会自动加入
+        """
+        self.path = path
+        self.count = 0
+        self._secrets: set[bytes] = {s.encode() for s in secrets if s}
+        self._bodies: dict[bytes, int] = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._file = gzip.open(path, "wt", encoding="utf-8")  # noqa: SIM115
+        self._write(
+            {
+                "version": ARCHIVE_VERSION,
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+        )
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self._file.write("\n")
+
+    def _learn(self, body) -> None:
+        """登录表单中的学号和密码也要从之后的响应中去掉"""
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        if not body or "password=" not in body:
+            return
+        for k, v in parse_qsl(body, keep_blank_values=True):
+            if k in ("username", "password") and v:
+                self._secrets.add(v.encode())
+
+    def scrub_content(self, content: bytes) -> bytes:
+        """替换响应正文中的学号、密码、jsessionid 和登录成功后的 loginMsg"""
+        for secret in self._secrets:
+            content = content.replace(secret, MASK.encode())
+        content = _JSESSIONID_BYTES.sub(b"", content)
+        if content[:1] == b"{" and b"loginMsg" in content:
+            try:
+                data = json.loads(content)
+            except ValueError:
+                return content
+            if isinstance(data, dict) and data.get("loginStatus") == "1":
+                data["loginMsg"] = MASK
+                content = json.dumps(data, ensure_ascii=False).encode()
+        return content
+
+    def _body_id(self, content: bytes) -> int:
+        """正文第一次出现时写入文件，之后只引用编号"""
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        body_id = self._bodies.get(digest)
+        if body_id is None:
+            body_id = self._bodies[digest] = len(self._bodies)
+            data = base64.b64encode(zlib.compress(content)).decode("ascii")
+            self._write({"body": body_id, "data": data})
+        return body_id
+
+    def record(
+        self,
+        request: requests.PreparedRequest,
+        response: requests.Response | None,
+        start: float,
+        elapsed: float,
+        error: BaseException | None = None,
+    ) -> None:
+        """记录一次请求，请求失败时 response 为 None，error 为异常"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._learn(request.body)
+            record = {
+                "t": round(start - self._start, 6),
+                "elapsed": round(elapsed, 6),
+                "method": request.method,
+                "url": scrub_url(request.url),
+                "body": scrub_form(request.body),
+                "thread": threading.current_thread().name,
+            }
+            if response is None:
+                record["error"] = type(error).__name__
+            else:
+                record["status"] = response.status_code
+                record["headers"] = {
+                    k: _JSESSIONID.sub("", response.headers[k])
+                    for k in KEPT_HEADERS
+                    if k in response.headers
+                }
+                record["content"] = self._body_id(self.scrub_content(response.content))
+            self._write(record)
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class RecordingAdapter(HTTPAdapter):
+    """发送请求的同时录制，用法同 HTTPAdapter"""
+
+    def __init__(self, path: str, secrets=(), **kwargs):
+        """
+        参数:
+            path, secrets: 见 Recorder
+            kwargs: 传给 HTTPAdapter，如 pool_maxsize
+        """
+        super().__init__(**kwargs)
+        self.recorder = Recorder(path, secrets)
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            res = super().send(request, **kwargs)
+            # 读完正文才算请求结束，之后 Session 会直接使用已读取的内容
+            _ = res.content
+        except Exception as e:
+            self.recorder.record(request, None, start, time.perf_counter() - start, e)
+            raise
+        self.recorder.record(request, res, start, time.perf_counter() - start)
+        return res
+
+    def finish(self) -> None:
+        """结束录制，写完归档文件
+
+        Session.close() 会调用 close()，Transport 的连接池被多个 session 共用，
+        所以归档文件不在 close() 中关闭。
+        """
+        self.recorder.close()
+
+
+def load_archive(path: str) -> list[Exchange]:
+    """读取归档文件，录制时进程崩溃导致文件不完整时，返回已完整写入的部分"""
+    bodies: dict[int, bytes] = {}
+    exchanges = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+            if header.get("version") != ARCHIVE_VERSION:
+                raise ValueError(f"不支持的归档版本: {header.get('version')}")
+            for line in f:
+                record = json.loads(line)
+                if "data" in record:
+                    data = base64.b64decode(record["data"])
+                    bodies[record["body"]] = zlib.decompress(data)
+                    continue
+                exchanges.append(
+                    Exchange(
+                        t=record["t"],
+                        elapsed=record["elapsed"],
+                        method=record["method"],
+                        url=record["url"],
+                        body=record["body"],
+                        status=record.get("status", 0),
+                        headers=record.get("headers", {}),
+                        content=bodies.get(record.get("content"), b""),
+                        error=record.get("error"),
+                        thread=record["thread"],
+                    )
+                )
+        except (EOFError, json.JSONDecodeError):
+            pass
+    return exchanges
+
+
+class ReplayMissError(requests.ConnectionError):
+    """归档中没有与请求匹配的记录"""
+
+
+class ReplayAdapter(HTTPAdapter):
+    """按请求返回归档中录制的响应，不发出网络请求
+
+    相同的请求（方法、路径、去掉时间戳后的查询参数和表单）按录制的顺序依次返回，
+    用完后重复最后一个，轮询可以一直进行下去。归档中没有的请求抛出 ReplayMissError，
+    录制时失败的请求抛出同类型的异常。
+    """
+
+    def __init__(self, archive: str | list[Exchange], speed: float = 0.0, **kwargs):
+        """
+        参数:
+            archive: 归档文件路径或 load_archive 的结果
+            speed: 1 为按录制时的耗时返回，2 为两倍速，0 为不等待
+            kwargs: 传给 HTTPAdapter
+        """
+        super().__init__(**kwargs)
+        self.exchanges = (
+            load_archive(archive) if isinstance(archive, str) else list(archive)
+        )
+        self.speed = speed
+        # 已返回的响应数和没有匹配的请求数
+        self.served = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._queues: dict[tuple, collections.deque[Exchange]] = {}
+        for ex in self.exchanges:
+            key = request_key(ex.method, ex.url, ex.body)
+            self._queues.setdefault(key, collections.deque()).append(ex)
+
+    def _next(self, request: requests.PreparedRequest) -> Exchange | None:
+        key = request_key(request.method, request.url, scrub_form(request.body))
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                self.misses += 1
+                return None
+            self.served += 1
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def send(self, request, **kwargs):
+        ex = self._next(request)
+        if ex is None:
+            raise ReplayMissError(
+                f"归档中没有该请求: {request.method} {scrub_url(request.url)}",
+                request=request,
+            )
+        if self.speed > 0:
+            time.sleep(ex.elapsed / self.speed)
+        if ex.error is not None:
+            error = getattr(requests.exceptions, ex.error, None)
+            if not (
+                isinstance(error, type) and issubclass(error, requests.RequestException)
+            ):
+                error = requests.ConnectionError
+            raise error(f"录制时请求失败: {ex.error}", request=request)
+
+        res = requests.Response()
+        res.status_code = ex.status
+        res.headers = CaseInsensitiveDict(ex.headers)
+        res.encoding = get_encoding_from_headers(res.headers)
+        res._content = ex.content
+        res._content_consumed = True
+        res.url = request.url
+        res.reason = responses.get(ex.status, "")
+        res.elapsed = datetime.timedelta(seconds=ex.elapsed)
+        res.request = request
+        res.connection = self
+        return res
@@ -0,0 +1,165 @@
+"""选课响应分类
+
+轮询时每秒要处理多个选课响应。直接在响应的字节内容上查找登录过期标记和 <message>，
+只解码提示信息本身，不经过 res.text（服务器没有声明编码时，
+requests 会对整个响应做编码探测，或按 ISO-8859-1 解码得到乱码）。
+
+分类结果 SelectResult 是提示信息字符串本身，另带一个 SelectStatus，
+原来按字符串判断的代码仍然可用，新代码应使用 status。
+"""
+
+import enum
+import re
+
+import tracing
+from course_parser import ENCODING
+
+# 登录过期或未授权的标记，utils.check_session_expired 也使用这两个正则
+EXPIRED_MARKERS = ("未登陆", "未登录", "没有操作权限")
+# 各标记的首字节相同，正则会先按首字节快速跳过，
+# 比把 <message> 也写进同一个正则（分支首字节不同，只能逐字节尝试）快得多
+EXPIRED = re.compile("|".join(EXPIRED_MARKERS))
+EXPIRED_BYTES = re.compile(EXPIRED.pattern.encode(ENCODING))
+
+# 没有 <message> 时的提示，与原来的 User.select_course 一致
+NOT_OPEN_MESSAGE = "选课系统未开放"
+
+
+class SelectStatus(enum.Enum):
+    SUCCESS = "success"
+    APPLY_SUCCESS = "apply_success"
+    CONFLICT = "conflict"
+    FULL = "full"
+    NOT_OPEN = "not_open"
+    EXPIRED = "expired"
+    UNKNOWN = "unknown"
+
+    @property
+    def completed(self) -> bool:
+        """任务是否已结束：选上、申请成功，或与已选课程冲突（重试也不会成功）"""
+        return self in (
+            SelectStatus.SUCCESS,
+            SelectStatus.APPLY_SUCCESS,
+            SelectStatus.CONFLICT,
+        )
+
+    @property
+    def succeeded(self) -> bool:
+        return self in (SelectStatus.SUCCESS, SelectStatus.APPLY_SUCCESS)
+
+
+# 含有这些说法时不是成功，如「选课未成功」「申请不成功」「选课失败：该课程人数已满」
+_NEGATIONS = ("未成功", "不成功", "失败")
+
+# 成功的提示信息，与原来的 Strategy.monitor_loop 一样只认完整的说法
+_SUCCESS_KEYWORDS = (
+    ("选课申请成功", SelectStatus.APPLY_SUCCESS),
+    ("选课成功", SelectStatus.SUCCESS),
+)
+
+# 按顺序匹配提示信息中的其他关键字
+_KEYWORDS = (
+    ("冲突", SelectStatus.CONFLICT),
+    ("已满", SelectStatus.FULL),
+    ("未开放", SelectStatus.NOT_OPEN),
+)
+
+
+# 退课响应中的提示信息：<message>、alert('...')，或页面上提到退课的一段文字
+_MESSAGE = re.compile(rb"<message>(.*?)</message>", re.S)
+_ALERT = re.compile(rb"""alert\(\s*(['"])(.*?)\1\s*\)""", re.S)
+_SCRIPT = re.compile(rb"<(script|style)\b.*?</\1\s*>", re.S | re.I)
+_TAG = re.compile(rb"<[^>]*>")
+_DELETE_WORDS = ("退课", "删除")
+
+
+def _negated(message: str) -> bool:
+    return any(word in message for word in _NEGATIONS)
+
+
+class SelectResult(str):
+    """选课结果，值为提示信息，status 为分类"""
+
+    status: SelectStatus
+
+    def __new__(cls, message: str, status: SelectStatus):
+        obj = super().__new__(cls, message)
+        obj.status = status
+        return obj
+
+
+def classify_message(message: str) -> SelectStatus:
+    """按提示信息分类"""
+    if not _negated(message):
+        for keyword, status in _SUCCESS_KEYWORDS:
+            if keyword in message:
+                return status
+    for keyword, status in _KEYWORDS:
+        if keyword in message:
+            return status
+    if EXPIRED.search(message):
+        return SelectStatus.EXPIRED
+    return SelectStatus.UNKNOWN
+
+
+@tracing.traced("classify", "parse")
+def classify(content: str | bytes, encoding: str = ENCODING) -> SelectResult:
+    """对选课响应分类，可以直接传入响应的字节内容"""
+    if isinstance(content, str):
+        content = content.encode(encoding)
+    if EXPIRED_BYTES.search(content):
+        # 登录过期的页面
+        return SelectResult("登录过期", SelectStatus.EXPIRED)
+    start = content.find(b"<message>")
+    end = content.find(b"</message>", start) if start >= 0 else -1
+    if end < 0:
+        # 从系统还未开放就选课，所以返回信息而非错误
+        return SelectResult(NOT_OPEN_MESSAGE, SelectStatus.NOT_OPEN)
+    message = content[start + len(b"<message>") : end].decode(encoding, "replace")
+    return SelectResult(message, classify_message(message))
+
+
+def status_of(result: str) -> SelectStatus:
+    """取出结果的分类，普通字符串（如自定义任务的返回值）按提示信息分类"""
+    if isinstance(result, SelectResult):
+        return result.status
+    return classify_message(result)
+
+
+def delete_message(content: str | bytes, encoding: str = ENCODING) -> str | None:
+    """取出退课响应的提示信息，找不到时返回 None
+
+    依次查找 <message>、提到退课的 alert('...')、页面上同时提到退课和结果的一段文字；
+    导航、脚本中的其他文字（如「失败原因」）不参与判断。
+    """
+    if isinstance(content, str):
+        content = content.encode(encoding)
+    m = _MESSAGE.search(content)
+    if m:
+        return m.group(1).decode(encoding, "replace").strip()
+    for m in _ALERT.finditer(content):
+        text = m.group(2).decode(encoding, "replace").strip()
+        if any(word in text for word in _DELETE_WORDS):
+            return text
+    for segment in _TAG.split(_SCRIPT.sub(b"", content)):
+        text = segment.decode(encoding, "replace").strip()
+        if any(word in text for word in _DELETE_WORDS) and (
+            "成功" in text or _negated(text)
+        ):
+            return text
+    return None
+
+
+def delete_succeeded(content: str | bytes, encoding: str = ENCODING) -> bool | None:
+    """退课响应是否表示成功，取不到提示信息或其中没有「成功」「失败」时返回 None
+
+    只判断 delete_message 取出的提示信息，「退课未成功」「退课不成功」也是失败。
+    """
+    message = delete_message(content, encoding)
+    if message is None:
+        return None
+    if _negated(message):
+        return False
+    if "成功" in message:
+        return True
+    return None
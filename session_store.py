@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+
+def save_session(ss: requests.Session, path: str, username: str = "") -> None:
+    """把 session 的 Cookie 和请求头保存到文件
+
+    先写入同目录下的临时文件再原子替换，避免中途崩溃留下损坏的文件；
+    文件权限为 0600，只有当前用户可读写。
+    """
+    data = {
+        "username": username,
+        "saved_at": time.time(),
+        "headers": dict(ss.headers),
+        "cookies": [
+            {
+                "name": c.name,
+                "value": c.value,
+                "domain": c.domain,
+                "path": c.path,
+                "expires": c.expires,
+                "secure": c.secure,
+            }
+            for c in ss.cookies
+        ],
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    # mkstemp 创建的文件权限即为 0600
+    fd, tmp_path = tempfile.mkstemp(prefix=".session-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_session(path: str, username: str = "") -> requests.Session | None:
+    """从文件恢复 session，文件不存在、损坏或属于其他用户时返回 None"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        # 保存时的学号必须与当前学号相同，学号为空的文件也不能给其他用户用
+        if data.get("username") != username:
+            return None
+        ss = requests.Session()
+        ss.headers.update(data.get("headers", {}))
+        for c in data.get("cookies", []):
+            ss.cookies.set(
+                c["name"],
+                c["value"],
+                domain=c.get("domain", ""),
+                path=c.get("path", "/"),
+                expires=c.get("expires"),
+                secure=c.get("secure", False),
+            )
+    except (KeyError, TypeError, AttributeError, ValueError):
+        # JSON 格式正确但内容不对，如顶层不是对象、Cookie 缺少 name
+        return None
+    return ss
+
+
+def delete_session(path: str) -> None:
+    """删除保存的 session 文件"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
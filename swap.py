@@ -0,0 +1,283 @@
+"""换课：把已选的课程换成另一个开课
+
+手动换课要先 del_courses 再 run_select_courses，两步各自在执行时查询已选列表、
+teachId 和上课时间，退课与选课之间隔着好几次请求，这段时间里名额可能被别人抢走，
+原来的课程也可能选不回来。
+
+CourseSwap 在等待期间预先准备好所有信息：
+    - 原课程的 listId 和 teachId、目标开课的 teachId
+    - 去掉原课程后，目标开课与其余已选课程的上课时间冲突检查
+    - 预热连接；等待期间定期查询目标余量，连接和登录状态也一直保持可用
+
+目标有空位时紧接着发出退课和选课两个请求，再用一次已选列表查询确认结果。
+选课失败时立即选回原课程。每次交换都记录从发出退课到收到选课响应的耗时。
+退课响应不明确或请求出错时，以已选列表为准判断是否已经退掉；交换中途出错时，
+run 在下一轮先重新查询已选列表，不会用过期的 listId 继续。
+"""
+
+import time
+from typing import NamedTuple
+
+import logs
+import metrics
+import utils
+from select_result import SelectResult, delete_succeeded
+from User import User
+from utils import LoginExpiredError
+from watcher import parse_seats
+
+
+class SwapResult(NamedTuple):
+    # 验证查询后，目标开课在已选列表中
+    swapped: bool
+    # 原课程已经退掉（之后可能又选回）
+    deleted: bool
+    # 目标失败后原课程已选回
+    restored: bool
+    # 选课请求的结果，退课失败或选课请求出错时为 None
+    select: SelectResult | None
+    # 从发出退课请求到收到选课响应的秒数，没有发出选课请求时为 None
+    latency: float | None
+    # 验证查询得到的已选课程 {chooseId: listId}
+    selected: dict[str, str]
+
+    @property
+    def outcome(self) -> str:
+        if self.swapped:
+            return "swapped"
+        if not self.deleted:
+            return "not_deleted"
+        if self.restored:
+            return "restored"
+        return "lost"
+
+
+class CourseSwap:
+    def __init__(
+        self,
+        user: User,
+        drop: str,
+        target: str,
+        check_conflicts: bool = True,
+        quiet: bool = False,
+    ):
+        """
+        参数:
+            user: 用户实例
+            drop: 要退掉的已选课程的选课编号
+            target: 要换成的开课的选课编号
+            check_conflicts: 是否检查目标与其余已选课程的上课时间冲突
+            quiet: 静默模式，不显示日志
+        """
+        self.user = user
+        self.drop = drop
+        self.target = target
+        self.check_conflicts = check_conflicts
+        self.quiet = quiet
+        self.name = f"{drop} -> {target}"
+        self.listId: str | None = None
+        self.drop_teachId: str | None = None
+        self.target_teachId: str | None = None
+        self.results: list[SwapResult] = []
+
+    def prepare(self) -> None:
+        """查询并保存交换所需的信息，原课程未选或目标无效时抛出 ValueError"""
+        user = self.user
+        selected = user.query_selected_courses()
+        self.listId = selected.get(self.drop)
+        if self.listId is None:
+            raise ValueError(f"未在已选列表中找到课程 {self.drop}")
+        if self.target in selected:
+            raise ValueError(f"课程 {self.target} 已经选上")
+
+        courses = user.resolve_courses([self.drop, self.target])
+        drop, target = courses[self.drop], courses[self.target]
+        if not drop or not target:
+            missing = self.drop if not drop else self.target
+            raise ValueError(f"未找到课程 {missing} 的信息")
+        self.drop_teachId = drop["teachId"]
+        self.target_teachId = target["teachId"]
+
+        if self.check_conflicts:
+            table = user.selected_timetable(list(selected))
+            table.remove(f"{drop['course']}（{self.drop}）")
+            conflicts = table.conflicts(target["date"])
+            if conflicts:
+                raise ValueError(
+                    f"课程 {self.target} 与已选课程冲突: {', '.join(conflicts)}"
+                )
+
+        # 退课和选课紧接着发出，各用一个已建立的连接
+        user.warmup(2)
+        utils.print_log(
+            f"换课 {drop['course']}（{drop['teacher']}，{self.drop}）"
+            f" -> {target['teacher']}（{self.target}）已准备",
+            quiet=self.quiet,
+        )
+
+    def seats(self) -> tuple[int, int] | None:
+        """查询目标开课的 (已选人数, 容量)，同时更新课程缓存"""
+        rows, _ = self.user.query_courses("TeachID", self.target)
+        row = next((r for r in rows if r.chooseId == self.target), None)
+        return parse_seats(row.selected) if row else None
+
+    def execute(self) -> SwapResult:
+        """立即交换：退课、选课，失败时选回原课程，最后查询一次已选列表确认
+
+        中途出错时清空 listId 后抛出，run 会在下一轮重新查询已选列表。
+        """
+        if self.listId is None:
+            self.prepare()
+        try:
+            return self._execute()
+        except Exception:
+            self.listId = None
+            raise
+
+    def _execute(self) -> SwapResult:
+        user = self.user
+        start = time.perf_counter()
+        deleted: bool | None = None
+        try:
+            deleted = delete_succeeded(user.del_course(self.listId, self.drop))
+        except Exception as e:
+            utils.print_log(
+                f"换课 {self.name} 退课请求失败: {e}",
+                quiet=self.quiet,
+                level=logs.WARNING,
+            )
+        if deleted is None:
+            # 响应中看不出结果，或请求出错，以已选列表为准
+            deleted = self.drop not in self._retry(user.query_selected_courses)
+        if not deleted:
+            utils.print_log(
+                f"换课 {self.name} 退课失败，未选课",
+                quiet=self.quiet,
+                level=logs.WARNING,
+            )
+            return self._finish(None, None, deleted=False)
+
+        result: SelectResult | None = None
+        try:
+            result = self._retry(user.select_course, self.target_teachId)
+        except Exception as e:
+            utils.print_log(
+                f"换课 {self.name} 选课请求失败: {e}",
+                quiet=self.quiet,
+                level=logs.WARNING,
+            )
+        latency = time.perf_counter() - start
+
+        if result is None or not result.status.succeeded:
+            try:
+                restore = self._retry(user.select_course, self.drop_teachId)
+                utils.print_log(
+                    f"换课 {self.name} 未成功，选回 {self.drop}: {restore}",
+                    quiet=self.quiet,
+                )
+            except Exception as e:
+                utils.print_log(
+                    f"选回 {self.drop} 失败: {e}", quiet=self.quiet, level=logs.ERROR
+                )
+        return self._finish(result, latency, deleted=True)
+
+    def _retry(self, func, *args):
+        """调用 func，登录过期时重新登录后立即再试一次（原课程可能已经退掉，不能等下一轮）"""
+        generation = self.user.generation
+        try:
+            return func(*args)
+        except LoginExpiredError as e:
+            if e.generation is not None:
+                generation = e.generation
+            self.user.relogin(generation, self.quiet)
+            return func(*args)
+
+    def _finish(
+        self,
+        result: SelectResult | None,
+        latency: float | None,
+        deleted: bool | None,
+    ) -> SwapResult:
+        """查询已选列表确认结果并记录
+
+        deleted 为 None 表示不知道是否已经退课（交换中途出错），按原课程是否还在已选列表中判断。
+        """
+        selected = self._retry(self.user.query_selected_courses)
+        if deleted is None:
+            deleted = self.drop not in selected
+        swap = SwapResult(
+            swapped=self.target in selected,
+            deleted=deleted,
+            restored=deleted and self.target not in selected and self.drop in selected,
+            select=result,
+            latency=latency,
+            selected=selected,
+        )
+        # 选回后原课程的 listId 会变化
+        self.listId = selected.get(self.drop)
+        self.results.append(swap)
+
+        metrics.REGISTRY.inc("swaps_total", outcome=swap.outcome)
+        if latency is not None:
+            metrics.REGISTRY.observe("swap_latency_seconds", latency)
+        timing = f"，退课到选课 {latency * 1e3:.0f} ms" if latency is not None else ""
+        level = logs.ERROR if swap.outcome == "lost" else logs.INFO
+        utils.print_log(
+            f"换课 {self.name}: {result or '未选课'}（{swap.outcome}）{timing}",
+            quiet=self.quiet,
+            level=level,
+        )
+        return swap
+
+    def run(
+        self,
+        interval: float = 1.0,
+        max_attempts: int | None = None,
+        send_email: bool = False,
+    ) -> SwapResult | None:
+        """等待目标出现空位并交换
+
+        换成功、交换失败且没有选回原课程，或交换了 max_attempts 次后结束，
+        返回最后一次交换的结果，没有交换过时返回 None。
+        """
+        if self.listId is None:
+            self.prepare()
+        last: SwapResult | None = None
+        attempts = 0
+        while max_attempts is None or attempts < max_attempts:
+            generation = self.user.generation
+            try:
+                if self.listId is None:
+                    # 上一次交换中途出错，先按已选列表确认并记录结果，原课程还在时才继续
+                    last = self._finish(None, None, deleted=None)
+                    if self.listId is None or last.swapped:
+                        break
+                seats = self.seats()
+                if seats is not None and seats[0] < seats[1]:
+                    attempts += 1
+                    last = self.execute()
+                    # 只有选回了原课程时才继续等待下一个空位
+                    if not last.restored:
+                        break
+            except LoginExpiredError as e:
+                if e.generation is not None:
+                    generation = e.generation
+                try:
+                    self.user.relogin(generation, self.quiet)
+                except Exception as e:
+                    utils.print_log(f"重连失败: {e}", quiet=self.quiet)
+                continue
+            except Exception as e:
+                utils.print_log(
+                    f"换课 {self.name} 发生异常: {e}",
+                    quiet=self.quiet,
+                    level=logs.WARNING,
+                )
+            time.sleep(interval)
+
+        if last is not None and send_email:
+            if last.swapped:
+                self.user.send(f"换课完成: {self.name}", str(last.select))
+            elif last.outcome == "lost":
+                self.user.send(f"换课失败，原课程未选回: {self.name}", str(last.select))
+        return last
@@ -0,0 +1,30 @@
+import contextlib
+import io
+
+import pytest
+
+import logs
+import utils
+from tests.fake_server import EMAIL_CONFIG, FakeTMS
+from transport import Transport
+from User import User
+
+
+@pytest.fixture
+def tms():
+    """模拟的教务系统，第二次选课的页面"""
+    return FakeTMS(seed=0)
+
+
+@pytest.fixture
+def user(tms, monkeypatch):
+    """在 tms 上登录的用户，请求经 memory 后端直接交给模拟服务器，不经过网络"""
+    monkeypatch.setattr(logs.LOG, "console", False)
+    monkeypatch.setattr(utils, "BASE_URL", "http://tms.local/TMS")
+    transport = Transport(
+        backend="memory", backend_options={"handler": tms.handler_class()}
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        user = User("2022000000", "password", EMAIL_CONFIG, transport=transport)
+    yield user
+    user.notifier.close()
@@ -0,0 +1,700 @@
+"""本地模拟教务系统（TMS）
+
+实现登录、验证码、选课查询、选课、已选列表和退课接口，
+课程页面直接复用 test_resourse 中保存的 HTML，供 tests/ 中的测试和 benchmarks/ 中的基准测试共用。
+
+支持：
+    - 可配置的响应延迟（固定值加随机抖动）
+    - 登录状态过期（按登录后的秒数，或调用 expire_sessions 立即过期）
+    - 选课系统未开放（返回 选课系统未开放.html），可以指定开放时间
+    - 服务器时钟与本机时钟存在偏差（影响 Date 头和开放时间）
+    - 课程容量与已选人数，选满后返回人数已满
+    - 额外生成课程，用于大量任务的压力测试
+    - 限制同时处理的请求数，模拟高峰期排队，排队超时返回 503
+    - 新建连接的额外耗时（模拟 TCP/TLS 握手），以及空闲连接的超时关闭
+
+用法：
+    python -m tests.fake_server --port 8080
+
+然后设置环境变量 SWJTU_BASE_URL=http://127.0.0.1:8080/TMS，
+或在代码中调用 utils.set_base_url。
+"""
+
+import argparse
+import io
+import json
+import random
+import re
+import string
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import course_parser
+from opening import SERVER_TZ
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = {
+    1: ROOT / "test_resourse" / "第一次选课.html",
+    2: ROOT / "test_resourse" / "第二次选课.html",
+}
+NOT_OPEN_PAGE = ROOT / "test_resourse" / "选课系统未开放.html"
+
+EXPIRED_PAGE = (
+    "<html><body><script>alert('您还未登录或登录已超时，"
+    "请重新登录');</script>未登录</body></html>"
+).encode()
+
+# 退课接口返回的页面：提示信息在 alert 中，页面其他部分也有「成功」「失败」等字样
+DELETE_PAGE = (
+    '<html><head><meta http-equiv="Content-Type" content="text/html; charset=utf-8" />'
+    "<script>function showError() {{ alert('操作失败，请稍后再试'); }}</script></head>"
+    '<body><div class="nav"><a href="CourseStudentAction?setAction=studentCourseSysList">'
+    "选课退课</a></div>"
+    '<div class="tips">退课成功后请刷新已选课程列表；失败原因：课程不存在、已过退课时间</div>'
+    "<script>alert('{msg}');</script></body></html>"
+)
+
+# 不发送邮件的配置，在模拟服务器上创建 User 时使用
+EMAIL_CONFIG = {
+    "smtp_server": "",
+    "smtp_port": 465,
+    "from": "",
+    "pwd": "",
+    "to": [""],
+}
+
+# 选课接口返回的消息
+MSG_SUCCESS = "选课成功"
+MSG_APPLY_SUCCESS = "选课申请成功"
+MSG_FULL = "选课失败：该课程人数已满"
+MSG_CONFLICT = "选课失败：与已选课程冲突"
+MSG_UNKNOWN_COURSE = "选课失败：未找到该课程"
+
+_ROW_RE = re.compile(rb"<tr>.*?</tr>", re.S)
+# 选满的课程已选人数显示为红色
+_SEATS_RE = re.compile(rb"<td>\s*(?:<font[^>]*>)?(\d+)(?:</font>)?/(\d+)\s*</td>")
+_FOOTER_RE = re.compile(
+    '共有记录\\[\\d+\\]条，当前第\\[<span class="cr">\\d+</span>\\]页，'
+    "(\\d+)条/页，共\\[\\d+\\]页".encode()
+)
+
+
+@dataclass
+class Course:
+    """模拟的一门课程（一个教学班）"""
+
+    chooseId: str
+    teachId: str
+    course_code: str
+    course: str
+    teacher: str
+    date: str
+    selected: int
+    capacity: int
+    # 原始表格行，已选人数用占位符替换
+    row: bytes = b""
+
+
+@dataclass
+class Session:
+    sid: str
+    captcha: str = ""
+    logged_in: bool = False
+    login_at: float = 0.0
+    # {chooseId: listId}
+    selected: dict[str, str] = field(default_factory=dict)
+
+
+class FakeTMS:
+    """模拟教务系统的状态，由 HTTP 处理器共享"""
+
+    def __init__(
+        self,
+        round_: int = 2,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        session_ttl: float | None = None,
+        is_open: bool = True,
+        open_at: float | None = None,
+        captcha_error_rate: float = 0.0,
+        extra_courses: int = 0,
+        apply_mode: bool = False,
+        page_size: int = 50,
+        capacity: int | None = None,
+        queue_timeout: float = 1.0,
+        clock_offset: float = 0.0,
+        handshake: float = 0.0,
+        keep_alive: float | None = None,
+        seed: int | None = None,
+    ):
+        """
+        参数:
+            round_: 使用第几次选课的页面作为模板（1 或 2）
+            latency: 每个请求的固定延迟（秒）
+            jitter: 在固定延迟上叠加的随机延迟上限（秒）
+            session_ttl: 登录后多少秒过期，None 表示不过期
+            is_open: 选课系统是否开放
+            open_at: 选课系统的开放时间（服务器时间的时间戳），到点自动开放
+            captcha_error_rate: 登录时返回验证码错误的概率
+            extra_courses: 额外生成的课程数量
+            apply_mode: 第一次选课为申请制，成功时返回「选课申请成功」
+            page_size: 查询结果每页条数
+            capacity: 同时处理的请求数上限，超出的请求排队，None 表示不限制
+            queue_timeout: 排队超过该时间（秒）的请求返回 503
+            clock_offset: 服务器时钟比本机快多少秒
+            handshake: 每个新连接第一个请求的额外延迟（秒），模拟握手
+            keep_alive: 空闲连接多少秒后被关闭，None 表示不关闭
+            seed: 随机数种子
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.session_ttl = session_ttl
+        self.is_open = is_open
+        self.open_at = open_at
+        self.captcha_error_rate = captcha_error_rate
+        self.apply_mode = apply_mode
+        self.page_size = page_size
+        self.queue_timeout = queue_timeout
+        self.clock_offset = clock_offset
+        self.handshake = handshake
+        self.keep_alive = keep_alive
+        self.random = random.Random(seed)
+        self.workers = threading.Semaphore(capacity) if capacity else None
+
+        self.lock = threading.Lock()
+        self.sessions: dict[str, Session] = {}
+        # {路径或 setAction: 请求次数}
+        self.hits: dict[str, int] = {}
+        self.logins = 0
+        # 排队超时返回 503 的请求数
+        self.rejected = 0
+        # 建立过的连接数
+        self.connections = 0
+
+        self._load_template(FIXTURES[round_])
+        for i in range(extra_courses):
+            self._add_clone(i)
+
+        self.server: ThreadingHTTPServer | None = None
+        self.thread: threading.Thread | None = None
+
+    # ------------------------------------------------------------------
+    # 模板
+    # ------------------------------------------------------------------
+
+    def _load_template(self, path: Path) -> None:
+        content = path.read_bytes()
+        section = course_parser.table3_section(content)
+        assert section is not None, f"{path} 中没有 table3"
+        start = content.index(section)
+        self.page_prefix = content[:start]
+        self.page_suffix = content[start + len(section) :]
+
+        rows = _ROW_RE.findall(section)
+        self.table_open = section[: section.index(rows[0])]
+        self.table_close = section[section.index(rows[-1]) + len(rows[-1]) :]
+        self.header_row = rows[0]
+        self.footer_row = rows[-1]
+
+        self.courses: dict[str, Course] = {}
+        for raw, row in zip(rows[1:-1], course_parser.parse_course_rows(section)):
+            m = _SEATS_RE.search(raw)
+            assert m is not None
+            course = Course(
+                chooseId=row.chooseId,
+                teachId=row.teachId,
+                course_code=row.course_code,
+                course=row.course,
+                teacher=row.teacher,
+                date=row.date,
+                selected=int(m.group(1)),
+                capacity=int(m.group(2)),
+                row=raw[: m.start()] + b"{seats}" + raw[m.end() :],
+            )
+            self.courses[course.chooseId] = course
+        self._templates = list(self.courses.values())
+
+    def _add_clone(self, i: int) -> None:
+        """复制模板课程，生成新的课程"""
+        base = self._templates[i % len(self._templates)]
+        chooseId = f"Z{i:04d}"
+        teachId = uuid.UUID(int=self.random.getrandbits(128)).hex[:16].upper()
+        course_code = f"FAKE{i // len(self._templates):06d}"
+        row = (
+            base.row.replace(base.chooseId.encode(), chooseId.encode())
+            .replace(base.teachId.encode(), teachId.encode())
+            .replace(base.course_code.encode(), course_code.encode())
+        )
+        self.courses[chooseId] = Course(
+            chooseId=chooseId,
+            teachId=teachId,
+            course_code=course_code,
+            course=base.course,
+            teacher=base.teacher,
+            date=base.date,
+            selected=base.selected,
+            capacity=base.capacity,
+            row=row,
+        )
+
+    def render_courses(self, courses: list[Course], page: int = 1) -> bytes:
+        total = len(courses)
+        pages = max(1, -(-total // self.page_size))
+        page = min(max(page, 1), pages)
+        shown = courses[(page - 1) * self.page_size : page * self.page_size]
+
+        footer = _FOOTER_RE.sub(
+            (
+                f'共有记录[{total}]条，当前第[<span class="cr">{page}</span>]页，'
+                f"{self.page_size}条/页，共[{pages}]页"
+            ).encode(),
+            self.footer_row,
+        )
+        rows = b"".join(c.row.replace(b"{seats}", _seats_cell(c)) for c in shown)
+        return (
+            self.page_prefix
+            + self.table_open
+            + self.header_row
+            + rows
+            + footer
+            + self.table_close
+            + self.page_suffix
+        )
+
+    def render_selected(self, session: Session) -> bytes:
+        header = "".join(
+            f"<th>{h}</th>"
+            for h in (
+                "序号",
+                "课程代码",
+                "选课编号",
+                "课程名称",
+                "班号",
+                "学分",
+                "性质",
+                "教师",
+                "时间地点",
+                "校区",
+                "状态",
+                "操作",
+            )
+        )
+        rows = []
+        for n, (chooseId, listId) in enumerate(session.selected.items(), 1):
+            c = self.courses[chooseId]
+            cells = [
+                str(n),
+                c.course_code,
+                c.chooseId,
+                c.course,
+                "1",
+                "4.0",
+                "必修",
+                c.teacher,
+                c.date,
+                "犀浦",
+                "已选",
+            ]
+            tds = "".join(f"<td>{v}</td>" for v in cells)
+            button = (
+                '<td><input type="button" value="退课" class="btn btn-blue" '
+                f"onclick=\"delCourse('{c.teachId}','{listId}','{c.chooseId}')\"></td>"
+            )
+            rows.append(f"<tr>{tds}{button}</tr>")
+        html = (
+            '<html><head><meta http-equiv="Content-Type" '
+            'content="text/html; charset=utf-8" /></head><body>'
+            f'<table class="table_border" id="table3"><tr>{header}</tr>'
+            + "".join(rows)
+            + f'<tr><td colspan="12">共有记录[{len(rows)}]条</td></tr>'
+            "</table></body></html>"
+        )
+        return html.encode()
+
+    # ------------------------------------------------------------------
+    # 状态
+    # ------------------------------------------------------------------
+
+    def now(self) -> float:
+        """服务器时钟"""
+        return time.time() + self.clock_offset
+
+    def system_open(self) -> bool:
+        if self.open_at is not None and self.now() >= self.open_at:
+            return True
+        return self.is_open
+
+    def render_not_open(self) -> bytes:
+        """未开放页面，指定了开放时间时替换页面中的开放时间"""
+        page = NOT_OPEN_PAGE.read_bytes()
+        if self.open_at is None:
+            return page
+        t = datetime.fromtimestamp(self.open_at, SERVER_TZ)
+        text = f"{t:%Y-%m-%d} {t.hour}:{t:%M:%S}.{t.microsecond // 1000:03d}"
+        return re.sub(
+            "选课系统开放时间：[^至]*至".encode(),
+            f"选课系统开放时间：{text}至".encode(),
+            page,
+        )
+
+    def expire_sessions(self) -> None:
+        """让所有登录状态立即过期"""
+        with self.lock:
+            for s in self.sessions.values():
+                s.logged_in = False
+
+    def session_valid(self, session: Session | None) -> bool:
+        if session is None or not session.logged_in:
+            return False
+        if self.session_ttl is not None:
+            return time.monotonic() - session.login_at < self.session_ttl
+        return True
+
+    def select(self, session: Session, teachId: str) -> str:
+        with self.lock:
+            course = next(
+                (c for c in self.courses.values() if c.teachId == teachId), None
+            )
+            if course is None:
+                return MSG_UNKNOWN_COURSE
+            for chosen in session.selected:
+                if self.courses[chosen].course_code == course.course_code:
+                    return MSG_CONFLICT
+            if course.selected >= course.capacity:
+                return MSG_FULL
+            course.selected += 1
+            session.selected[course.chooseId] = uuid.uuid4().hex[:16].upper()
+        return MSG_APPLY_SUCCESS if self.apply_mode else MSG_SUCCESS
+
+    def delete(self, session: Session, listId: str) -> bool:
+        with self.lock:
+            for chooseId, lid in list(session.selected.items()):
+                if lid == listId:
+                    del session.selected[chooseId]
+                    self.courses[chooseId].selected -= 1
+                    return True
+        return False
+
+    def query(self, params: dict[str, str]) -> list[Course]:
+        action = params.get("selectAction", "")
+        key = params.get("key1", "")
+        courses = list(self.courses.values())
+        if not key:
+            return courses
+        if action == "TeachID":
+            return [c for c in courses if c.chooseId == key]
+        if action == "CourseCode":
+            return [c for c in courses if c.course_code == key]
+        if action == "QueryTeacherName":
+            return [c for c in courses if key in c.teacher]
+        if action == "QueryName":
+            return [c for c in courses if key in c.course]
+        return courses
+
+    # ------------------------------------------------------------------
+    # 服务器
+    # ------------------------------------------------------------------
+
+    def handler_class(self) -> type[BaseHTTPRequestHandler]:
+        """使用本实例状态的请求处理器，也可以交给 backends.MemoryAdapter 直接调用"""
+        return type("Handler", (_Handler,), {"tms": self})
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """在后台线程启动服务器，返回可用于 utils.set_base_url 的地址"""
+        self.server = _Server((host, port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="fake-tms", daemon=True
+        )
+        self.thread.start()
+        return self.base_url
+
+    @property
+    def base_url(self) -> str:
+        assert self.server is not None
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/TMS"
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class _Server(ThreadingHTTPServer):
+    # 默认的监听队列只有 5，并发建立连接时会丢 SYN，客户端要等 1 秒重传
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # 客户端取消请求时连接被断开，不打印堆栈
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def _seats_cell(course: Course) -> bytes:
+    if course.selected >= course.capacity:
+        cell = f"<td><font color=red>{course.selected}</font>/{course.capacity}</td>"
+    else:
+        cell = f"<td> {course.selected}/{course.capacity} </td>"
+    return cell.encode()
+
+
+def _captcha_image(text: str) -> bytes:
+    from PIL import Image, ImageDraw, ImageFont
+
+    img = Image.new("RGB", (90, 32), "white")
+    ImageDraw.Draw(img).text(
+        (12, 4), text, fill="black", font=ImageFont.load_default(size=22)
+    )
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    tms: FakeTMS
+    protocol_version = "HTTP/1.1"
+    # 头部和正文分开写出，不关闭 Nagle 会被延迟确认拖慢约 40ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        # 空闲超过 keep_alive 秒时读取超时，连接被关闭
+        self.timeout = self.tms.keep_alive
+        super().setup()
+        with self.tms.lock:
+            self.tms.connections += 1
+        if self.tms.handshake:
+            time.sleep(self.tms.handshake)
+
+    def date_time_string(self, timestamp=None):
+        # Date 头使用服务器时钟
+        return super().date_time_string(
+            self.tms.now() if timestamp is None else timestamp
+        )
+
+    # -- 工具 --------------------------------------------------------------
+
+    def _session(self) -> Session | None:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get("JSESSIONID")
+        if morsel is None:
+            return None
+        return self.tms.sessions.get(morsel.value)
+
+    def _send(
+        self,
+        body: bytes,
+        content_type: str = "text/html;charset=utf-8",
+        headers: dict[str, str] | None = None,
+        status: int = 200,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _params(self) -> dict[str, str]:
+        query = parse_qs(urlsplit(self.path).query, keep_blank_values=True)
+        params = {k: v[0] for k, v in query.items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode("utf-8")
+            for k, v in parse_qs(body, keep_blank_values=True).items():
+                params[k] = v[0]
+        return params
+
+    def _delay(self) -> None:
+        delay = self.tms.latency
+        if self.tms.jitter:
+            delay += self.tms.random.uniform(0, self.tms.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    # -- 路由 --------------------------------------------------------------
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        params = self._params()
+        path = urlsplit(self.path).path
+        name = path.rsplit("/", 1)[-1]
+        key = params.get("setAction", name) if name == "CourseStudentAction" else name
+        with self.tms.lock:
+            self.tms.hits[key] = self.tms.hits.get(key, 0) + 1
+
+        workers = self.tms.workers
+        if workers is None:
+            self._delay()
+            return self._route(name, params)
+        if not workers.acquire(timeout=self.tms.queue_timeout):
+            with self.tms.lock:
+                self.tms.rejected += 1
+            return self._send(
+                "<html><body>服务器繁忙</body></html>".encode(), status=503
+            )
+        try:
+            self._delay()
+            self._route(name, params)
+        finally:
+            workers.release()
+
+    def _route(self, name: str, params: dict[str, str]):
+        if name == "login.html":
+            return self._login_page()
+        if name == "GetRandomNumberToJPEG":
+            return self._captcha()
+        if name == "UserLoginAction":
+            return self._login_action(params)
+        if name == "UserLoadingAction":
+            return self._send("<html><body>loading</body></html>".encode())
+        if name == "CourseStudentAction":
+            return self._course_action(params)
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _login_page(self):
+        sid = uuid.uuid4().hex.upper()
+        with self.tms.lock:
+            self.tms.sessions[sid] = Session(sid)
+        self._send(
+            "<html><body>login</body></html>".encode(),
+            headers={"Set-Cookie": f"JSESSIONID={sid}; Path=/"},
+        )
+
+    def _captcha(self):
+        session = self._session()
+        text = "".join(
+            self.tms.random.choice(string.ascii_lowercase + string.digits)
+            for _ in range(4)
+        )
+        if session is not None:
+            session.captcha = text
+        self._send(_captcha_image(text), "image/jpeg")
+
+    def _login_action(self, params):
+        session = self._session()
+        if session is None or not params.get("ranstring"):
+            status, msg = "-2", "验证码错误"
+        elif self.tms.random.random() < self.tms.captcha_error_rate:
+            status, msg = "-2", "验证码错误"
+        elif not params.get("password"):
+            status, msg = "-9", "请输入密码"
+        else:
+            status, msg = "1", "登录成功"
+            session.logged_in = True
+            session.login_at = time.monotonic()
+            with self.tms.lock:
+                self.tms.logins += 1
+        body = json.dumps({"loginStatus": status, "loginMsg": msg}, ensure_ascii=False)
+        self._send(body.encode(), "application/json;charset=utf-8")
+
+    def _course_action(self, params):
+        session = self._session()
+        if not self.tms.session_valid(session):
+            return self._send(EXPIRED_PAGE)
+        assert session is not None
+        if not self.tms.system_open():
+            return self._send(self.tms.render_not_open())
+
+        action = params.get("setAction")
+        if action == "studentCourseSysSchedule":
+            page = int(params.get("jumpPage") or 1)
+            return self._send(self.tms.render_courses(self.tms.query(params), page))
+        if action == "addStudentCourseApply":
+            msg = self.tms.select(session, params.get("teachId", ""))
+            body = f'<?xml version="1.0" encoding="UTF-8"?><root><message>{msg}</message></root>'
+            return self._send(body.encode(), "text/xml;charset=utf-8")
+        if action == "studentCourseSysList":
+            return self._send(self.tms.render_selected(session))
+        if action == "delStudentCourseList":
+            ok = self.tms.delete(session, params.get("listId", ""))
+            msg = "退课成功" if ok else "退课失败：未找到该课程"
+            return self._send(DELETE_PAGE.format(msg=msg).encode())
+        self._send(b"<html><body>unknown action</body></html>")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地模拟教务系统")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--round", type=int, default=2, choices=(1, 2))
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--session-ttl", type=float, default=None)
+    parser.add_argument("--closed", action="store_true", help="选课系统未开放")
+    parser.add_argument("--open-in", type=float, default=None, help="多少秒后开放")
+    parser.add_argument("--captcha-error-rate", type=float, default=0.0)
+    parser.add_argument("--extra-courses", type=int, default=0)
+    parser.add_argument("--full", action="store_true", help="所有课程都已满")
+    parser.add_argument(
+        "--clock-offset", type=float, default=0.0, help="服务器时钟比本机快多少秒"
+    )
+    parser.add_argument(
+        "--capacity", type=int, default=None, help="同时处理的请求数上限"
+    )
+    parser.add_argument(
+        "--queue-timeout", type=float, default=1.0, help="排队超时（秒），返回 503"
+    )
+    parser.add_argument(
+        "--handshake", type=float, default=0.0, help="新建连接的额外延迟（秒）"
+    )
+    parser.add_argument(
+        "--keep-alive", type=float, default=None, help="空闲连接的超时（秒）"
+    )
+    args = parser.parse_args()
+
+    tms = FakeTMS(
+        round_=args.round,
+        latency=args.latency,
+        jitter=args.jitter,
+        session_ttl=args.session_ttl,
+        is_open=not args.closed,
+        open_at=(
+            time.time() + args.clock_offset + args.open_in
+            if args.open_in is not None
+            else None
+        ),
+        captcha_error_rate=args.captcha_error_rate,
+        extra_courses=args.extra_courses,
+        apply_mode=args.round == 1,
+        capacity=args.capacity,
+        queue_timeout=args.queue_timeout,
+        clock_offset=args.clock_offset,
+        handshake=args.handshake,
+        keep_alive=args.keep_alive,
+    )
+    if args.full:
+        for course in tms.courses.values():
+            course.selected = course.capacity
+    url = tms.start(args.host, args.port)
+    print(f"模拟教务系统已启动：{url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        tms.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import pytest
+
+import course_parser
+from course_parser import (
+    CourseRow,
+    SelectedRow,
+    parse_course_rows,
+    parse_page_count,
+    parse_selected_rows,
+)
+
+FIXTURES = Path(__file__).parent.parent / "test_resourse"
+
+
+def page(name: str) -> bytes:
+    return (FIXTURES / f"{name}.html").read_bytes()
+
+
+@pytest.mark.parametrize("name", ["第一次选课", "第二次选课"])
+def test_course_rows(name):
+    content = page(name)
+    rows = parse_course_rows(content)
+    assert [r.chooseId for r in rows] == ["B0868", "B0869", "B0870", "B0871", "B0872"]
+    assert {r.course_code for r in rows} == {"FGEE007012"}
+    # 与 lxml 的结果一致，传入 str 时也一样
+    assert rows == course_parser._lxml_course_rows(content, "utf-8")
+    assert parse_course_rows(content.decode()) == rows
+
+
+def test_course_row_fields():
+    row = parse_course_rows(page("第二次选课"))[0]
+    assert row == CourseRow(
+        teacher="张志厚",
+        date="1-17周 星期三 3-4节, 1-17周 星期四 3-4节",
+        campus="犀浦",
+        course="地球物理勘探",
+        course_code="FGEE007012",
+        selected="20/30",
+        chooseId="B0868",
+        teachId="7893038D879A8362",
+    )
+
+
+def test_not_open_page():
+    content = page("选课系统未开放")
+    assert parse_course_rows(content) == []
+    assert parse_selected_rows(content) == []
+
+
+def test_irregular_page_falls_back_to_lxml(monkeypatch):
+    content = page("第二次选课").replace(
+        "张志厚".encode(), "<table><tr><td>x</td></tr></table>张志厚".encode(), 1
+    )
+    calls = []
+    lxml_rows = course_parser._lxml_course_rows
+
+    def spy(content, encoding):
+        calls.append(encoding)
+        return lxml_rows(content, encoding)
+
+    monkeypatch.setattr(course_parser, "_lxml_course_rows", spy)
+    rows = parse_course_rows(content)
+    assert calls == ["utf-8"]
+    assert [r.chooseId for r in rows][1:] == ["B0869", "B0870", "B0871", "B0872"]
+
+
+def test_page_count():
+    assert parse_page_count(page("第二次选课")) == 1
+    assert parse_page_count("共有记录[120]条，当前第[1]页，50条/页，共[3]页") == 3
+    assert parse_page_count(b"") == 1
+
+
+def test_selected_rows(user, tms):
+    for chooseId in ("B0868", "B0871"):
+        user.select_course(user.get_teachId(chooseId))
+    [session] = tms.sessions.values()
+    content = tms.render_selected(session)
+
+    rows = parse_selected_rows(content)
+    assert rows == [
+        SelectedRow(chooseId, listId) for chooseId, listId in session.selected.items()
+    ]
+    assert rows == course_parser._lxml_selected_rows(content, "utf-8")
+    assert user.query_selected_courses() == session.selected
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from daemon import Daemon
+from watcher import CourseWatcher
+
+
+@pytest.fixture
+def daemon(user):
+    daemon = Daemon(config=object())
+    daemon.users[user.username] = user
+    yield daemon
+    daemon.close()
+
+
+def wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_pool_size_counts_running_tasks(daemon, user, monkeypatch):
+    sizes = []
+    monkeypatch.setattr(user.transport, "ensure_pool_size", sizes.append)
+    # B0870 已满，任务一直运行
+    first = daemon.cmd_select(chooseId="B0870", interval=0.05)["task"]
+    daemon.cmd_select(chooseId="B0870", interval=0.05)
+    daemon.cmd_cancel(first["id"])
+    wait_until(lambda: not daemon.tasks[first["id"]].thread.is_alive())
+    daemon.cmd_select(chooseId="B0870", interval=0.05)
+    # 已取消的任务不再计入
+    assert sizes == [1, 2, 2]
+
+
+@pytest.mark.parametrize(
+    ("run", "cancel", "state"),
+    [
+        (None, True, "cancelled"),
+        (lambda self: None, False, "done"),
+        (lambda self: 1 / 0, False, "error"),
+    ],
+)
+def test_watch_state(daemon, monkeypatch, run, cancel, state):
+    if run is not None:
+        monkeypatch.setattr(CourseWatcher, "run", run)
+    task = daemon.cmd_watch("FGEE007012", interval=0.05)["task"]
+    if cancel:
+        daemon.cmd_cancel(task["id"])
+    watcher = daemon.tasks[task["id"]].watcher
+    wait_until(lambda: not watcher.running)
+    status = daemon.cmd_status()["tasks"][0]
+    assert status["state"] == state
+    assert ("error" in status) is (state == "error")
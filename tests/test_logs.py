@@ -0,0 +1,40 @@
+import io
+
+import logs
+import utils
+
+
+def test_console_written_by_writer_thread():
+    stream = io.StringIO()
+    backend = logs.LogBackend(stream=stream)
+    backend.log(logs.INFO, "%s : %s", "B0868", "选课成功")
+    assert backend.flush()
+    assert stream.getvalue().endswith("] B0868 : 选课成功\n")
+    assert backend.tail(1)[0].endswith("] B0868 : 选课成功")
+    backend.close()
+
+
+def test_filtered_records_are_dropped():
+    backend = logs.LogBackend(console=False)
+    backend.set_level("B0868", logs.WARNING)
+    assert not backend.enabled(logs.INFO, "B0868")
+    assert backend.enabled(logs.INFO, "B0869")
+    backend.log(logs.INFO, "选课失败", task="B0868")
+    backend.log(logs.WARNING, "发生异常", task="B0868")
+    assert [r["message"] for r in backend.records()] == ["发生异常"]
+
+
+def test_print_log_positional_quiet(monkeypatch):
+    stream = io.StringIO()
+    monkeypatch.setattr(logs.LOG, "stream", stream)
+    # 旧写法 print_log(msg, quiet)，消息中有 % 也一样
+    utils.print_log("进度 100%", True)
+    assert logs.LOG.flush()
+    assert stream.getvalue() == ""
+    assert logs.LOG.tail(1)[0].endswith("] 进度 100%")
+
+
+def test_print_log_format_arguments(monkeypatch):
+    monkeypatch.setattr(logs.LOG, "console", False)
+    utils.print_log("已满: %s", args=(True,))
+    assert logs.LOG.tail(1)[0].endswith("已满: True")
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+import logs
+from opening import ClockSync, OpeningScheduler
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(logs.LOG, "console", False)
+
+
+class SlowClock(ClockSync):
+    """每次测量耗时 delay 秒，测得服务器时钟快 offset 秒"""
+
+    def __init__(self, delay: float, offset: float):
+        super().__init__()
+        self.delay = delay
+        self.measured = threading.Event()
+        self._offset = offset
+
+    def measure(self, samples: int = 6) -> None:
+        time.sleep(self.delay)
+        self.lo = self.hi = self._offset
+        self.samples = samples
+        self.measured.set()
+
+
+def test_first_measurement_runs_once():
+    clock = SlowClock(delay=0.2, offset=2.0)
+    scheduler = OpeningScheduler(time.time() + 100, clock=clock, resync_before=0)
+    calls = []
+    measure = clock.measure
+    clock.measure = lambda samples: calls.append(samples) or measure(samples)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(scheduler.remaining()))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 只测量一次，其他线程等待结果，都按服务器时钟计算
+    assert len(calls) == 1
+    assert all(97 < r <= 98 for r in results)
+
+
+def test_resync_does_not_block_other_threads():
+    clock = SlowClock(delay=0.0, offset=0.0)
+    scheduler = OpeningScheduler(
+        time.time() + 30, clock=clock, resync_before=60, samples=1
+    )
+    scheduler.remaining()
+    clock.delay = 0.5
+    clock.measured.clear()
+    # 这次调用进入开放前的重新测量
+    resync = threading.Thread(target=scheduler.remaining)
+    resync.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    assert 29 < scheduler.remaining() <= 30
+    assert time.monotonic() - start < 0.1
+    resync.join()
+    assert clock.measured.is_set()
@@ -0,0 +1,189 @@
+import itertools
+import random
+
+from course_parser import CourseRow
+from planner import Wish, WishlistPlanner, section_rank
+from timetable import parse_date
+
+
+def section(
+    chooseId: str, course_code: str, date: str, teacher: str = "", selected="0/30"
+) -> CourseRow:
+    return CourseRow(
+        teacher=teacher or f"教师{chooseId}",
+        date=date,
+        campus="犀浦",
+        course=course_code,
+        course_code=course_code,
+        selected=selected,
+        chooseId=chooseId,
+        teachId=f"T{chooseId}",
+    )
+
+
+MON = "1-17周 星期一 1-2节"
+TUE = "1-17周 星期二 1-2节"
+WED = "1-17周 星期三 1-2节"
+
+
+def chosen(plan) -> dict[str, str]:
+    return {code: row.chooseId for code, row in plan.assignments.items()}
+
+
+def test_avoids_conflict_by_taking_second_choice():
+    sections = {
+        "A": [section("A1", "A", MON), section("A2", "A", TUE)],
+        "B": [section("B1", "B", MON)],
+    }
+    plan = WishlistPlanner([Wish("A", ("A1", "A2")), Wish("B")], sections).solve()
+    assert chosen(plan) == {"A": "A2", "B": "B1"}
+    assert plan.unassigned == []
+    assert plan.optimal
+    assert plan.tasks() == [("TA2", "教师A2-A"), ("TB1", "教师B1-B")]
+
+
+def test_earlier_wish_wins_when_both_cannot_fit():
+    sections = {"A": [section("A1", "A", MON)], "B": [section("B1", "B", MON)]}
+    plan = WishlistPlanner([Wish("B"), Wish("A")], sections).solve()
+    assert chosen(plan) == {"B": "B1"}
+    assert plan.unassigned == ["A"]
+
+
+def test_preference_by_teacher_and_any_section():
+    rows = [section("A1", "A", MON, "张立"), section("A2", "A", TUE, "张志厚")]
+    assert section_rank(Wish("A", ("张志厚",)), rows[1]) == 0
+    assert section_rank(Wish("A", ("张志厚",)), rows[0]) == 1
+    assert section_rank(Wish("A", ("张志厚",), any_section=False), rows[0]) is None
+
+    plan = WishlistPlanner([Wish("A", ("张志厚",))], {"A": rows}).solve()
+    assert chosen(plan) == {"A": "A2"}
+
+
+def test_full_sections_and_occupied_time():
+    sections = {
+        "A": [
+            section("A1", "A", MON, selected="30/30"),
+            section("A2", "A", TUE),
+            section("A3", "A", WED),
+        ]
+    }
+    plan = WishlistPlanner([Wish("A", ("A1", "A2"))], sections).solve()
+    assert chosen(plan) == {"A": "A2"}
+
+    occupied = parse_date(TUE)
+    plan = WishlistPlanner([Wish("A", ("A1", "A2"))], sections, occupied).solve()
+    assert chosen(plan) == {"A": "A3"}
+
+    plan = WishlistPlanner([Wish("A", ("A1",))], sections, skip_full=False).solve()
+    assert chosen(plan) == {"A": "A1"}
+
+
+def test_exclude_and_lock_replan():
+    sections = {
+        "A": [section("A1", "A", MON), section("A2", "A", TUE)],
+        "B": [section("B1", "B", TUE), section("B2", "B", WED)],
+    }
+    planner = WishlistPlanner([Wish("A", ("A1", "A2")), Wish("B")], sections)
+    assert chosen(planner.solve()) == {"A": "A1", "B": "B1"}
+
+    # A1 已满，B1 已选上
+    planner.exclude("A1")
+    planner.lock("B", sections["B"][0])
+    plan = planner.solve()
+    # A2 与已选上的 B1 冲突，A 无法安排
+    assert chosen(plan) == {"B": "B1"}
+    assert plan.unassigned == ["A"]
+
+
+def test_node_limit_returns_best_so_far():
+    sections = {
+        code: [
+            section(f"{code}{d}", code, f"1-17周 星期{d} 1-2节") for d in "一二三四五"
+        ]
+        for code in "ABCDEFG"
+    }
+    wishes = [Wish(code) for code in sections]
+    plan = WishlistPlanner(wishes, sections, max_nodes=5).solve()
+    assert not plan.optimal
+    assert len(plan.assignments) + len(plan.unassigned) == len(wishes)
+
+    plan = WishlistPlanner(wishes, sections).solve()
+    assert plan.optimal
+    assert len(plan.assignments) == 5
+
+
+def brute_force(wishes, sections):
+    """枚举所有组合，评分与 WishlistPlanner 相同"""
+    n = len(wishes)
+    choices = []
+    for wish in wishes:
+        options = [None]
+        for row in sections[wish.course_code]:
+            rank = section_rank(wish, row)
+            if rank is not None:
+                options.append((rank, parse_date(row.date)))
+        choices.append(options)
+    best = None
+    for combo in itertools.product(*choices):
+        occupied, placed, got, rank_sum = 0, 0, 0, 0
+        for i, option in enumerate(combo):
+            if option is None:
+                continue
+            rank, mask = option
+            if mask & occupied:
+                break
+            occupied |= mask
+            placed, got, rank_sum = placed + 1, got | 1 << (n - 1 - i), rank_sum + rank
+        else:
+            score = (placed, got, -rank_sum)
+            best = score if best is None else max(best, score)
+    return best
+
+
+def score(wishes, plan):
+    n = len(wishes)
+    got, rank_sum = 0, 0
+    for i, wish in enumerate(wishes):
+        row = plan.assignments.get(wish.course_code)
+        if row is not None:
+            got |= 1 << (n - 1 - i)
+            rank_sum += section_rank(wish, row)
+    return (len(plan.assignments), got, -rank_sum)
+
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    days = "一二三四五"
+    for _ in range(50):
+        sections = {}
+        wishes = []
+        for code in "ABCDE":
+            rows = [
+                section(
+                    f"{code}{k}",
+                    code,
+                    f"1-17周 星期{rng.choice(days)} {rng.choice(['1-2', '3-4'])}节",
+                )
+                for k in range(rng.randint(1, 3))
+            ]
+            sections[code] = rows
+            prefer = tuple(
+                r.chooseId for r in rng.sample(rows, rng.randint(0, len(rows)))
+            )
+            wishes.append(Wish(code, prefer, rng.random() < 0.7))
+
+        plan = WishlistPlanner(wishes, sections).solve()
+        assert plan.optimal
+        assert score(wishes, plan) == brute_force(wishes, sections)
+        # 方案中的开课互不冲突
+        masks = [parse_date(r.date) for r in plan.assignments.values()]
+        for a, b in itertools.combinations(masks, 2):
+            assert not a & b
+
+
+def test_from_user(user):
+    user.select_course(user.get_teachId("B0871"))
+    wish = Wish("FGEE007012", ("张健", "张立", "张志厚"))
+    plan = WishlistPlanner.from_user(user, [wish]).solve()
+    # 张健的 B0870 已满，张立的 B0869 与已选的 B0871 在星期二 6-7 节冲突
+    assert chosen(plan) == {"FGEE007012": "B0868"}
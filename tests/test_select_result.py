@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import pytest
+
+from select_result import (
+    NOT_OPEN_MESSAGE,
+    SelectResult,
+    SelectStatus,
+    classify,
+    classify_message,
+    delete_message,
+    delete_succeeded,
+    status_of,
+)
+
+FIXTURES = Path(__file__).parent.parent / "test_resourse"
+
+
+def response(message: str) -> bytes:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f"<root><message>{message}</message></root>"
+    ).encode()
+
+
+@pytest.mark.parametrize(
+    ("message", "status"),
+    [
+        ("选课成功", SelectStatus.SUCCESS),
+        ("选课申请成功", SelectStatus.APPLY_SUCCESS),
+        ("选课失败：该课程人数已满", SelectStatus.FULL),
+        ("选课失败：与已选课程冲突", SelectStatus.CONFLICT),
+        ("选课系统未开放", SelectStatus.NOT_OPEN),
+        ("选课失败：未找到该课程", SelectStatus.UNKNOWN),
+        ("您还未登录", SelectStatus.EXPIRED),
+    ],
+)
+def test_classify_message(message, status):
+    assert classify_message(message) is status
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "选课未成功，该课程已满",
+        "申请不成功",
+        "选课申请未成功",
+        "成功",
+        "选课成功率低，选课失败",
+    ],
+)
+def test_refusals_are_not_success(message):
+    assert not classify_message(message).succeeded
+
+
+def test_refusal_keeps_its_reason():
+    assert classify_message("选课未成功，该课程已满") is SelectStatus.FULL
+    assert classify_message("选课不成功：与已选课程冲突") is SelectStatus.CONFLICT
+
+
+def test_classify_bytes():
+    result = classify(response("选课申请成功"))
+    assert isinstance(result, SelectResult)
+    assert result == "选课申请成功"
+    assert result.status is SelectStatus.APPLY_SUCCESS
+    assert result.status.completed
+
+
+def test_classify_gbk_and_str():
+    content = response("选课失败：该课程人数已满").decode()
+    assert classify(content.encode("gbk"), "gbk").status is SelectStatus.FULL
+    assert classify(content).status is SelectStatus.FULL
+
+
+def test_classify_without_message_is_not_open():
+    result = classify(b"<html><body></body></html>")
+    assert result == NOT_OPEN_MESSAGE
+    assert result.status is SelectStatus.NOT_OPEN
+
+
+def test_classify_expired_page():
+    page = "<html><script>alert('您还未登录或没有操作权限')</script></html>"
+    assert classify(page.encode()).status is SelectStatus.EXPIRED
+
+
+def test_status_of_plain_string():
+    assert status_of("选课成功") is SelectStatus.SUCCESS
+    assert status_of("选课未成功") is not SelectStatus.SUCCESS
+    assert status_of(SelectResult("x", SelectStatus.FULL)) is SelectStatus.FULL
+
+
+@pytest.mark.parametrize(
+    ("text", "ok"),
+    [
+        (response("退课成功"), True),
+        ("退课失败：未找到该课程", False),
+        ("退课未成功", False),
+        ("退课不成功", False),
+        ("操作完成", None),
+    ],
+)
+def test_delete_succeeded(text, ok):
+    assert delete_succeeded(text) is ok
+
+
+@pytest.mark.parametrize(
+    ("name", "message", "ok"),
+    [
+        ("退课成功", "退课成功", True),
+        ("退课失败", "退课失败：未找到该课程", False),
+    ],
+)
+def test_delete_page(name, message, ok):
+    # 页面中还有「操作失败」的脚本、「失败原因」和「退课成功后请刷新」的说明
+    content = (FIXTURES / f"{name}.html").read_bytes()
+    assert delete_message(content) == message
+    assert delete_succeeded(content) is ok
+
+
+def test_delete_page_without_message():
+    page = (
+        "<html><script>alert('操作失败');</script>"
+        "<a>选课退课</a><div>失败原因：人数已满</div></html>"
+    )
+    assert delete_message(page) is None
+    assert delete_succeeded(page) is None
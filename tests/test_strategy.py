@@ -0,0 +1,16 @@
+import pytest
+
+import tracing
+from Strategy import monitor_loop
+
+
+def test_task_name_restored_after_exception(user):
+    def interrupted():
+        assert tracing.current_task() == "B0868"
+        raise KeyboardInterrupt
+
+    with tracing.task_scope("outer"):
+        with pytest.raises(KeyboardInterrupt):
+            monitor_loop(user, "B0868", interrupted, interval=0)
+        assert tracing.current_task() == "outer"
+    assert tracing.current_task() is None
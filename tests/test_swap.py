@@ -0,0 +1,79 @@
+import requests
+
+from swap import CourseSwap
+
+DROP, TARGET = "B0868", "B0869"
+
+
+def swap_for(user) -> CourseSwap:
+    user.select_course(user.get_teachId(DROP))
+    swap = CourseSwap(user, DROP, TARGET, quiet=True)
+    swap.prepare()
+    return swap
+
+
+def test_swap(user):
+    result = swap_for(user).execute()
+    assert result.outcome == "swapped"
+    assert result.deleted
+    assert set(result.selected) == {TARGET}
+
+
+def test_full_target_is_restored(user, tms):
+    swap = swap_for(user)
+    tms.courses[TARGET].selected = tms.courses[TARGET].capacity
+    result = swap.execute()
+    assert result.outcome == "restored"
+    assert set(result.selected) == {DROP}
+    # 选回后 listId 变化，下一次交换使用新的 listId
+    assert swap.listId == result.selected[DROP]
+
+
+def test_failed_delete_is_not_deleted(user, tms, monkeypatch):
+    swap = swap_for(user)
+    monkeypatch.setattr(tms, "delete", lambda *args: False)
+    result = swap.execute()
+    assert result.outcome == "not_deleted"
+    assert not result.restored
+    assert result.select is None
+    assert tms.hits.get("addStudentCourseApply") == 1
+
+
+def test_refused_delete_is_not_deleted(user, monkeypatch):
+    swap = swap_for(user)
+    monkeypatch.setattr(user, "del_course", lambda *args: "退课未成功")
+    result = swap.execute()
+    assert result.outcome == "not_deleted"
+    assert set(result.selected) == {DROP}
+
+
+def test_ambiguous_delete_checks_selected_list(user, monkeypatch):
+    swap = swap_for(user)
+    del_course = user.del_course
+
+    def ambiguous(*args):
+        del_course(*args)
+        return "操作完成"
+
+    monkeypatch.setattr(user, "del_course", ambiguous)
+    assert swap.execute().outcome == "swapped"
+
+
+def test_interrupted_swap_is_resolved_before_retrying(user, monkeypatch):
+    swap = swap_for(user)
+    query = user.query_selected_courses
+    calls = 0
+
+    def flaky():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise requests.ConnectionError("连接中断")
+        return query()
+
+    # 交换已经完成，但确认结果的查询失败
+    monkeypatch.setattr(user, "query_selected_courses", flaky)
+    result = swap.run(interval=0, max_attempts=3)
+    assert swap.listId is None
+    assert result is not None and result.outcome == "swapped"
+    assert [r.outcome for r in swap.results] == ["swapped"]
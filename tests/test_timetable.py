@@ -0,0 +1,109 @@
+from pathlib import Path
+
+import pytest
+
+import logs
+from course_parser import parse_course_rows
+from Strategy import precheck_conflicts
+from timetable import Timetable, parse_date, slots
+
+FIXTURES = Path(__file__).parent.parent / "test_resourse"
+
+
+def fixture_rows(name: str) -> dict:
+    return {
+        r.chooseId: r
+        for r in parse_course_rows((FIXTURES / f"{name}.html").read_bytes())
+    }
+
+
+@pytest.mark.parametrize("name", ["第一次选课", "第二次选课"])
+def test_fixture_dates_parse(name):
+    for row in fixture_rows(name).values():
+        mask = parse_date(row.date)
+        # 每门课每周两次、每次两节，共 17 周
+        assert mask is not None
+        assert len(slots(mask)) == 17 * 2 * 2
+
+
+def test_parse_date():
+    assert slots(parse_date("1-2周 星期一 3节")) == [(1, 1, 3), (2, 1, 3)]
+    assert slots(parse_date("1-4周(单) 周三 5-6节")) == [
+        (1, 3, 5),
+        (1, 3, 6),
+        (3, 3, 5),
+        (3, 3, 6),
+    ]
+    assert slots(parse_date("第2,4周 星期日 第1节")) == [(2, 7, 1), (4, 7, 1)]
+    assert parse_date("") == 0
+    assert parse_date("待定") is None
+    assert parse_date("1-30周 星期一 3-4节") is None
+
+
+def test_fixture_conflicts():
+    rows = fixture_rows("第二次选课")
+    table = Timetable()
+    # B0868：星期三、星期四 3-4 节
+    assert table.add("B0868", rows["B0868"].date)
+    # B0869 星期三 3-4 节与 B0868 重叠
+    assert table.conflicts(rows["B0869"].date) == ["B0868"]
+    # B0871：星期一、星期二 6-7 节
+    assert table.conflicts(rows["B0871"].date) == []
+    table.add("B0871", rows["B0871"].date)
+    # B0870：星期二、星期三 6-7 节，与 B0871 重叠
+    assert table.conflicts(rows["B0870"].date) == ["B0871"]
+    assert table.conflicts("待定") is None
+
+    table.remove("B0871")
+    assert table.conflicts(rows["B0870"].date) == []
+    assert table.occupied == parse_date(rows["B0868"].date)
+
+
+def warnings() -> list[str]:
+    return logs.LOG.tail(level=logs.WARNING)
+
+
+def tasks_for(user, *chooseIds) -> list[tuple[str, str]]:
+    return [(user.get_teachId(c), c) for c in chooseIds]
+
+
+def test_precheck_skips_selected_conflicts(user):
+    user.prefetch_catalog()
+    user.select_course(user.get_teachId("B0868"))
+    logs.LOG.ring.clear()
+
+    tasks = tasks_for(user, "B0869", "B0871")
+    assert precheck_conflicts(user, tasks) == tasks[1:]
+    [warning] = warnings()
+    assert "B0869 与已选课程" in warning
+    assert "B0868" in warning
+    assert warning.endswith("时间冲突，跳过")
+
+
+def test_precheck_warns_between_candidates(user):
+    user.prefetch_catalog()
+    logs.LOG.ring.clear()
+
+    # B0871 与 B0870 都在星期二 6-7 节，都保留，只提示
+    tasks = tasks_for(user, "B0871", "B0870", "B0868")
+    assert precheck_conflicts(user, tasks) == tasks
+    [warning] = warnings()
+    assert warning.endswith("B0870 与待选课程 B0871 时间冲突，最多只能选上其中一门")
+
+
+def test_precheck_without_catalog(user, tms):
+    tasks = [("7893038D879A8362", "B0868")]
+    user.catalog.clear()
+    assert precheck_conflicts(user, tasks) == tasks
+    assert "studentCourseSysList" not in tms.hits
+
+
+def test_precheck_selected_query_fails(user, monkeypatch):
+    user.prefetch_catalog()
+
+    def fail():
+        raise OSError("connection reset")
+
+    monkeypatch.setattr(user, "selected_timetable", fail)
+    tasks = tasks_for(user, "B0869", "B0871")
+    assert precheck_conflicts(user, tasks) == tasks
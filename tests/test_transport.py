@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+import requests
+
+from backends import available
+from transport import Transport
+
+
+@pytest.fixture
+def server(tms):
+    # 每个请求都有延迟，同时发出的请求才会各自占用一个连接
+    tms.latency = 0.1
+    url = tms.start()
+    yield f"{url}/service/login.html"
+    tms.stop()
+
+
+def concurrent_get(transport: Transport, url: str, n: int) -> None:
+    ss = transport.mount(requests.Session())
+    barrier = threading.Barrier(n)
+
+    def hit():
+        barrier.wait()
+        transport.request(ss, "GET", url, op="query")
+
+    threads = [threading.Thread(target=hit) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "requests",
+        pytest.param(
+            "httpx",
+            marks=pytest.mark.skipif(not available("httpx"), reason="需要 httpx"),
+        ),
+    ],
+)
+def test_growing_pool_keeps_connections(server, backend):
+    transport = Transport(pool_size=2, backend=backend, backend_options={})
+    concurrent_get(transport, server, 2)
+    assert transport.stats()["idle"] == 2
+
+    transport.ensure_pool_size(4)
+    # 已经建立的连接仍在池中，之后的请求直接复用
+    assert transport.stats()["idle"] == 2
+    created = transport.stats()["created"]
+    concurrent_get(transport, server, 2)
+    assert transport.stats()["created"] == created
+
+    # 扩容后池中能保留 4 个连接
+    concurrent_get(transport, server, 4)
+    assert transport.stats()["idle"] == 4
@@ -0,0 +1,23 @@
+import itertools
+import time
+
+from watcher import CourseWatcher
+
+
+def test_slow_poll_does_not_burst(user, monkeypatch):
+    watcher = CourseWatcher(user, ["FGEE007012"], interval=0.05, quiet=True)
+    starts = []
+
+    def poll(code):
+        starts.append(time.monotonic())
+        # 第一次查询耗时相当于 8 个间隔，例如请求超时后重试
+        if len(starts) == 1:
+            time.sleep(0.4)
+        return []
+
+    monkeypatch.setattr(watcher, "poll", poll)
+    watcher.run(max_rounds=4)
+    gaps = [b - a for a, b in itertools.pairwise(starts[1:])]
+    # 慢查询之后仍按间隔查询，不连续补发错过的节拍
+    assert len(gaps) == 2
+    assert min(gaps) >= 0.04
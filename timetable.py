@@ -0,0 +1,132 @@
+"""上课时间与冲突检查
+
+把课程表格中的上课时间（如 "1-17周 星期一 3-4节, 1-17周 星期二 1-2节"）
+解析为 周次 × 星期 × 节次 的位图（Python int），两门课冲突当且仅当位图按位与不为 0。
+同一字符串只解析一次。
+
+选课前用已选课程建立 Timetable，可以在本地发现与已选课程冲突的任务，
+不必等服务器返回「冲突」。
+"""
+
+import functools
+import re
+
+# 位图的范围：第 1-25 周，星期一到星期日，第 1-14 节
+WEEKS = 25
+DAYS = 7
+PERIODS = 14
+
+_DAY_NAMES = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "日": 7, "天": 7}
+
+# 一段上课时间：周次 星期 节次，如 "1-17周 星期一 3-4节"、"1,3,5周(单) 周三 5节"
+_SEGMENT = re.compile(
+    r"^(?:第)?(?P<weeks>[\d,，\-]+)周\s*[（(]?(?P<parity>[单双])?周?[）)]?\s*"
+    r"(?:星期|周)(?P<day>[一二三四五六日天])\s*"
+    r"(?:第)?(?P<periods>[\d,，\-]+)节$"
+)
+
+_SEPARATOR = re.compile(r"(?<=节)\s*[,，;；]\s*")
+
+# 每一周占用的位数
+_WEEK_BITS = DAYS * PERIODS
+
+
+def _numbers(spec: str, upper: int) -> list[int] | None:
+    """解析 "1-8,10,12-13" 形式的编号列表，超出 1..upper 时返回 None"""
+    result = []
+    for part in re.split(r"[,，]", spec):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        if not first.isdigit() or (last and not last.isdigit()):
+            return None
+        lo, hi = int(first), int(last or first)
+        if not 1 <= lo <= hi <= upper:
+            return None
+        result.extend(range(lo, hi + 1))
+    return result or None
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(date: str) -> int | None:
+    """把上课时间解析为位图，无法识别时返回 None，没有上课时间时返回 0"""
+    mask = 0
+    # 各段以「节」结尾，周次中的逗号不是分隔符
+    for segment in _SEPARATOR.split(date.strip()):
+        segment = segment.strip()
+        if not segment:
+            continue
+        m = _SEGMENT.match(segment)
+        if m is None:
+            return None
+        weeks = _numbers(m["weeks"], WEEKS)
+        periods = _numbers(m["periods"], PERIODS)
+        if weeks is None or periods is None:
+            return None
+        if m["parity"] == "单":
+            weeks = [w for w in weeks if w % 2 == 1]
+        elif m["parity"] == "双":
+            weeks = [w for w in weeks if w % 2 == 0]
+
+        # 先得到一天内的节次位，再平移到每一周的这一天
+        day_bits = 0
+        for p in periods:
+            day_bits |= 1 << (p - 1)
+        day_offset = (_DAY_NAMES[m["day"]] - 1) * PERIODS
+        for w in weeks:
+            mask |= day_bits << ((w - 1) * _WEEK_BITS + day_offset)
+    return mask
+
+
+def slots(mask: int) -> list[tuple[int, int, int]]:
+    """位图中的所有 (周次, 星期, 节次)，用于显示和调试"""
+    result = []
+    while mask:
+        low = mask & -mask
+        bit = low.bit_length() - 1
+        week, rest = divmod(bit, _WEEK_BITS)
+        day, period = divmod(rest, PERIODS)
+        result.append((week + 1, day + 1, period + 1))
+        mask ^= low
+    return result
+
+
+class Timetable:
+    """一组课程的上课时间，按名称（chooseId、teachId 或任务名）记录"""
+
+    def __init__(self):
+        # {名称: 位图}
+        self.masks: dict[str, int] = {}
+        # 所有课程位图的并集
+        self.occupied = 0
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.masks
+
+    def add(self, key: str, date: str | int) -> bool:
+        """加入一门课，date 可以是上课时间字符串或位图，无法解析时不加入并返回 False"""
+        mask = parse_date(date) if isinstance(date, str) else date
+        if mask is None:
+            return False
+        self.masks[key] = mask
+        self.occupied |= mask
+        return True
+
+    def remove(self, key: str) -> None:
+        if self.masks.pop(key, None) is not None:
+            occupied = 0
+            for mask in self.masks.values():
+                occupied |= mask
+            self.occupied = occupied
+
+    def conflicts(self, date: str | int) -> list[str] | None:
+        """与 date 时间冲突的课程名称，date 无法解析时返回 None"""
+        mask = parse_date(date) if isinstance(date, str) else date
+        if mask is None:
+            return None
+        if not mask & self.occupied:
+            return []
+        return [key for key, other in self.masks.items() if mask & other]
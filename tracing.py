@@ -0,0 +1,294 @@
+"""耗时追踪
+
+选课慢的时候，指标只能看出请求总耗时，看不出时间花在登录各阶段的等待、验证码识别、
+lxml 解析、锁等待还是网络上。TRACER 在这些位置记录 span（名称、开始时间、耗时、线程、任务名）：
+    login / login.<阶段> / login.wait    登录流程与各阶段前的最小间隔等待
+    login.retry_wait                     登录失败后重试前的等待
+    relogin                              重新登录，包括等待其他线程登录完成
+    request                              User.request 与选课请求，参数中有 endpoint
+    check_session_expired / classify     登录过期检查与选课响应分类
+    parse_course_rows / parse_selected_rows 以及回退到 lxml 时的 lxml_course_rows / lxml_selected_rows
+    monitor_loop.iteration / pacer.acquire   选课循环（包括异步引擎）的每一轮，以及等待节奏控制器
+
+默认关闭，关闭时每个埋点只多一次属性判断。开启后写成 Chrome trace-event JSON，
+可以直接拖进 https://ui.perfetto.dev 或 chrome://tracing 查看：
+    with tracing.TRACER.record("trace.json", profile="sampling"):
+        tasks.run_select_courses(user, ["B0868"])
+
+profile 可选：
+    "sampling": 后台线程每隔 sample_interval 秒采样所有线程的调用栈，
+        结果写成 trace.json.folded（每行「线程;函数;函数 次数」，可用 speedscope 或 flamegraph.pl 查看）
+    "cprofile": 对调用 start 的线程做 cProfile，结果写成 trace.json.prof（pstats 格式）
+"""
+
+import collections
+import contextlib
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# 当前的任务名。每个线程和每个 asyncio 任务各有一份，异步引擎的所有任务在同一个线程上，
+# 也能区分；asyncio.to_thread 会带到执行的线程中
+_task: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "tracing_task", default=None
+)
+
+
+def set_task(task: str | None) -> None:
+    """设置当前线程（或 asyncio 任务）的任务名，之后的 span 都带上这个任务名"""
+    _task.set(task)
+
+
+def current_task() -> str | None:
+    return _task.get()
+
+
+@contextlib.contextmanager
+def task_scope(task: str | None):
+    """with 块内的 span 都带上任务名，退出时（包括异常）恢复原来的任务名"""
+    token = _task.set(task)
+    try:
+        yield
+    finally:
+        _task.reset(token)
+
+
+class _NoopSpan:
+    """关闭时 span() 返回的共用对象"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("args", "cat", "name", "start", "tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._add(self.name, self.cat, self.start, end - self.start, self.args)
+
+
+class SamplingProfiler:
+    """定时采样所有线程的调用栈，统计每个调用栈出现的次数"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: collections.Counter[tuple[str, ...]] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[tuple(reversed(stack))] += 1
+
+    def top(self, n: int = 10) -> list[tuple[str, int]]:
+        """按采样次数排列的栈顶函数（自身耗时）"""
+        counts: collections.Counter[str] = collections.Counter()
+        for stack, count in self.samples.items():
+            counts[stack[-1]] += count
+        return counts.most_common(n)
+
+    def write_folded(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(
+                f"{';'.join(stack)} {count}\n"
+                for stack, count in self.samples.most_common()
+            )
+
+
+class Tracer:
+    """记录 span，线程安全；enabled 为 False 时所有埋点直接返回"""
+
+    def __init__(self, max_events: int = 200_000):
+        """
+        参数:
+            max_events: 最多保留的 span 数，超过后丢弃最早的
+        """
+        self.enabled = False
+        self.max_events = max_events
+        self.profiler: SamplingProfiler | cProfile.Profile | None = None
+        self._events: collections.deque = collections.deque(maxlen=max_events)
+        self._threads: dict[int, str] = {}
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name: str, cat: str = "", **args):
+        """with TRACER.span("名称", 参数=值): ... 记录代码块的耗时"""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, cat, args)
+
+    def _add(self, name: str, cat: str, start: int, dur: int, args: dict) -> None:
+        thread = threading.current_thread()
+        self._threads[thread.ident] = thread.name
+        task = _task.get()
+        if task is not None:
+            args.setdefault("task", task)
+        # deque.append 是原子操作，不需要加锁
+        self._events.append((name, cat, start, dur, thread.ident, args))
+
+    def start(self, profile: str | None = None, sample_interval: float = 0.005) -> None:
+        """清空已有记录并开始追踪
+
+        参数:
+            profile: None、"sampling" 或 "cprofile"，见模块说明
+            sample_interval: 采样间隔（秒）
+        """
+        self._events.clear()
+        self._threads.clear()
+        self._origin = time.perf_counter_ns()
+        if profile == "sampling":
+            self.profiler = SamplingProfiler(sample_interval)
+            self.profiler.start()
+        elif profile == "cprofile":
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif profile is not None:
+            raise ValueError(f"未知的 profile: {profile}")
+        else:
+            self.profiler = None
+        self.enabled = True
+
+    def stop(self) -> None:
+        """停止追踪，已记录的 span 和 profile 结果保留到下次 start"""
+        self.enabled = False
+        if isinstance(self.profiler, SamplingProfiler):
+            self.profiler.stop()
+        elif isinstance(self.profiler, cProfile.Profile):
+            self.profiler.disable()
+
+    @contextlib.contextmanager
+    def record(
+        self, path: str, profile: str | None = None, sample_interval: float = 0.005
+    ):
+        """在代码块中追踪，结束后写出 Chrome trace 和 profile 结果，参数同 start"""
+        self.start(profile, sample_interval)
+        try:
+            yield self
+        finally:
+            self.stop()
+            self.write_chrome(path)
+            self.write_profile(path)
+
+    @property
+    def events(self) -> list[tuple]:
+        """(名称, 分类, 开始 ns, 耗时 ns, 线程 id, 参数) 列表"""
+        return list(self._events)
+
+    def summary(self) -> dict[str, tuple[int, float]]:
+        """各 span 名称的 (次数, 总耗时秒)"""
+        result: dict[str, list] = {}
+        for name, _, _, dur, _, _ in self.events:
+            item = result.setdefault(name, [0, 0.0])
+            item[0] += 1
+            item[1] += dur / 1e9
+        return {name: (count, seconds) for name, (count, seconds) in result.items()}
+
+    def chrome_trace(self) -> dict:
+        """Chrome trace-event 格式，时间单位为微秒"""
+        pid = os.getpid()
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in list(self._threads.items())
+        ]
+        for name, cat, start, dur, tid, args in self.events:
+            events.append(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ph": "X",
+                    "ts": (start - self._origin) / 1000,
+                    "dur": dur / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {k: str(v) for k, v in args.items()},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+    def write_profile(self, path: str) -> None:
+        """写出 profile 结果：采样为 path.folded，cProfile 为 path.prof，没有开启时不写"""
+        if isinstance(self.profiler, SamplingProfiler):
+            self.profiler.write_folded(f"{path}.folded")
+        elif isinstance(self.profiler, cProfile.Profile):
+            self.profiler.dump_stats(f"{path}.prof")
+
+
+TRACER = Tracer()
+
+
+def traced(name: str, cat: str = ""):
+    """装饰器：开启追踪时记录函数的耗时，关闭时只多一次属性判断"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with _Span(TRACER, name, cat, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
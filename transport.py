@@ -0,0 +1,220 @@
+"""HTTP 连接管理
+
+User 的所有请求都经过同一个 Transport：
+    - 连接池大小与并发任务数匹配。池满时多出来的连接用完就被丢弃，下一轮又要重新建立
+    - 按操作设置连接超时和读取超时，服务器没有响应时请求不会一直挂起
+    - 只有幂等的查询在连接失败、超时或 5xx 时自动重试，选课、退课不重试，避免重复提交
+    - warmup() 在开放前预先建立连接并放回连接池，开放后的第一批请求不必再等握手
+    - stats() 统计新建连接和复用连接的数量
+
+重新登录会创建新的 session，Transport 把同一个 adapter 挂到每个 session 上，
+已经建立的连接在重新登录后仍然可以复用。adapter 即 HTTP 后端，见 backends.py。
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import DEFAULT_POOLSIZE, BaseAdapter, HTTPAdapter
+
+import backends
+import config
+import utils
+
+# 各操作的 (连接超时, 读取超时)，单位秒
+TIMEOUTS: dict[str, tuple[float, float]] = {
+    "request": (5.0, 15.0),
+    "login": (5.0, 15.0),
+    "query": (5.0, 20.0),
+    "select": (3.0, 10.0),
+    "delete": (3.0, 10.0),
+    "warmup": (3.0, 5.0),
+    # opening.ClockSync 的测量请求，失败时直接改用本机时钟，不重试
+    "clock": (3.0, 5.0),
+}
+
+# 重复发送没有副作用、可以自动重试的操作
+IDEMPOTENT = frozenset({"query", "warmup"})
+
+
+class Transport:
+    """连接池、超时与重试配置，线程安全"""
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOLSIZE,
+        timeouts: dict[str, tuple[float, float]] | None = None,
+        retries: int = 2,
+        backoff: float = 0.5,
+        backend: str | None = None,
+        backend_options: dict | None = None,
+        adapter: BaseAdapter | None = None,
+    ):
+        """
+        参数:
+            pool_size: 连接池中保留的连接数，应不少于并发的任务数
+            timeouts: 覆盖 TIMEOUTS 中的部分操作
+            retries: 幂等操作失败后的最大重试次数
+            backoff: 第 n 次重试前等待 backoff * 2 ** (n - 1) 秒
+            backend: HTTP 后端，见 backends.BACKENDS，默认为 config.HTTP_BACKEND
+            backend_options: 传给后端的参数，默认的 httpx 后端使用 config.HTTP2
+            adapter: 直接指定挂到 session 上的 adapter，如 recorder.RecordingAdapter、
+                recorder.ReplayAdapter，指定时忽略 backend
+        """
+        self.pool_size = pool_size
+        self.timeouts = {**TIMEOUTS, **(timeouts or {})}
+        self.retries = retries
+        self.backoff = backoff
+        if adapter is None:
+            if backend is None:
+                backend = getattr(config, "HTTP_BACKEND", "requests")
+                if backend == "httpx" and backend_options is None:
+                    backend_options = {"http2": getattr(config, "HTTP2", False)}
+            adapter = backends.create_adapter(
+                backend, pool_size, **(backend_options or {})
+            )
+        self.adapter = adapter
+        # 重试的次数
+        self.retried = 0
+
+        self._lock = threading.Lock()
+
+    def mount(self, ss: requests.Session) -> requests.Session:
+        """让 session 使用本 Transport 的连接池"""
+        ss.mount("http://", self.adapter)
+        ss.mount("https://", self.adapter)
+        return ss
+
+    def timeout(self, op: str) -> tuple[float, float]:
+        """操作 op 的 (连接超时, 读取超时)"""
+        return self.timeouts.get(op, self.timeouts["request"])
+
+    def request(
+        self,
+        ss: requests.Session,
+        method: str,
+        url: str,
+        op: str = "request",
+        **kwargs,
+    ) -> requests.Response:
+        """发送请求，按 op 设置超时，幂等操作失败时重试
+
+        参数:
+            ss: 使用的 session
+            method, url: 同 requests.Session.request
+            op: 操作类型，见 TIMEOUTS 与 IDEMPOTENT
+            kwargs: 传给 requests.Session.request，可用 timeout 覆盖默认超时
+        """
+        kwargs.setdefault("timeout", self.timeout(op))
+        retries = self.retries if op in IDEMPOTENT else 0
+        for attempt in range(retries):
+            try:
+                res = ss.request(method=method, url=url, **kwargs)
+                if res.status_code < 500:
+                    return res
+            except (requests.ConnectionError, requests.Timeout):
+                pass
+            with self._lock:
+                self.retried += 1
+            time.sleep(self.backoff * 2**attempt)
+        return ss.request(method=method, url=url, **kwargs)
+
+    def ensure_pool_size(self, size: int) -> None:
+        """让连接池至少能保留 size 个连接
+
+        在原有的连接池上直接提高上限，已经建立的连接和进行中的请求不受影响，
+        运行中增加任务时其他任务的 keep-alive 连接仍然可以复用。
+        之后才新建的连接池（如另一个主机）仍使用创建 Transport 时的大小。
+        """
+        with self._lock:
+            if size <= self.pool_size:
+                return
+            self.pool_size = size
+            if not isinstance(self.adapter, HTTPAdapter):
+                self.adapter.resize(size)
+                return
+            # connection_pool_kw 中的 maxsize 是连接池键的一部分，修改它会为同一主机另建连接池，
+            # 所以只调整已有连接池的上限；登录后教务系统的连接池已经存在
+            managers = [self.adapter.poolmanager, *self.adapter.proxy_manager.values()]
+            for manager in managers:
+                for pool in self._pools(manager):
+                    queue_ = pool.pool
+                    if queue_ is not None:
+                        with queue_.mutex:
+                            queue_.maxsize = max(queue_.maxsize, size)
+
+    def warmup(self, connections: int | None = None, url=None) -> int:
+        """并发请求登录页，预先建立连接并放回连接池
+
+        使用单独的 session，与登录状态共用连接池，但不影响其 Cookie。
+        已有的空闲连接也会被用到，相当于刷新了服务器端的 keep-alive 计时。
+
+        参数:
+            connections: 需要的连接数，默认为连接池大小
+            url: 请求的地址，默认为登录页
+
+        返回：
+            新建的连接数
+        """
+        n = min(connections or self.pool_size, self.pool_size)
+        url = url or f"{utils.BASE_URL}/service/login.html"
+        created = self.stats()["created"]
+        ss = self.mount(requests.Session())
+        # 所有线程同时发出请求，才会各自占用一个连接
+        barrier = threading.Barrier(n)
+
+        def hit():
+            try:
+                barrier.wait(timeout=self.timeout("warmup")[0])
+                self.request(ss, "GET", url, op="warmup")
+            except Exception as e:
+                utils.print_log(f"预热连接失败: {e}")
+
+        threads = [threading.Thread(target=hit) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        created = self.stats()["created"] - created
+        utils.print_log(f"已预热 {n} 个连接，其中新建 {created} 个")
+        return created
+
+    def _pools(self, manager=None) -> list:
+        if manager is None:
+            if not isinstance(self.adapter, HTTPAdapter):
+                return []
+            manager = self.adapter.poolmanager
+        pools = manager.pools
+        # urllib3 的 RecentlyUsedContainer 不支持直接迭代（会抛出 NotImplementedError），
+        # 只能先取 keys() 的快照
+        keys = pools.keys()
+        return [pool for key in keys if (pool := pools.get(key)) is not None]
+
+    def stats(self) -> dict[str, int]:
+        """连接统计
+
+        返回：
+            created: 新建的连接数
+            reused: 使用已有连接的请求数
+            idle: 连接池中空闲的连接数
+            retried: 重试次数
+        """
+        with self._lock:
+            created, requests_, idle = 0, 0, 0
+            if not isinstance(self.adapter, HTTPAdapter):
+                pool = self.adapter.pool_stats()
+                created += pool["created"]
+                requests_ += pool["requests"]
+                idle = pool["idle"]
+            for pool in self._pools():
+                created += pool.num_connections
+                requests_ += pool.num_requests
+                if pool.pool is not None:
+                    # 连接池的队列中用 None 占位，非 None 的才是已建立的连接
+                    idle += sum(conn is not None for conn in list(pool.pool.queue))
+            return {
+                "created": created,
+                "reused": max(0, requests_ - created),
+                "idle": idle,
+                "retried": self.retried,
+            }
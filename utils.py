@@ -1,130 +1,309 @@
 import json
+import os
 import smtplib
 import time
-from datetime import datetime
 from email.mime.text import MIMEText
 
-import ddddocr
 import requests
-from lxml import etree  # type: ignore
 
+import course_parser
+import logs
+import metrics
+import tracing
+from captcha import solver
 from config import USE_NEW_SYSTEM
+from select_result import EXPIRED, EXPIRED_BYTES
 
 if USE_NEW_SYSTEM:
     BASE_URL = "https://jiaowu.swjtu.edu.cn/TMS"
 else:
     BASE_URL = "http://jwc.swjtu.edu.cn"
 
+# 可以通过环境变量指向本地模拟服务器，例如 http://127.0.0.1:8080/TMS
+BASE_URL = os.environ.get("SWJTU_BASE_URL", BASE_URL).rstrip("/")
 
-ocr = ddddocr.DdddOcr(show_ad=False)
+
+def set_base_url(url: str) -> None:
+    """运行时修改教务系统地址，User 和 Strategy 每次请求都会读取最新值"""
+    global BASE_URL
+    BASE_URL = url.rstrip("/")
 
 
 class LoginExpiredError(Exception):
-    """自定义异常：登录过期或未授权"""
+    """自定义异常：登录过期或未授权
 
-    pass
+    generation 为请求时所用登录状态的代数（见 User.generation），未知时为 None。
+    """
 
+    def __init__(self, *args, generation: int | None = None):
+        super().__init__(*args)
+        self.generation = generation
 
-def login(username: str, password: str) -> requests.Session:
-    login_page: str = BASE_URL + "/service/login.html"
 
-    headers = {
-        "Referer": login_page,
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/76.0.3809.132 Safari/537.36",
-        "X-Requested-With": "XMLHttpRequest",
-    }
+class CaptchaError(ValueError):
+    """验证码识别错误，可以在同一个 session 上重新获取验证码重试"""
 
-    ss = requests.Session()
-    ss.headers.update(headers)
 
-    # 访问登录页获取 Cookie
-    ss.get(login_page)
+# 登录各阶段，按执行顺序排列
+LOGIN_PHASES = ("cookie", "captcha", "ocr", "login_action", "loading_action")
 
-    # 获取验证码
-    time.sleep(1)
-    if USE_NEW_SYSTEM:
-        # TMS 系统需要时间戳
-        img_url = f"{BASE_URL}/vatuu/GetRandomNumberToJPEG?test={get_timestamp()}"
-    else:
-        img_url = f"{BASE_URL}/vatuu/GetRandomNumberToJPEG"
+# 各阶段开始前距上一阶段结束的最小间隔（秒），默认不等待
+LOGIN_MIN_DELAYS: dict[str, float] = {phase: 0.0 for phase in LOGIN_PHASES}
 
-    img = ss.get(img_url)
-    time.sleep(3)
 
-    # 识别验证码
-    ranstring = ocr.classification(img.content)
+class LoginPipeline:
+    """登录流程
 
-    login_action_url = f"{BASE_URL}/vatuu/UserLoginAction"
+    将登录拆分为以下阶段依次执行，每个阶段可配置最小间隔，并记录耗时：
+        cookie: 访问登录页获取 Cookie
+        captcha: 获取验证码图片
+        ocr: 识别验证码
+        login_action: 提交 UserLoginAction
+        loading_action: 提交 UserLoadingAction 加载用户信息
 
-    data = {
-        "username": username,
-        "password": password,
-        "url": "",
-        "returnType": "",
-        "returnUrl": "",
-        "area": "",
-        "ranstring": ranstring,
-    }
+    验证码识别错误时，只在同一个 session 上重试 captcha 到 login_action 阶段。
+    """
 
-    res = ss.post(url=login_action_url, data=data)
-    try:
-        res_json = json.loads(res.text)
-    except json.JSONDecodeError:
-        raise ValueError(f"登录响应解析失败: {res.text}")
-
-    if res_json.get("loginStatus") == "1":
-        print_log("登录成功！")
-    elif res_json.get("loginStatus") == "-2":
-        raise ValueError(
-            "登录失败：验证码识别错误\n" + f"具体原因：\n{res_json.get('loginMsg')}",
-        )
-    elif res_json.get("loginStatus") == "5":
-        raise ValueError(
-            "登录失败：密码错误，请检查是否是教务网密码，或者填写错误\n"
-            + f"具体原因：\n{res_json.get('loginMsg')}",
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        min_delays: dict[str, float] | None = None,
+        captcha_retries: int = 3,
+        captcha_fetches: int = 5,
+        transport=None,
+        captcha_solver=None,
+    ):
+        """
+        参数:
+            username: 学号
+            password: 密码
+            min_delays: 覆盖 LOGIN_MIN_DELAYS 中的部分阶段
+            captcha_retries: 验证码错误时，在同一个 session 上的最大尝试次数
+            captcha_fetches: 每次尝试中，识别结果不合法时最多获取几张验证码
+            transport: transport.Transport，提供连接池和登录请求的超时
+            captcha_solver: 验证码识别器，默认为全局的 captcha.solver，也可以是 CaptchaPool
+        """
+        self.username = username
+        self.password = password
+        self.min_delays = {**LOGIN_MIN_DELAYS, **(min_delays or {})}
+        self.captcha_retries = captcha_retries
+        self.captcha_fetches = captcha_fetches
+        self.transport = transport
+        self.timeout = transport.timeout("login") if transport is not None else None
+        self.solver = captcha_solver if captcha_solver is not None else solver
+        # 每个阶段最后一次执行的耗时
+        self.timings: dict[str, float] = {}
+        # 按执行顺序记录的 (阶段, 耗时)，包含重试
+        self.history: list[tuple[str, float]] = []
+        self.captcha_attempts = 0
+        # 因识别结果不合法而在本地丢弃的验证码数量
+        self.captcha_rejected = 0
+        self._last_end: float | None = None
+
+    @property
+    def total(self) -> float:
+        """整个登录流程的耗时（不含最小间隔的等待）"""
+        return sum(seconds for _, seconds in self.history)
+
+    def _phase(self, name: str, func, *args, **kwargs):
+        """执行一个阶段：先满足最小间隔，再计时执行"""
+        delay = self.min_delays.get(name, 0.0)
+        if delay > 0 and self._last_end is not None:
+            remaining = delay - (time.monotonic() - self._last_end)
+            if remaining > 0:
+                with tracing.TRACER.span("login.wait", "login", phase=name):
+                    time.sleep(remaining)
+
+        start = time.monotonic()
+        try:
+            with tracing.TRACER.span(f"login.{name}", "login"):
+                return func(*args, **kwargs)
+        finally:
+            self._last_end = time.monotonic()
+            seconds = self._last_end - start
+            self.timings[name] = seconds
+            self.history.append((name, seconds))
+            metrics.REGISTRY.observe("login_phase_seconds", seconds, phase=name)
+
+    def run(self) -> requests.Session:
+        """执行登录，返回登录成功的 session"""
+        start = time.monotonic()
+        try:
+            with tracing.TRACER.span("login", "login"):
+                ss = self._run()
+        except Exception as e:
+            metrics.REGISTRY.inc("logins_total", outcome=type(e).__name__)
+            raise
+        metrics.REGISTRY.inc("logins_total", outcome="success")
+        metrics.REGISTRY.observe("login_seconds", time.monotonic() - start)
+        return ss
+
+    def _run(self) -> requests.Session:
+        login_page: str = BASE_URL + "/service/login.html"
+
+        headers = {
+            "Referer": login_page,
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/76.0.3809.132 Safari/537.36",
+            "X-Requested-With": "XMLHttpRequest",
+        }
+
+        # 请求登录页的同时在后台加载验证码模型
+        self.solver.warmup()
+
+        ss = requests.Session()
+        ss.headers.update(headers)
+        if self.transport is not None:
+            self.transport.mount(ss)
+
+        # 访问登录页获取 Cookie
+        self._phase("cookie", ss.get, login_page, timeout=self.timeout)
+
+        for attempt in range(1, self.captcha_retries + 1):
+            self.captcha_attempts = attempt
+            try:
+                res_json = self._submit(ss)
+                break
+            except CaptchaError as msg:
+                metrics.REGISTRY.inc("captcha_errors_total")
+                if attempt == self.captcha_retries:
+                    raise
+                print_log(f"{msg}\n在当前会话中重新获取验证码...")
+
+        # 更新 Referer 并加载用户信息
+        login_action_url = f"{BASE_URL}/vatuu/UserLoginAction"
+        ss.headers.update({"Referer": login_action_url})
+        data = {
+            "url": login_action_url,
+            "returnType": "",
+            "returnUrl": "",
+            "loginMsg": res_json.get("loginMsg"),
+        }
+        self._phase(
+            "loading_action",
+            ss.post,
+            url=f"{BASE_URL}/vatuu/UserLoadingAction",
+            data=data,
+            timeout=self.timeout,
         )
-    elif res_json.get("loginStatus") == "-9":
-        raise ValueError(
-            "登录失败：密码过于简单，或者未填写密码\n"
-            + f"具体原因：\n{res_json.get('loginMsg')}",
+
+        return ss
+
+    def _solve_captcha(self, ss: requests.Session) -> str:
+        """获取并识别验证码，识别结果不合法时直接换一张，不提交登录请求"""
+        for _ in range(self.captcha_fetches):
+            if USE_NEW_SYSTEM:
+                # TMS 系统需要时间戳
+                img_url = (
+                    f"{BASE_URL}/vatuu/GetRandomNumberToJPEG?test={get_timestamp()}"
+                )
+            else:
+                img_url = f"{BASE_URL}/vatuu/GetRandomNumberToJPEG"
+
+            img = self._phase("captcha", ss.get, img_url, timeout=self.timeout)
+
+            # 识别验证码
+            ranstring = self._phase("ocr", self.solver.solve, img.content)
+            if ranstring is not None:
+                return ranstring
+            self.captcha_rejected += 1
+            metrics.REGISTRY.inc("captcha_rejected_total")
+
+        raise CaptchaError(
+            f"登录失败：连续 {self.captcha_fetches} 张验证码的识别结果均不合法"
         )
-    else:
-        raise ValueError(f"登录失败: {res_json}")
-
-    # 更新 Referer 并加载用户信息
-    ss.headers.update({"Referer": login_action_url})
-    data = {
-        "url": login_action_url,
-        "returnType": "",
-        "returnUrl": "",
-        "loginMsg": res_json.get("loginMsg"),
-    }
-    ss.post(url=f"{BASE_URL}/vatuu/UserLoadingAction", data=data)
 
-    return ss
+    def _submit(self, ss: requests.Session) -> dict:
+        """识别验证码并提交登录请求，返回登录成功的响应"""
+        ranstring = self._solve_captcha(ss)
+
+        login_action_url = f"{BASE_URL}/vatuu/UserLoginAction"
+
+        data = {
+            "username": self.username,
+            "password": self.password,
+            "url": "",
+            "returnType": "",
+            "returnUrl": "",
+            "area": "",
+            "ranstring": ranstring,
+        }
+
+        res = self._phase(
+            "login_action",
+            ss.post,
+            url=login_action_url,
+            data=data,
+            timeout=self.timeout,
+        )
+        try:
+            res_json = json.loads(res.text)
+        except json.JSONDecodeError:
+            raise ValueError(f"登录响应解析失败: {res.text}")
+
+        if res_json.get("loginStatus") == "1":
+            print_log("登录成功！")
+        elif res_json.get("loginStatus") == "-2":
+            raise CaptchaError(
+                "登录失败：验证码识别错误\n"
+                + f"具体原因：\n{res_json.get('loginMsg')}",
+            )
+        elif res_json.get("loginStatus") == "5":
+            raise ValueError(
+                "登录失败：密码错误，请检查是否是教务网密码，或者填写错误\n"
+                + f"具体原因：\n{res_json.get('loginMsg')}",
+            )
+        elif res_json.get("loginStatus") == "-9":
+            raise ValueError(
+                "登录失败：密码过于简单，或者未填写密码\n"
+                + f"具体原因：\n{res_json.get('loginMsg')}",
+            )
+        else:
+            raise ValueError(f"登录失败: {res_json}")
+
+        return res_json
+
+
+def login(
+    username: str, password: str, min_delays: dict[str, float] | None = None
+) -> requests.Session:
+    """登录并返回 session，各阶段耗时见 LoginPipeline"""
+    return LoginPipeline(username, password, min_delays).run()
 
 
 def send(config, subject, text):
-    """发送邮件"""
+    """同步发送邮件，每次新建连接；选课过程中请使用 notify.Notifier"""
     msg = MIMEText(text, "html", "utf-8")
     msg["From"] = config["from"]
     msg["To"] = ",".join(config["to"])
     msg["Subject"] = subject
 
+    # "ssl": False 时使用明文 SMTP（用于本地测试）
+    smtp_class = smtplib.SMTP_SSL if config.get("ssl", True) else smtplib.SMTP
     try:
-        with smtplib.SMTP_SSL(config["smtp_server"], config["smtp_port"]) as smtp:
-            smtp.login(config["from"], config["pwd"])
+        with smtp_class(config["smtp_server"], config["smtp_port"]) as smtp:
+            if config.get("pwd"):
+                smtp.login(config["from"], config["pwd"])
             smtp.send_message(msg)
     except Exception as e:
         print(f"邮件发送失败: {e}")
 
 
-def print_log(msg: str, quiet: bool = False) -> None:
-    """打印日志"""
-    # 样式：2025-12-31 14:09:42:444
-    time = datetime.now().strftime("%Y-%m-%d %H:%M:%S:%f")[:-3]
-    if not quiet:
-        print(f"[{time}] {msg}")
+def print_log(
+    msg: str,
+    quiet: bool = False,
+    *,
+    level: int = logs.INFO,
+    task: str | None = None,
+    args: tuple = (),
+) -> None:
+    """记录日志，由 logs.LOG 在后台线程写出
+
+    样式：[2025-12-31 14:09:42:444] 消息。quiet 的日志不输出到控制台，
+    但仍可通过 logs.LOG.tail() 查看。args 不为空时按 msg % args 格式化，只在写出时进行，
+    轮询中的日志用它代替 f-string，被按任务过滤掉的记录不做格式化。
+    """
+    logs.LOG.log(level, msg, *args, task=task, quiet=quiet)
 
 
 def get_timestamp() -> int:
@@ -132,76 +311,28 @@ def get_timestamp() -> int:
     return int(time.time() * 1000)
 
 
-def check_session_expired(res_text: str) -> None:
-    """检查响应是否包含登录过期信息"""
-    if "未登陆" in res_text or "未登录" in res_text or "没有操作权限" in res_text:
+@tracing.traced("check_session_expired", "parse")
+def check_session_expired(res_text: str | bytes) -> None:
+    """检查响应是否包含登录过期信息，可以直接传入响应的字节内容"""
+    pattern = EXPIRED_BYTES if isinstance(res_text, bytes) else EXPIRED
+    if pattern.search(res_text):
         raise LoginExpiredError("登录过期")
 
 
-def parse_course_table(html_text: str) -> list[dict[str, str]]:
-    """解析课程表格 HTML 并返回结果列表"""
-    html = etree.HTML(html_text)
-    rows = html.xpath('//*[@id="table3"]/tr')
+def parse_course_table(html_text: str | bytes) -> list[dict[str, str]]:
+    """解析课程表格 HTML 并返回结果列表，可以直接传入响应的字节内容"""
+    return [row._asdict() for row in course_parser.parse_course_rows(html_text)]
 
-    if not rows or len(rows) < 2:
-        return []
 
-    data_rows = rows[1:-1]
-    ret = []
-    for item in data_rows:
-        try:
-            # 处理多行的情况（通过 <br> 分隔）
-            text_nodes = item.xpath("td[9]//text()")
-            teachers = " ".join([t.strip() for t in text_nodes if t.strip()])
-
-            # 原本的处理办法，
-            # date_text = item.xpath("string(td[11])")
-            # date = re.sub(r"\s+", " ", date_text.strip()).strip()
-            date_nodes = item.xpath("td[11]//text()")
-            date = ", ".join([t.strip() for t in date_nodes if t.strip()])
-
-            # 第二次选课开始，没有第十四行的「申请人数」，校区改为十四行
-            campus = (
-                item.xpath("string(td[15]/a/span)")
-                or item.xpath("string(td[14]/a/span)")
-            ).strip()
-
-            dic = {
-                "teacher": teachers,
-                "date": date,
-                "campus": campus,
-                "course": item.xpath("string(td[4])").strip(),
-                "course_code": item.xpath("string(td[3])").strip(),
-                "selected": item.xpath("string(td[13])").strip(),
-                "chooseId": item.xpath("string(td[2]/span[2])").strip(),
-                "teachId": item.xpath("string(td[2]/span[1])").strip(),
-            }
-            ret.append(dic)
-        except IndexError:
-            continue
-    return ret
-
-
-def parse_selected_list(html_text: str) -> dict[str, str]:
+def parse_selected_list(html_text: str | bytes) -> dict[str, str]:
     """解析已选课程列表 HTML，提取 chooseId 到 listId 的映射
 
     返回：
         {chooseId: listId} 格式的字典。
     """
-    html = etree.HTML(html_text)
-    elements = html.xpath('//*[@id="table3"]/tr')[1:-1]
-
-    mapping = {}
-    for element in elements:
-        try:
-            current_chooseId = element.xpath("td[3]/text()")[0].strip()
-            onclick_attr = element.xpath("td[12]/input/@onclick")[0]
-            # 解析如: onclick="...delCourse('...','LIST_ID',...)"
-            list_id = onclick_attr.strip().split(",")[-2].strip("'\"")
-            mapping[current_chooseId] = list_id
-        except IndexError:
-            continue
-    return mapping
+    return {
+        row.chooseId: row.listId for row in course_parser.parse_selected_rows(html_text)
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+"""课程余量监控
+
+按课程代码定期查询开课信息，只报告发生了什么变化：
+    - 对每个响应的 table3 片段计算哈希，与上次相同时不解析（只需截取片段和一次哈希）
+    - 有变化时解析并与上次的结果对比，生成 CourseChange 事件：
+      已选人数变化、新增开课、开课被移除，以及其他字段变化
+    - 事件交给订阅者（subscribe），也可以追加写入 JSONL 文件
+
+只监控每个课程代码查询结果的第一页（一门课的开课数一般远少于一页）。
+"""
+
+import enum
+import hashlib
+import json
+import threading
+import time
+from typing import NamedTuple
+
+import course_parser
+import logs
+import metrics
+import utils
+from course_parser import CourseRow
+from User import User
+from utils import LoginExpiredError
+
+
+class ChangeKind(enum.Enum):
+    SEATS = "seats"
+    ADDED = "added"
+    REMOVED = "removed"
+    UPDATED = "updated"
+
+
+class CourseChange(NamedTuple):
+    """一个开课的变化，新增时 before 为 None，移除时 after 为 None"""
+
+    kind: ChangeKind
+    course_code: str
+    chooseId: str
+    before: CourseRow | None
+    after: CourseRow | None
+    time: float
+
+    @property
+    def row(self) -> CourseRow:
+        return self.after if self.after is not None else self.before
+
+    def describe(self) -> str:
+        row = self.row
+        name = f"{row.course}（{row.teacher}，{self.chooseId}）"
+        if self.kind is ChangeKind.SEATS:
+            seats = parse_seats(row.selected)
+            left = f"，剩余 {seats[1] - seats[0]}" if seats else ""
+            return f"{name} 已选人数 {self.before.selected} -> {row.selected}{left}"
+        if self.kind is ChangeKind.ADDED:
+            return f"{name} 新增开课，已选人数 {row.selected}"
+        if self.kind is ChangeKind.REMOVED:
+            return f"{name} 开课已移除"
+        fields = [
+            f for f in CourseRow._fields if getattr(self.before, f) != getattr(row, f)
+        ]
+        return f"{name} 信息变化: {', '.join(fields)}"
+
+    def to_dict(self) -> dict:
+        return {
+            "time": self.time,
+            "kind": self.kind.value,
+            "course_code": self.course_code,
+            "chooseId": self.chooseId,
+            "before": self.before._asdict() if self.before is not None else None,
+            "after": self.after._asdict() if self.after is not None else None,
+        }
+
+
+def parse_seats(selected: str) -> tuple[int, int] | None:
+    """解析已选人数，如 "38/55" 返回 (38, 55)，格式不对时返回 None"""
+    parts = selected.split("/")
+    if len(parts) != 2:
+        return None
+    try:
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+
+
+def diff_rows(
+    code: str,
+    before: dict[str, CourseRow],
+    after: dict[str, CourseRow],
+    now: float | None = None,
+) -> list[CourseChange]:
+    """对比同一课程代码前后两次的开课，返回变化列表"""
+    now = time.time() if now is None else now
+    changes = []
+    for chooseId, row in after.items():
+        old = before.get(chooseId)
+        if old is None:
+            changes.append(
+                CourseChange(ChangeKind.ADDED, code, chooseId, None, row, now)
+            )
+        elif old != row:
+            # 只有已选人数不同时为 SEATS，其他字段也变了时为 UPDATED
+            kind = (
+                ChangeKind.SEATS
+                if old._replace(selected=row.selected) == row
+                else ChangeKind.UPDATED
+            )
+            changes.append(CourseChange(kind, code, chooseId, old, row, now))
+    for chooseId, row in before.items():
+        if chooseId not in after:
+            changes.append(
+                CourseChange(ChangeKind.REMOVED, code, chooseId, row, None, now)
+            )
+    return changes
+
+
+class CourseWatcher:
+    """按课程代码监控开课信息的变化"""
+
+    def __init__(
+        self,
+        user: User,
+        codes: list[str],
+        interval: float = 5.0,
+        jsonl_path: str | None = None,
+        quiet: bool = False,
+    ):
+        """
+        参数:
+            user: 已登录的用户
+            codes: 要监控的课程代码
+            interval: 每个课程代码的查询间隔（秒），多个代码的请求均匀错开
+            jsonl_path: 把变化事件追加写入该 JSONL 文件，None 表示不写
+            quiet: 静默模式，不显示日志
+        """
+        self.user = user
+        self.codes = list(codes)
+        self.interval = interval
+        self.jsonl_path = jsonl_path
+        self.quiet = quiet
+        # {课程代码: 上次 table3 片段的哈希}
+        self.hashes: dict[str, bytes] = {}
+        # {课程代码: {chooseId: CourseRow}}
+        self.snapshots: dict[str, dict[str, CourseRow]] = {}
+        # 查询次数、其中内容未变化而跳过解析的次数
+        self.polls = 0
+        self.unchanged = 0
+        self._subscribers = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # 后台线程因异常退出时的异常
+        self.error: Exception | None = None
+
+    def subscribe(self, callback) -> None:
+        """注册回调，每个变化事件调用一次 callback(change)"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        self._subscribers.remove(callback)
+
+    def poll(self, code: str) -> list[CourseChange]:
+        """查询一个课程代码，返回与上次相比的变化，第一次查询只记录基准"""
+        content = self.user.fetch_courses("CourseCode", code)
+        self.polls += 1
+        section = course_parser.table3_section(content)
+        digest = hashlib.blake2b(
+            section if section is not None else content, digest_size=16
+        ).digest()
+        if self.hashes.get(code) == digest:
+            self.unchanged += 1
+            metrics.REGISTRY.inc("watch_polls_total", result="unchanged")
+            return []
+        metrics.REGISTRY.inc("watch_polls_total", result="changed")
+
+        rows = course_parser.parse_course_rows(content)
+        self.user.catalog.add(rows, ("CourseCode", code))
+        snapshot = {row.chooseId: row for row in rows}
+        previous = self.snapshots.get(code)
+        self.hashes[code] = digest
+        self.snapshots[code] = snapshot
+        if previous is None:
+            return []
+
+        changes = diff_rows(code, previous, snapshot)
+        for change in changes:
+            metrics.REGISTRY.inc("watch_changes_total", kind=change.kind.value)
+            self._emit(change)
+        return changes
+
+    def poll_all(self) -> list[CourseChange]:
+        """依次查询所有课程代码"""
+        changes = []
+        for code in self.codes:
+            changes += self.poll(code)
+        return changes
+
+    def _emit(self, change: CourseChange) -> None:
+        utils.print_log(change.describe(), quiet=self.quiet, task=change.course_code)
+        if self.jsonl_path:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(change.to_dict(), ensure_ascii=False) + "\n")
+        for callback in list(self._subscribers):
+            try:
+                callback(change)
+            except Exception as e:
+                utils.print_log(f"监控回调出错: {e}", level=logs.WARNING)
+
+    def run(self, max_rounds: int | None = None) -> None:
+        """在当前线程中循环查询，直到调用 stop() 或查询 max_rounds 轮"""
+        self._stop.clear()
+        rounds = 0
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            # 多个课程代码的请求在 interval 内均匀错开，每轮重新计算以便运行中修改间隔
+            step = self.interval / max(len(self.codes), 1)
+            for code in self.codes:
+                generation = self.user.generation
+                try:
+                    self.poll(code)
+                except LoginExpiredError as e:
+                    if e.generation is not None:
+                        generation = e.generation
+                    try:
+                        self.user.relogin(generation, self.quiet)
+                    except Exception as e:
+                        utils.print_log(f"重连失败: {e}", quiet=self.quiet)
+                except Exception as e:
+                    utils.print_log(
+                        f"查询 {code} 失败: {e}", quiet=self.quiet, task=code
+                    )
+                next_at += step
+                now = time.monotonic()
+                if next_at < now and step > 0:
+                    # 查询比间隔还慢时跳过错过的节拍，不连续补发
+                    next_at += ((now - next_at) // step + 1) * step
+                if self._stop.wait(max(0.0, next_at - now)):
+                    return
+            rounds += 1
+            if max_rounds is not None and rounds >= max_rounds:
+                return
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """在后台线程中运行"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._run_thread, name="watcher", daemon=True
+        )
+        self._thread.start()
+
+    def _run_thread(self) -> None:
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
+            utils.print_log(f"课程监控异常退出: {e}", level=logs.ERROR)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None